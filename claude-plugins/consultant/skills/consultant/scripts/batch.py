@@ -0,0 +1,293 @@
+"""
+Batch execution of many consultations from a JSONL file.
+Runs jobs with bounded concurrency, processes each distinct attachment once
+and appends one JSONL result per job as it finishes.
+"""
+
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, TextIO
+
+import config
+from conversion_cache import ConversionCache
+from file_handler import (
+    FileError,
+    FileHandler,
+    ProcessedFile,
+    build_image_content,
+    build_prompt_segments,
+    count_image_tokens,
+    has_images,
+)
+from image_pipeline import limits_for_models
+from litellm_client import LiteLLMClient
+from path_expander import expand_paths
+from session_manager import SessionManager
+from token_cache import TokenCache, count_prompt_tokens
+
+
+@dataclass
+class BatchJob:
+    """One consultation parsed from a line of the batch input"""
+
+    line: int
+    slug: str
+    prompt: str
+    model: str
+    reasoning_effort: str
+    files: list[str] = field(default_factory=list)
+
+
+def load_jobs(input_path: Path, default_model: str) -> tuple[list[BatchJob], list[str]]:
+    """
+    Parse a JSONL batch file.
+
+    Each line is an object with 'prompt' and 'slug' (required) and optional
+    'files', 'model' and 'effort' (or 'reasoning_effort'). Directories and
+    globs in 'files' are expanded with the default filters.
+
+    Returns:
+        Tuple of (jobs, errors) - errors describe invalid lines
+    """
+    jobs: list[BatchJob] = []
+    errors: list[str] = []
+    seen_slugs: set[str] = set()
+
+    for line_no, line in enumerate(input_path.read_text().splitlines(), start=1):
+        if not line.strip():
+            continue
+
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError as e:
+            errors.append(f"line {line_no}: invalid JSON: {e}")
+            continue
+
+        if not isinstance(entry, dict):
+            errors.append(f"line {line_no}: expected a JSON object")
+            continue
+
+        missing = [key for key in ("prompt", "slug") if not entry.get(key)]
+        if missing:
+            errors.append(f"line {line_no}: missing {', '.join(missing)}")
+            continue
+
+        slug = str(entry["slug"])
+        if slug in seen_slugs:
+            errors.append(f"line {line_no}: duplicate slug '{slug}'")
+            continue
+        seen_slugs.add(slug)
+
+        files = entry.get("files") or []
+        if isinstance(files, str):
+            files = [files]
+        try:
+            files = expand_paths([str(f) for f in files]).paths
+        except ValueError as e:
+            errors.append(f"line {line_no}: {e}")
+            continue
+
+        jobs.append(
+            BatchJob(
+                line=line_no,
+                slug=slug,
+                prompt=str(entry["prompt"]),
+                model=str(entry.get("model") or default_model),
+                reasoning_effort=str(
+                    entry.get("effort") or entry.get("reasoning_effort") or "xhigh"
+                ),
+                files=[str(f) for f in files],
+            )
+        )
+
+    return jobs, errors
+
+
+class BatchRunner:
+    """Runs batch jobs concurrently, sharing processed attachments"""
+
+    def __init__(
+        self,
+        base_url: str | None = None,
+        api_key: str | None = None,
+        concurrency: int = config.BATCH_CONCURRENCY,
+        session_mgr: SessionManager | None = None,
+        use_cache: bool = False,
+        deadline: float | None = None,
+    ) -> None:
+        self.base_url = base_url
+        self.api_key = api_key
+        self.use_cache = use_cache
+        self.deadline = deadline  # epoch seconds, shared by all jobs
+        self.concurrency = max(1, concurrency)
+        self.session_mgr = session_mgr or SessionManager()
+        self.client = LiteLLMClient(base_url=base_url, api_key=api_key)
+        self.token_cache = TokenCache()
+        self._attachments: dict[str, ProcessedFile | FileError] = {}
+        self._output_lock = threading.Lock()
+
+    def run(self, jobs: list[BatchJob], output: TextIO) -> dict[str, int]:
+        """
+        Run all jobs, writing one JSON line per job to output as each finishes.
+
+        Returns:
+            Counts of jobs by final status
+        """
+        self._process_attachments(jobs)
+
+        counts: dict[str, int] = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = [pool.submit(self._run_job, job) for job in jobs]
+            for future in as_completed(futures):
+                record = future.result()
+                counts[record["status"]] = counts.get(record["status"], 0) + 1
+
+                with self._output_lock:
+                    output.write(json.dumps(record) + "\n")
+                    output.flush()
+
+                print(f"[{record['status']}] {record['slug']} ({record['model']})")
+
+        return counts
+
+    def _process_attachments(self, jobs: list[BatchJob]) -> None:
+        """Process every distinct attachment once, before any job starts"""
+
+        unique_paths = list(dict.fromkeys(path for job in jobs for path in job.files))
+        if not unique_paths:
+            return
+
+        cache = ConversionCache()
+        file_handler = FileHandler(
+            cache=cache, image_limits=limits_for_models([job.model for job in jobs])
+        )
+        processed, errors = file_handler.process_files(unique_paths)
+        for processed_file in processed:
+            self._attachments[processed_file.path] = processed_file
+        for error in errors:
+            self._attachments[error.path] = error
+
+        print(
+            f"Processed {len(unique_paths)} unique attachment(s) "
+            f"for {len(jobs)} job(s) ({len(errors)} failed; "
+            f"conversion cache: {cache.stats()})"
+        )
+
+    def _run_job(self, job: BatchJob) -> dict[str, Any]:
+        """Prepare, start and wait for one job; never raises"""
+
+        record: dict[str, Any] = {
+            "line": job.line,
+            "slug": job.slug,
+            "model": job.model,
+            "reasoning_effort": job.reasoning_effort,
+        }
+
+        try:
+            session_id = self._start_session(job)
+            record["session_id"] = session_id
+            result = self.session_mgr.wait_for_completion(session_id)
+        except Exception as e:
+            record.update(status="error", error=str(e))
+            return record
+
+        record["status"] = result.get("status", "error")
+        for key in ("output", "error", "usage", "cost_info"):
+            if result.get(key) is not None:
+                record[key] = result[key]
+        return record
+
+    def _start_session(self, job: BatchJob) -> str:
+        """Validate a job against its model and start its session"""
+
+        files: list[ProcessedFile] = []
+        for path in job.files:
+            attachment = self._attachments[str(Path(path))]
+            if isinstance(attachment, FileError):
+                raise ValueError(f"{attachment.path}: {attachment.reason}")
+            files.append(attachment)
+
+        if has_images(files):
+            from litellm import supports_vision
+
+            if not supports_vision(model=job.model):
+                raise ValueError(f"Model '{job.model}' does not support images")
+
+        if not self.base_url:
+            env_status = self.client.validate_environment(job.model)
+            if not env_status.get("keys_in_environment", False):
+                missing = ", ".join(env_status.get("missing_keys", []))
+                raise ValueError(f"Missing environment variables: {missing}")
+
+        segments = build_prompt_segments(job.prompt, files)
+        image_content = build_image_content(files) if has_images(files) else None
+
+        # Attachments shared between jobs are tokenized once per model
+        total_tokens = count_prompt_tokens(
+            segments, job.model, self.client, self.token_cache
+        ) + count_image_tokens(files, job.model)
+        max_tokens = self.client.get_max_tokens(job.model)
+        if total_tokens > max_tokens:
+            raise ValueError(
+                f"Input exceeds context limit: {total_tokens:,} > {max_tokens:,} tokens"
+            )
+
+        session_id: str = self.session_mgr.create_session(
+            slug=job.slug,
+            prompt=[text for _, text in segments],
+            model=job.model,
+            base_url=self.base_url,
+            api_key=self.api_key,
+            reasoning_effort=job.reasoning_effort,
+            image_content=image_content,
+            use_cache=self.use_cache,
+            deadline=self.deadline,
+            token_estimate=total_tokens,
+        )
+        return session_id
+
+
+def run_batch(
+    input_path: Path,
+    output_path: Path,
+    default_model: str,
+    concurrency: int = config.BATCH_CONCURRENCY,
+    base_url: str | None = None,
+    api_key: str | None = None,
+    use_cache: bool = False,
+    deadline: float | None = None,
+) -> int:
+    """Run a batch file end to end. Returns a process exit code."""
+
+    jobs, errors = load_jobs(input_path, default_model)
+    if errors:
+        print("ERROR: Invalid batch input:", file=sys.stderr)
+        for error in errors:
+            print(f"  - {error}", file=sys.stderr)
+        return 1
+
+    if not jobs:
+        print("No jobs found in batch input.")
+        return 0
+
+    print(f"Running {len(jobs)} job(s) with concurrency {concurrency}")
+    print(f"Results: {output_path}")
+
+    runner = BatchRunner(
+        base_url=base_url,
+        api_key=api_key,
+        concurrency=concurrency,
+        use_cache=use_cache,
+        deadline=deadline,
+    )
+    with output_path.open("a", encoding="utf-8") as output:
+        counts = runner.run(jobs, output)
+
+    summary = ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+    print(f"\nBatch finished: {summary}")
+
+    return 0 if counts.get("completed", 0) == len(jobs) else 1
@@ -8,11 +8,54 @@ from pathlib import Path
 # Session storage location
 DEFAULT_SESSIONS_DIR = Path.home() / ".consultant" / "sessions"
 
+# Cache of markitdown conversions and image encodings, keyed by content hash
+CONVERSION_CACHE_DIR = Path.home() / ".consultant" / "cache" / "conversions"
+CONVERSION_CACHE_MAX_BYTES = 1024 * 1024 * 1024  # 1GB, least recently used evicted
+
+# Opt-in cache of complete responses (--cache, or CONSULTANT_RESPONSE_CACHE=1),
+# keyed by a hash of the full input, model, endpoint and reasoning effort
+RESPONSE_CACHE_DIR = Path.home() / ".consultant" / "cache" / "responses"
+RESPONSE_CACHE_MAX_BYTES = 256 * 1024 * 1024  # 256MB, least recently used evicted
+RESPONSE_CACHE_TTL = 7 * 24 * 3600  # seconds an entry may be served
+
+# Directory/glob attachments: files larger than this are skipped
+EXPAND_MAX_FILE_BYTES = 1024 * 1024  # 1MB
+
+# --diff attachments: lines of context around each hunk, and the size cap for
+# touched files attached in full with --diff-full-files
+DIFF_CONTEXT_LINES = 10
+DIFF_FULL_FILE_MAX_BYTES = 64 * 1024  # 64KB
+
+# Image attachments are downscaled to the target providers' resolution and
+# re-encoded (WebP) at this quality
+IMAGE_QUALITY = 85
+
+# Cache of token counts, keyed by tokenizer and content hash
+TOKEN_CACHE_PATH = Path.home() / ".consultant" / "cache" / "tokens.db"
+TOKEN_CACHE_MAX_ENTRIES = 100_000  # least recently used evicted
+TOKEN_COUNT_WORKERS = 8  # concurrent token counts for uncached segments
+
+# Consultant daemon: Unix socket inside a user-only (0700) directory
+DAEMON_SOCKET_PATH = Path.home() / ".consultant" / "daemon" / "daemon.sock"
+DAEMON_CONNECT_TIMEOUT = 0.5  # seconds to wait when probing for the daemon
+DAEMON_SUBMIT_TIMEOUT = 600  # seconds; covers file processing and token counting
+
+# Shared keep-alive HTTP pools (one per base URL)
+HTTP_POOL_MAX_CONNECTIONS = 32
+HTTP_POOL_MAX_KEEPALIVE = 16
+HTTP_POOL_KEEPALIVE_EXPIRY = 60  # seconds an idle connection is kept open
+HTTP_POOL_HTTP2 = True  # used when the h2 package is installed
+HTTP_CONNECT_TIMEOUT = 10  # seconds
+HTTP_TIMEOUT = 600  # seconds; default read/write timeout for pooled requests
+TOKEN_COUNT_TIMEOUT = 30  # seconds per proxy token count request
+MODEL_LIST_TIMEOUT = 10  # seconds per proxy model list request
+
 # Environment variable names
 ENV_LITELLM_API_KEY = "LITELLM_API_KEY"
 ENV_OPENAI_API_KEY = "OPENAI_API_KEY"
 ENV_ANTHROPIC_API_KEY = "ANTHROPIC_API_KEY"
 ENV_OPENAI_BASE_URL = "OPENAI_BASE_URL"
+ENV_RESPONSE_CACHE = "CONSULTANT_RESPONSE_CACHE"
 
 # Token budget: Reserve this percentage for response
 CONTEXT_RESERVE_RATIO = 0.2  # 20% reserved for response
@@ -21,13 +64,42 @@ CONTEXT_RESERVE_RATIO = 0.2  # 20% reserved for response
 MAX_RETRIES = 3
 INITIAL_RETRY_DELAY = 2  # seconds
 MAX_RETRY_DELAY = 60  # seconds
+MAX_RETRY_AFTER = 300  # seconds; a longer server back-off hint fails the request
 
 # Background job polling configuration
-POLL_INTERVAL = 20  # seconds between polls (configurable)
+POLL_INTERVAL = 20  # longest delay between polls without completion history
 POLL_TIMEOUT = 3600  # 1 hour max wait for background jobs
+POLL_MIN_INTERVAL = 1  # seconds; first poll delay and delay near expected finish
+POLL_MAX_INTERVAL = 60  # longest delay while similar jobs were still running
+POLL_BACKOFF = 1.5  # delay growth per poll without completion history
+POLL_FINISH_PROBABILITY = 0.05  # share of similar jobs allowed to finish between polls
+POLL_HISTORY_SAMPLES = 50  # most recent completed jobs per model and effort
+POLL_HISTORY_MIN_SAMPLES = 5  # fewer than this: back off without history
+
+# Client-side rate limits (opt-in): a JSON object mapping model patterns
+# (fnmatch, e.g. "anthropic/*" or "openai/gpt-5*") to {"rpm": N, "tpm": N}.
+# The budgets are shared by all consultant processes through RATE_LIMIT_DB_PATH
+RATE_LIMITS_PATH = Path.home() / ".consultant" / "rate_limits.json"
+RATE_LIMIT_DB_PATH = Path.home() / ".consultant" / "rate_limits.db"
+RATE_LIMIT_HEADROOM = 0.9  # share of the configured budgets actually used
+
+# Hedged requests (opt-in with --hedge-model): seconds without output from
+# the primary model before the fallback model is asked as well
+HEDGE_AFTER_SECONDS = 120
+
+# Batch mode: default number of consultations running at once
+BATCH_CONCURRENCY = 4
+
+# Map-reduce mode: shard consultations running at once within a session
+MAP_REDUCE_CONCURRENCY = 4
 
 # Session polling
 POLLING_INTERVAL_SECONDS = 2
+SESSION_WAIT_TIMEOUT = 3600  # seconds to wait for a session without a deadline
+DEADLINE_GRACE_SECONDS = 30  # extra wait for a session to record its deadline
+
+# How often a streaming/--follow reader checks output.txt for new text
+STREAM_FOLLOW_INTERVAL_SECONDS = 0.25
 
 
 def get_api_key() -> str | None:
@@ -44,3 +116,9 @@ def get_base_url() -> str | None:
     base_url = os.environ.get(ENV_OPENAI_BASE_URL)
     # Only return if non-empty
     return base_url if base_url and base_url.strip() else None
+
+
+def response_cache_enabled() -> bool:
+    """Whether CONSULTANT_RESPONSE_CACHE turns the response cache on by default"""
+    value = os.environ.get(ENV_RESPONSE_CACHE, "")
+    return value.strip().lower() in ("1", "true", "yes", "on")
@@ -3,11 +3,13 @@
 # requires-python = ">=3.10"
 # dependencies = [
 #     "litellm",
-#     "requests>=2.31.0",
+#     "httpx[http2]",
+#     "pillow",
 #     "tenacity",
 #     "markitdown>=0.1.0",
 #     "fastapi",
 #     "orjson",
+#     "uvicorn",
 # ]
 # ///
 """
@@ -15,41 +17,58 @@ Consultant CLI - LiteLLM-powered LLM consultation tool
 Supports async invocation, custom base URLs, and flexible model selection
 
 Run with: uvx consultant_cli.py [args]
-This automatically installs/updates dependencies (litellm, requests) on first run.
+This automatically installs/updates dependencies (litellm, httpx) on first run.
 """
 
 import argparse
 import json
+import re
 import sys
+import time
+from collections.abc import Callable
+from dataclasses import asdict
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
 # Add scripts directory to path
 SCRIPTS_DIR = Path(__file__).parent
 sys.path.insert(0, str(SCRIPTS_DIR))
 
 import config
-from file_handler import (
-    FileHandler,
-    build_multimodal_content,
-    build_prompt_with_references,
-    has_images,
-    validate_vision_support,
-)
-from litellm_client import LiteLLMClient
-from model_selector import ModelSelector
 from session_manager import SessionManager
+from token_cache import count_prompt_tokens
+
+# file_handler (markitdown), litellm_client and model_selector (litellm) are
+# imported inside the handlers that need them, so read-only subcommands like
+# "list" and "session" start without loading those dependencies.
+if TYPE_CHECKING:
+    from context_packer import PackedFile
+    from file_handler import ProcessedFile
+    from litellm_client import LiteLLMClient
+    from map_reduce import Shard
+    from token_cache import TokenCache
+
+DEFAULT_MODEL = "gpt-5.2-pro"
 
 
 def validate_context_size(
-    full_prompt: str, model: str, client: LiteLLMClient, num_files: int
-) -> bool:
+    segments: "list[tuple[ProcessedFile | None, str]]",
+    model: str,
+    client: "LiteLLMClient",
+    num_files: int,
+    cache: "TokenCache | None" = None,
+    image_tokens: int = 0,
+) -> int:
     """
     Validate that full prompt fits in model context.
-    Returns True if OK, raises ValueError if exceeds.
+    image_tokens is the estimate for attached images (count_image_tokens).
+    Returns the prompt's token count, raises ValueError if exceeds.
     """
 
     # Count tokens for the complete prompt
-    total_tokens = client.count_tokens(full_prompt, model)
+    total_tokens: int = (
+        count_prompt_tokens(segments, model, client, cache) + image_tokens
+    )
 
     # Get limit
     max_tokens = client.get_max_tokens(model)
@@ -60,9 +79,11 @@ def validate_context_size(
     # Print summary
     print("\n📊 Token Usage:")
     print(f"- Input: {total_tokens:,} tokens ({num_files} files)")
+    if image_tokens:
+        print(f"- Images: ~{image_tokens:,} tokens (estimated, included above)")
     print(f"- Limit: {max_tokens:,} tokens")
     print(
-        f"- Available: {available_tokens:,} tokens ({int((available_tokens/max_tokens)*100)}%)\n"
+        f"- Available: {available_tokens:,} tokens ({int((available_tokens / max_tokens) * 100)}%)\n"
     )
 
     if total_tokens > max_tokens:
@@ -78,33 +99,482 @@ def validate_context_size(
         )
 
     if total_tokens > available_tokens:
-        print(f"⚠️  WARNING: Using {int((total_tokens/max_tokens)*100)}% of context")
+        print(f"⚠️  WARNING: Using {int((total_tokens / max_tokens) * 100)}% of context")
         print("   Consider reducing input size for better response quality\n")
 
-    return True
+    return total_tokens
 
 
-def handle_invocation(args: argparse.Namespace) -> int:
-    """Handle main invocation command"""
+def context_budget(models: list[str], client: "LiteLLMClient") -> tuple[str, int]:
+    """
+    The model with the smallest prompt budget (context minus the response
+    reserve) and that budget. Council sessions share one prompt, so it has
+    to fit the tightest model.
+    """
+
+    budgets = {
+        model: int(client.get_max_tokens(model) * (1 - config.CONTEXT_RESERVE_RATIO))
+        for model in models
+    }
+    model = min(budgets, key=lambda m: budgets[m])
+    return model, budgets[model]
+
+
+def pack_context(
+    args: argparse.Namespace,
+    files: "list[ProcessedFile]",
+    models: list[str],
+    client: "LiteLLMClient",
+    cache: "TokenCache",
+) -> "tuple[list[tuple[ProcessedFile | None, str]], list[PackedFile]]":
+    """
+    Fit attachments into the smallest available budget among the models and
+    print what was trimmed. Raises ValueError for invalid --priority values.
+    """
+
+    from context_packer import pack_files, parse_priorities
+    from file_handler import count_image_tokens
+
+    priorities = parse_priorities(args.priorities or [])
+    model, budget = context_budget(models, client)
+    # Images are never demoted, so they come off the top
+    budget -= count_image_tokens(files, model)
+
+    segments, decisions = pack_files(
+        args.prompt,
+        files,
+        budget,
+        priorities,
+        lambda texts: client.count_tokens_batch(texts, model, cache),
+    )
+
+    trimmed = [d for d in decisions if d.tier != "full"]
+    print(f"\n📦 Context Packing (budget: {budget:,} tokens, {model}):")
+    if not trimmed:
+        print(f"- All {len(decisions)} file(s) fit in full")
+    for decision in trimmed:
+        print(f"- {decision.describe()}")
+    if trimmed:
+        print(f"- {len(decisions) - len(trimmed)} other file(s) included in full")
+
+    return segments, decisions
+
+
+def plan_map_reduce(
+    args: argparse.Namespace,
+    segments: "list[tuple[ProcessedFile | None, str]]",
+    files: "list[ProcessedFile]",
+    models: list[str],
+    client: "LiteLLMClient",
+    cache: "TokenCache",
+) -> "list[Shard] | None":
+    """
+    Split attachments into shards when the prompt exceeds the smallest
+    budget among the models and print the plan. Returns None when the
+    prompt fits in a single call. Raises ValueError if the request alone
+    leaves no room for files.
+    """
+
+    from file_handler import count_image_tokens
+    from map_reduce import SHARD_INSTRUCTIONS, build_shards, plan_shards
+
+    model, budget = context_budget(models, client)
+    image_tokens = count_image_tokens(files, model)
+    total = count_prompt_tokens(segments, model, client, cache) + image_tokens
+    print(f"\n🗺️  Map-Reduce (budget: {budget:,} tokens, {model}):")
+    if total <= budget:
+        print(f"- Input fits in one call ({total:,} tokens); not sharded")
+        return None
+
+    # Each shard repeats the request and instructions; keep a margin for the
+    # per-file headings. Images all go into the first shard.
+    overhead = (
+        client.count_tokens_batch([args.prompt + SHARD_INSTRUCTIONS], model, cache)[0]
+        + image_tokens
+    )
+    file_budget = int((budget - overhead) * 0.95)
+    if file_budget <= 0:
+        raise ValueError(
+            f"The prompt alone ({overhead:,} tokens) leaves no room for files "
+            f"within the {budget:,} token budget"
+        )
+
+    shards: list[Shard] = build_shards(
+        args.prompt,
+        plan_shards(
+            files,
+            file_budget,
+            lambda texts: client.count_tokens_batch(texts, model, cache),
+        ),
+    )
+    print(f"- Input: {total:,} tokens, split into {len(shards)} parts")
+    for index, shard in enumerate(shards, start=1):
+        print(f"- Part {index}: {len(shard.files)} file(s)")
+    return shards
 
-    # Determine base URL: --base-url flag > OPENAI_BASE_URL env var > None
-    base_url = args.base_url
+
+def expand_attachments(args: argparse.Namespace) -> list[str]:
+    """
+    Expand directory and glob -f arguments into files and print a summary.
+    Raises ValueError if a glob matches nothing.
+    """
+
+    from path_expander import expand_paths
+
+    expansion = expand_paths(
+        args.files or [],
+        include=args.include,
+        exclude=args.exclude,
+        max_file_bytes=args.max_file_size,
+    )
+    if expansion.expanded_args:
+        print(f"\n📁 {expansion.describe()}")
+    paths: list[str] = expansion.paths
+    return paths
+
+
+def diff_files(args: argparse.Namespace) -> list["ProcessedFile"]:
+    """
+    Attachments for --diff: changed hunks, plus touched files in full with
+    --diff-full-files. Raises ValueError if git fails or nothing changed.
+    """
+
+    from git_diff import diff_attachments
+
+    attachments = diff_attachments(
+        args.diff,
+        args.diff_context,
+        full_file_max_bytes=args.diff_full_files,
+        cwd=args.diff_dir,
+    )
+    if not attachments.changed:
+        raise ValueError(f"No changes in {args.diff}")
+    print(f"\n🔀 {attachments.describe()}")
+    files: list[ProcessedFile] = attachments.files
+    return files
+
+
+def parse_size(value: str) -> int:
+    """Parse a byte size such as 500000, 512K or 2M"""
+    match = re.fullmatch(r"\s*(\d+)\s*([KMG]?)B?\s*", value, re.IGNORECASE)
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid size '{value}' (e.g. 512K, 2M)")
+    number, unit = match.groups()
+    size: int = int(number) * 1024 ** " KMG".index(unit.upper() or " ")
+    return size
+
+
+def parse_duration(value: str) -> float:
+    """Parse a duration in seconds such as 90, 90s, 15m or 1.5h"""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([SMH]?)\s*", value, re.IGNORECASE)
+    if not match or float(match.group(1)) <= 0:
+        raise argparse.ArgumentTypeError(
+            f"invalid duration '{value}' (e.g. 90s, 15m, 1h)"
+        )
+    number, unit = match.groups()
+    seconds: float = float(number) * {"": 1, "S": 1, "M": 60, "H": 3600}[unit.upper()]
+    return seconds
+
+
+def use_response_cache(args: argparse.Namespace) -> bool:
+    """--cache/--no-cache, defaulting to the CONSULTANT_RESPONSE_CACHE variable"""
+    if args.cache is not None:
+        return bool(args.cache)
+    enabled: bool = config.response_cache_enabled()
+    return enabled
+
+
+def resolve_base_url(args: argparse.Namespace) -> str | None:
+    """Determine base URL: --base-url flag > OPENAI_BASE_URL env var > None"""
+    base_url: str | None = args.base_url
     if not base_url:
         base_url = config.get_base_url()
         if base_url:
             print(f"Using base URL from OPENAI_BASE_URL: {base_url}")
+    return base_url
+
+
+def model_session_slug(slug: str, model: str) -> str:
+    """Derive a per-model session slug for multi-model (council) invocations"""
+    model_part = re.sub(r"[^a-z0-9]+", "-", model.lower()).strip("-")
+    return f"{slug}-{model_part}"
+
+
+def check_environment(client: "LiteLLMClient", model: str) -> bool:
+    """
+    Validate that the provider keys for a model are present.
+    Prints remediation steps and returns False if they are missing.
+    """
+    env_status = client.validate_environment(model)
+    if env_status.get("keys_in_environment", False):
+        return True
+
+    missing = env_status.get("missing_keys", [])
+    error = env_status.get("error", "")
+
+    print(
+        f"\n❌ ERROR: Missing required environment variables for model '{model}'",
+        file=sys.stderr,
+    )
+    print(f"\nMissing keys: {', '.join(missing)}", file=sys.stderr)
+
+    if error:
+        print(f"\nDetails: {error}", file=sys.stderr)
+
+    print("\n💡 To fix this:", file=sys.stderr)
+    print("   1. Set the required environment variable(s):", file=sys.stderr)
+    for key in missing:
+        print(f"      export {key}=your-api-key", file=sys.stderr)
+    print(
+        "   2. Or use --base-url to specify a custom LiteLLM endpoint",
+        file=sys.stderr,
+    )
+    print("   3. Or use --model to specify a different model\n", file=sys.stderr)
+
+    return False
+
+
+def cache_token_counts(usage: dict[str, Any] | None) -> tuple[int, int]:
+    """
+    Input tokens read from and written to the provider's prompt cache, from
+    a usage dict (Chat Completions, Responses API or Anthropic fields)
+    """
+    if not usage:
+        return 0, 0
+    details = (
+        usage.get("prompt_tokens_details") or usage.get("input_tokens_details") or {}
+    )
+    read = details.get("cached_tokens") or usage.get("cache_read_input_tokens") or 0
+    written = usage.get("cache_creation_input_tokens") or 0
+    return int(read), int(written)
+
+
+def print_result(
+    result: dict[str, Any],
+    model: str,
+    reasoning_effort: str,
+    show_response: bool = True,
+) -> int:
+    """
+    Print the RESPONSE and METADATA sections for a finished session.
+    Pass show_response=False when the response was already streamed.
+    """
+
+    if result.get("status") != "completed":
+        print(f"\nSession ended with status: {result.get('status')}")
+        if "error" in result:
+            print(f"Error: {result['error']}")
+        return 1
+
+    if show_response:
+        print("\n" + "=" * 80)
+        print("RESPONSE:")
+        print("=" * 80)
+        print(result.get("output", "No output available"))
+        print("=" * 80)
+
+    # Print metadata section (model, reasoning effort, tokens, cost)
+    print("\n" + "=" * 80)
+    print("METADATA:")
+    print("=" * 80)
+
+    # Model info
+    print(f"model: {result.get('model', model)}")
+    print(f"reasoning_effort: {result.get('reasoning_effort', reasoning_effort)}")
+    if result.get("cached"):
+        print(f"cached_from: {result['cached']['session']}")
+    hedge = result.get("hedge") or {}
+    for attempt in hedge.get("attempts", []):
+        if attempt.get("outcome") == "won" and attempt.get("role") == "fallback":
+            print(f"answered_by: {attempt['model']} (hedge fallback)")
+
+    # Token usage and cost
+    usage = result.get("usage")
+    cost_info = result.get("cost_info")
+
+    if cost_info:
+        print(f"input_tokens: {cost_info.get('input_tokens', 0)}")
+        print(f"output_tokens: {cost_info.get('output_tokens', 0)}")
+        print(
+            f"total_tokens: {cost_info.get('input_tokens', 0) + cost_info.get('output_tokens', 0)}"
+        )
+        print(f"input_cost_usd: {cost_info.get('input_cost', 0):.6f}")
+        print(f"output_cost_usd: {cost_info.get('output_cost', 0):.6f}")
+        print(f"total_cost_usd: {cost_info.get('total_cost', 0):.6f}")
+    elif usage:
+        input_tokens = usage.get("prompt_tokens") or usage.get("input_tokens", 0)
+        output_tokens = usage.get("completion_tokens") or usage.get("output_tokens", 0)
+        print(f"input_tokens: {input_tokens}")
+        print(f"output_tokens: {output_tokens}")
+        print(f"total_tokens: {input_tokens + output_tokens}")
+
+    # Input served from the provider's prompt cache (billed at a discount)
+    if usage:
+        cache_read, cache_written = cache_token_counts(usage)
+        print(f"cached_input_tokens: {cache_read}")
+        if cache_written:
+            print(f"cache_write_tokens: {cache_written}")
+
+    print("=" * 80)
+
+    return 0
+
+
+def handle_invocation(args: argparse.Namespace) -> int:
+    """
+    Handle main invocation command.
+
+    With several --model values (council mode), files are processed and the
+    prompt is built once, then one session per model runs concurrently.
+    If the consultant daemon is running, preparation and session start-up
+    are delegated to it and this process only waits for the results.
+    """
 
-    # Initialize components
     session_mgr = SessionManager()
+    wait = session_mgr.wait_for_completion
+
+    exit_code, sessions = submit_to_daemon(args)
+    if exit_code is None:
+        exit_code, sessions = start_sessions(args, session_mgr)
+    else:
+        wait = daemon_waiter(session_mgr)
+    if exit_code != 0:
+        return exit_code
+
+    return await_sessions(session_mgr, sessions, args, wait)
+
+
+def daemon_waiter(
+    session_mgr: SessionManager,
+) -> Callable[[str], dict[str, Any]]:
+    """
+    Wait through the daemon, which is notified directly when its workers
+    finish. Falls back to polling metadata if the daemon goes away.
+    """
+
+    from daemon_client import DaemonClient
+
+    daemon = DaemonClient()
+
+    def wait(session_id: str) -> dict[str, Any]:
+        result: dict[str, Any]
+        try:
+            result = daemon.wait_for_completion(session_id)
+        except TimeoutError:
+            raise
+        except (OSError, RuntimeError, ValueError):
+            result = session_mgr.wait_for_completion(session_id)
+        return result
+
+    return wait
+
+
+def submit_to_daemon(
+    args: argparse.Namespace,
+) -> tuple[int | None, list[tuple[str, str]]]:
+    """
+    Submit the consultation to a running daemon.
+    Returns (None, []) when no daemon is available or --no-daemon is set.
+    """
+
+    if args.no_daemon:
+        return None, []
+
+    from daemon_client import DaemonClient
+
+    daemon = DaemonClient()
+    if not daemon.is_running():
+        return None, []
+
+    print(f"Submitting to consultant daemon at {daemon.socket_path}")
+    result = daemon.submit(
+        {
+            "prompt": args.prompt,
+            "slug": args.slug,
+            "files": [str(Path(f).resolve()) for f in args.files or []],
+            "models": args.models or [],
+            "base_url": resolve_base_url(args),
+            "api_key": args.api_key,
+            "reasoning_effort": args.reasoning_effort,
+            "stream": args.stream,
+            "pack": args.pack,
+            "priorities": args.priorities or [],
+            "map_reduce": args.map_reduce,
+            "include": args.include or [],
+            "exclude": args.exclude or [],
+            "max_file_size": args.max_file_size,
+            "diff": args.diff,
+            "diff_context": args.diff_context,
+            "diff_full_files": args.diff_full_files,
+            # git runs in the daemon, against this process's repository
+            "diff_dir": str(Path.cwd()),
+            "cache": use_response_cache(args),
+            "deadline": args.deadline,
+            "hedge_model": args.hedge_model,
+            "hedge_after": args.hedge_after,
+        }
+    )
+
+    # Replay the daemon-side preparation log (file summary, token usage, ...)
+    print(result["log"], end="")
+    sessions = [(model, session_id) for model, session_id in result["sessions"]]
+    return int(result["exit_code"]), sessions
+
+
+def start_sessions(
+    args: argparse.Namespace, session_mgr: SessionManager
+) -> tuple[int, list[tuple[str, str]]]:
+    """
+    Process files, validate the request and start one session per model.
+    Returns (exit_code, [(model, session_id), ...]).
+    """
+
+    from conversion_cache import ConversionCache
+    from file_handler import (
+        FileHandler,
+        attachment_digests,
+        build_image_content,
+        build_prompt_segments,
+        count_image_tokens,
+        has_images,
+        validate_vision_support,
+    )
+    from image_pipeline import limits_for_models
+    from litellm_client import LiteLLMClient
+    from token_cache import TokenCache
+
+    models: list[str] = list(dict.fromkeys(args.models or [DEFAULT_MODEL]))
+    council = len(models) > 1
+
+    # A hedge's fallback model is validated along with the models
+    hedge_model: str | None = args.hedge_model
+    if hedge_model in models:
+        print("ERROR: --hedge-model must differ from --model", file=sys.stderr)
+        return 1, []
+    checked = models + ([hedge_model] if hedge_model else [])
+
+    base_url = resolve_base_url(args)
+
+    # Initialize components
     client = LiteLLMClient(base_url=base_url, api_key=args.api_key)
 
     # Process files using FileHandler
-    file_handler = FileHandler()
+    # Images are downscaled to the largest resolution any of the models uses
+    file_handler = FileHandler(
+        cache=ConversionCache(), image_limits=limits_for_models(models)
+    )
     processed_files = []
-    multimodal_content = None
-
-    if args.files:
-        processed_files, file_errors = file_handler.process_files(args.files)
+    image_content = None
+
+    if args.files or args.diff:
+        try:
+            paths = expand_attachments(args)
+            changes = diff_files(args) if args.diff else []
+        except ValueError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return 1, []
+        processed_files, file_errors = file_handler.process_files(paths)
+        processed_files += changes
 
         # If any files failed, report errors and exit
         if file_errors:
@@ -115,11 +585,12 @@ def handle_invocation(args: argparse.Namespace) -> int:
                 "\nPlease fix or remove the problematic files and try again.",
                 file=sys.stderr,
             )
-            return 1
+            return 1, []
 
         # Validate vision support if images present
         if has_images(processed_files):
-            validate_vision_support(args.model, has_images=True)
+            for model in checked:
+                validate_vision_support(model, has_images=True)
 
         # Print file processing summary
         text_count = sum(1 for f in processed_files if f.category.value == "text")
@@ -130,127 +601,197 @@ def handle_invocation(args: argparse.Namespace) -> int:
         print(f"  - Text files: {text_count}")
         print(f"  - Office documents (converted): {office_count}")
         print(f"  - Images: {image_count}")
+        images = [f for f in processed_files if f.category.value == "image"]
+        if images:
+            distinct = {f.data_url for f in images}
+            duplicates = len(images) - len(distinct)
+            source_mb = sum(f.source_bytes for f in images) / (1024 * 1024)
+            # base64 carries 3 bytes in 4 characters
+            upload_mb = sum(len(url) * 3 / 4 for url in distinct) / (1024 * 1024)
+            print(
+                f"  - Image upload: {source_mb:.1f}MB on disk -> {upload_mb:.1f}MB "
+                f"after downscaling ({duplicates} duplicate(s) sent once)"
+            )
+        if file_handler.cache and (office_count or image_count):
+            print(f"  - Conversion cache: {file_handler.cache.stats()}")
 
-    # Log model being used
-    print(f"Using model: {args.model}")
+    # Log model(s) being used
+    print(f"Using model{'s' if council else ''}: {', '.join(models)}")
+    if hedge_model:
+        print(f"Hedging with {hedge_model} after {args.hedge_after:g}s without output")
 
     # Validate environment variables (only if no custom base URL)
     if not base_url:
-        env_status = client.validate_environment(args.model)
-        if not env_status.get("keys_in_environment", False):
-            missing = env_status.get("missing_keys", [])
-            error = env_status.get("error", "")
-
-            print(
-                f"\n❌ ERROR: Missing required environment variables for model '{args.model}'",
-                file=sys.stderr,
+        for model in checked:
+            if not check_environment(client, model):
+                return 1, []
+
+    token_cache = TokenCache()
+
+    # Build the prompt with reference files section as parts; sessions write
+    # them straight to disk, so the full prompt is never joined in memory.
+    # With --pack, attachments are trimmed to fit the context budget first.
+    # With --map-reduce, oversized attachments are split into shards instead
+    packing: list[PackedFile] = []
+    shards = None
+    if args.pack and processed_files:
+        try:
+            segments, packing = pack_context(
+                args, processed_files, models, client, token_cache
             )
-            print(f"\nMissing keys: {', '.join(missing)}", file=sys.stderr)
+        except ValueError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return 1, []
+    else:
+        segments = build_prompt_segments(args.prompt, processed_files)
+        if args.map_reduce and processed_files:
+            try:
+                shards = plan_map_reduce(
+                    args, segments, processed_files, models, client, token_cache
+                )
+            except ValueError as e:
+                print(f"ERROR: {e}", file=sys.stderr)
+                return 1, []
+    prompt_parts = [text for _, text in segments]
+    trimmed = [asdict(d) for d in packing if d.tier != "full"]
+
+    # Files sent in full, which follow-up turns need not attach again
+    not_sent = {d["path"] for d in trimmed}
+    attachments = (
+        None
+        if shards
+        else attachment_digests([f for f in processed_files if f.path not in not_sent])
+    )
 
-            if error:
-                print(f"\nDetails: {error}", file=sys.stderr)
+    # Image entries of the multimodal content, if we have images
+    if has_images(processed_files):
+        image_content = build_image_content(processed_files)
 
-            print("\n💡 To fix this:", file=sys.stderr)
-            print("   1. Set the required environment variable(s):", file=sys.stderr)
-            for key in missing:
-                print(f"      export {key}=your-api-key", file=sys.stderr)
-            print(
-                "   2. Or use --base-url to specify a custom LiteLLM endpoint",
-                file=sys.stderr,
+    # Check context limits on the full prompt for every model (shards were
+    # already sized to fit); the counts are charged to rate limits later
+    token_counts: dict[str, int] = {}
+    try:
+        for model in [] if shards else checked:
+            if council or model == hedge_model:
+                print(f"\n[{model}]", end="")
+            token_counts[model] = validate_context_size(
+                segments,
+                model,
+                client,
+                len(processed_files),
+                token_cache,
+                image_tokens=count_image_tokens(processed_files, model),
             )
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1, []
+    if processed_files:
+        print(f"Token count cache: {token_cache.stats()}")
+
+    # Create and start one session per model; they run concurrently
+    sessions: list[tuple[str, str]] = []
+    extra_metadata: dict[str, Any] = {}
+    if trimmed:
+        extra_metadata["context_packing"] = trimmed
+    if hedge_model:
+        extra_metadata["hedge"] = {
+            "model": hedge_model,
+            "after_seconds": args.hedge_after,
+            "token_estimate": token_counts.get(hedge_model),
+        }
+    for model in models:
+        slug = model_session_slug(args.slug, model) if council else args.slug
+        session_id = session_mgr.create_session(
+            slug=slug,
+            prompt=args.prompt if shards else prompt_parts,
+            model=model,
+            base_url=base_url,
+            api_key=args.api_key,
+            reasoning_effort=args.reasoning_effort,
+            image_content=None if shards else image_content,
+            stream=args.stream,
+            extra_metadata=extra_metadata or None,
+            shards=shards,
+            use_cache=use_response_cache(args),
+            attachments=attachments,
+            deadline=args.deadline,
+            token_estimate=token_counts.get(model),
+        )
+        sessions.append((model, session_id))
+
+        print(f"Session created: {session_id}")
+        cached = session_mgr.get_session_status(session_id).get("cached")
+        if cached:
             print(
-                "   3. Or use --model to specify a different model\n", file=sys.stderr
+                f"Served from response cache (stored {cached['stored_at']} "
+                f"by {cached['session']})"
             )
+        print(f"Reattach via: python3 {__file__} session {slug}")
 
-            return 1
+    return 0, sessions
 
-    # Build full prompt with reference files section
-    full_prompt = build_prompt_with_references(args.prompt, processed_files)
 
-    # Build multimodal content if we have images
-    if has_images(processed_files):
-        multimodal_content = build_multimodal_content(full_prompt, processed_files)
+def await_sessions(
+    session_mgr: SessionManager,
+    sessions: list[tuple[str, str]],
+    args: argparse.Namespace,
+    wait: Callable[[str], dict[str, Any]] | None = None,
+) -> int:
+    """Wait for started sessions and print their results"""
 
-    # Check context limits on the full prompt
-    try:
-        validate_context_size(full_prompt, args.model, client, len(processed_files))
-    except ValueError as e:
-        print(f"ERROR: {e}", file=sys.stderr)
-        return 1
+    wait = wait or session_mgr.wait_for_completion
 
-    # Create and start session
-    session_id = session_mgr.create_session(
-        slug=args.slug,
-        prompt=full_prompt,
-        model=args.model,
-        base_url=base_url,
-        api_key=args.api_key,
-        reasoning_effort=args.reasoning_effort,
-        multimodal_content=multimodal_content,
-    )
+    council = len(sessions) > 1
 
-    print(f"Session created: {session_id}")
-    print(f"Reattach via: python3 {__file__} session {args.slug}")
     print("Waiting for completion...")
 
-    try:
-        result = session_mgr.wait_for_completion(session_id)
+    if args.stream and not council:
+        model, session_id = sessions[0]
+        return stream_session(session_mgr, session_id, model, args)
 
-        if result.get("status") == "completed":
-            print("\n" + "=" * 80)
-            print("RESPONSE:")
-            print("=" * 80)
-            print(result.get("output", "No output available"))
-            print("=" * 80)
-
-            # Print metadata section (model, reasoning effort, tokens, cost)
-            print("\n" + "=" * 80)
-            print("METADATA:")
-            print("=" * 80)
+    try:
+        # Sessions run in parallel, so waiting on each in turn costs only the
+        # duration of the slowest one
+        results = [(model, wait(session_id)) for model, session_id in sessions]
+    except TimeoutError as e:
+        print(f"\nERROR: {e}", file=sys.stderr)
+        return 1
 
-            # Model info
-            print(f"model: {result.get('model', args.model)}")
-            print(
-                f"reasoning_effort: {result.get('reasoning_effort', args.reasoning_effort)}"
-            )
+    exit_code = 0
+    for model, result in results:
+        if council:
+            print("\n" + "#" * 80)
+            print(f"MODEL: {model}")
+            print("#" * 80)
+        exit_code |= print_result(result, model, args.reasoning_effort)
 
-            # Token usage and cost
-            usage = result.get("usage")
-            cost_info = result.get("cost_info")
+    return exit_code
 
-            if cost_info:
-                print(f"input_tokens: {cost_info.get('input_tokens', 0)}")
-                print(f"output_tokens: {cost_info.get('output_tokens', 0)}")
-                print(
-                    f"total_tokens: {cost_info.get('input_tokens', 0) + cost_info.get('output_tokens', 0)}"
-                )
-                print(f"input_cost_usd: {cost_info.get('input_cost', 0):.6f}")
-                print(f"output_cost_usd: {cost_info.get('output_cost', 0):.6f}")
-                print(f"total_cost_usd: {cost_info.get('total_cost', 0):.6f}")
-            elif usage:
-                input_tokens = usage.get("prompt_tokens") or usage.get(
-                    "input_tokens", 0
-                )
-                output_tokens = usage.get("completion_tokens") or usage.get(
-                    "output_tokens", 0
-                )
-                print(f"input_tokens: {input_tokens}")
-                print(f"output_tokens: {output_tokens}")
-                print(f"total_tokens: {input_tokens + output_tokens}")
 
-            print("=" * 80)
+def stream_session(
+    session_mgr: SessionManager,
+    session_id: str,
+    model: str,
+    args: argparse.Namespace,
+) -> int:
+    """Print the response as it streams in, then the METADATA section"""
 
-            return 0
-        else:
-            print(f"\nSession ended with status: {result.get('status')}")
-            if "error" in result:
-                print(f"Error: {result['error']}")
-            return 1
+    print("\n" + "=" * 80)
+    print("RESPONSE:")
+    print("=" * 80)
+    for chunk in session_mgr.follow_output(session_id):
+        print(chunk, end="", flush=True)
 
+    try:
+        result = session_mgr.wait_for_completion(session_id)
     except TimeoutError as e:
         print(f"\nERROR: {e}", file=sys.stderr)
         return 1
 
+    if result.get("status") == "completed":
+        print("\n" + "=" * 80)
+    return print_result(result, model, args.reasoning_effort, show_response=False)
+
 
 def handle_session_status(args: argparse.Namespace) -> int:
     """Handle session status check"""
@@ -262,28 +803,198 @@ def handle_session_status(args: argparse.Namespace) -> int:
         print(f"ERROR: {status['error']}", file=sys.stderr)
         return 1
 
+    if args.follow and "id" in status:
+        # Tail output.txt until the session finishes, then show final status
+        for chunk in session_mgr.follow_output(status["id"]):
+            print(chunk, end="", flush=True)
+        print()
+        status = session_mgr.get_session_status(args.slug)
+        status.pop("output", None)
+
     # Pretty print status
     print(json.dumps(status, indent=2))
     return 0
 
 
+def handle_retry(args: argparse.Namespace) -> int:
+    """Handle retry command: rerun a failed session and wait for it"""
+
+    session_mgr = SessionManager()
+    try:
+        session_id = session_mgr.retry_session(
+            args.slug, api_key=args.api_key, deadline=args.deadline
+        )
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+
+    metadata = session_mgr.get_session_status(session_id)
+    shards = metadata.get("map_reduce", {}).get("shards")
+    print(f"Retrying session: {session_id}")
+    if shards:
+        print(f"Map-reduce session with {shards} parts; completed parts are reused")
+
+    # Print the result the way the original invocation would have
+    original = argparse.Namespace(
+        stream=metadata.get("stream", False),
+        reasoning_effort=metadata.get("reasoning_effort", "xhigh"),
+    )
+    return await_sessions(session_mgr, [(metadata["model"], session_id)], original)
+
+
+def handle_followup(args: argparse.Namespace) -> int:
+    """
+    Handle followup command: ask a further question in a finished session's
+    conversation, attaching only files that are new or changed since
+    """
+
+    from conversion_cache import ConversionCache
+    from file_handler import (
+        FileHandler,
+        attachment_digests,
+        build_image_content,
+        build_prompt_segments,
+        count_image_tokens,
+        has_images,
+        validate_vision_support,
+    )
+    from image_pipeline import limits_for_models
+    from litellm_client import LiteLLMClient
+    from token_cache import TokenCache
+
+    session_mgr = SessionManager()
+    parent = session_mgr.get_session_status(args.slug)
+    if "id" not in parent:
+        print(f"ERROR: {parent.get('error')}", file=sys.stderr)
+        return 1
+    if parent.get("status") != "completed":
+        print(
+            f"ERROR: Session {parent['id']} is {parent.get('status')}; "
+            "only completed sessions can be followed up",
+            file=sys.stderr,
+        )
+        return 1
+    if parent.get("map_reduce"):
+        print(
+            "ERROR: Map-reduce sessions cannot be followed up; start a new "
+            "consultation instead",
+            file=sys.stderr,
+        )
+        return 1
+
+    model: str = parent["model"]
+    base_url: str | None = parent.get("base_url")
+    reasoning_effort = args.reasoning_effort or parent.get("reasoning_effort", "xhigh")
+    client = LiteLLMClient(base_url=base_url, api_key=args.api_key)
+
+    # Attach only files the conversation has not seen in this exact version
+    sent = session_mgr.conversation_attachments(parent["id"])
+    new_files = []
+    if args.files:
+        file_handler = FileHandler(
+            cache=ConversionCache(), image_limits=limits_for_models([model])
+        )
+        try:
+            paths = expand_attachments(args)
+        except ValueError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return 1
+        processed_files, file_errors = file_handler.process_files(paths)
+        if file_errors:
+            print("\nERROR: Some files could not be processed:", file=sys.stderr)
+            for err in file_errors:
+                print(f"  - {err.path}: {err.reason}", file=sys.stderr)
+            return 1
+        if has_images(processed_files):
+            validate_vision_support(model, has_images=True)
+
+        digests = attachment_digests(processed_files)
+        new_files = [f for f in processed_files if sent.get(f.path) != digests[f.path]]
+        changed = sum(1 for f in new_files if f.path in sent)
+        print(
+            f"\n📎 Attaching {len(new_files) - changed} new and {changed} changed "
+            f"file(s); {len(processed_files) - len(new_files)} unchanged file(s) "
+            "are already in the conversation"
+        )
+        for file in new_files:
+            if file.path in sent:
+                file.path = f"{file.path} (updated)"
+        attachments = {
+            path: digests[path] for path in digests if sent.get(path) != digests[path]
+        }
+    else:
+        attachments = {}
+
+    if not base_url and not check_environment(client, model):
+        return 1
+
+    segments = build_prompt_segments(args.prompt, new_files)
+    try:
+        print(f"\nTurn {len(session_mgr.conversation(parent['id'])) + 1}", end="")
+        token_count = validate_context_size(
+            segments,
+            model,
+            client,
+            len(new_files),
+            TokenCache(),
+            image_tokens=count_image_tokens(new_files, model),
+        )
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+
+    session_id = session_mgr.create_session(
+        slug=parent["slug"],
+        prompt=[text for _, text in segments],
+        model=model,
+        base_url=base_url,
+        api_key=args.api_key,
+        reasoning_effort=reasoning_effort,
+        image_content=build_image_content(new_files) or None,
+        stream=args.stream,
+        extra_metadata={"followup": {"parent": parent["id"]}},
+        attachments=attachments,
+        deadline=args.deadline,
+        token_estimate=token_count,
+    )
+    print(f"Follow-up session created: {session_id}")
+    print(f"Reattach via: python3 {__file__} session {parent['slug']}")
+
+    turn = argparse.Namespace(stream=args.stream, reasoning_effort=reasoning_effort)
+    return await_sessions(session_mgr, [(model, session_id)], turn)
+
+
 def handle_list_sessions(args: argparse.Namespace) -> int:
     """Handle list sessions command"""
 
     session_mgr = SessionManager()
-    sessions = session_mgr.list_sessions()
+    sessions, total = session_mgr.query_sessions(
+        status=args.status,
+        model=args.model,
+        since=args.since,
+        limit=args.limit or None,
+        offset=args.offset,
+    )
 
     if not sessions:
         print("No sessions found.")
         return 0
 
-    print(f"\nFound {len(sessions)} session(s):\n")
+    if len(sessions) < total:
+        first = args.offset + 1
+        print(
+            f"\nShowing {first}-{args.offset + len(sessions)} of {total} session(s) "
+            f"(use --offset/--limit for more):\n"
+        )
+    else:
+        print(f"\nFound {total} session(s):\n")
     for s in sessions:
         status_icon = {
             "running": "🔄",
             "completed": "✅",
             "error": "❌",
             "calling_llm": "📞",
+            "polling": "⏳",
         }.get(s.get("status", ""), "❓")
 
         print(
@@ -301,20 +1012,55 @@ def handle_list_sessions(args: argparse.Namespace) -> int:
 def handle_list_models(args: argparse.Namespace) -> int:
     """Handle list models command"""
 
-    # Determine base URL: --base-url flag > OPENAI_BASE_URL env var > None
-    base_url = args.base_url
-    if not base_url:
-        base_url = config.get_base_url()
-        if base_url:
-            print(f"Using base URL from OPENAI_BASE_URL: {base_url}")
+    from model_selector import ModelSelector
+
+    base_url = resolve_base_url(args)
 
-    LiteLLMClient(base_url=base_url)
     models = ModelSelector.list_models(base_url)
 
     print(json.dumps(models, indent=2))
     return 0
 
 
+def handle_batch(args: argparse.Namespace) -> int:
+    """Handle batch command: run consultations from a JSONL file"""
+
+    from batch import run_batch
+
+    input_path = Path(args.input)
+    if not input_path.is_file():
+        print(f"ERROR: Batch input not found: {input_path}", file=sys.stderr)
+        return 1
+
+    output_path = (
+        Path(args.output)
+        if args.output
+        else input_path.with_name(f"{input_path.stem}.results.jsonl")
+    )
+
+    exit_code: int = run_batch(
+        input_path,
+        output_path,
+        default_model=args.model or DEFAULT_MODEL,
+        concurrency=args.concurrency,
+        base_url=resolve_base_url(args),
+        api_key=args.api_key,
+        use_cache=use_response_cache(args),
+        deadline=args.deadline,
+    )
+    return exit_code
+
+
+def handle_daemon(args: argparse.Namespace) -> int:
+    """Handle daemon command: run the consultant daemon in the foreground"""
+
+    import daemon
+
+    socket_path = Path(args.socket) if args.socket else config.DAEMON_SOCKET_PATH
+    daemon.serve(socket_path)
+    return 0
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(
         description="""
@@ -351,28 +1097,71 @@ EXAMPLES:
   Multiple files:
     %(prog)s -p "Analyze architecture" -f src/api.py -f src/db.py -f src/models.py -s arch-review
 
+  A directory (honours .gitignore, skips binaries) and a glob:
+    %(prog)s -p "Review the API layer" -f src/api/ -f 'tests/**/test_api*.py' --exclude '*_pb2.py' -s api-review
+
+  Review a branch from its changes only, with small touched files in full:
+    %(prog)s -p "Review this change" --diff main...HEAD --diff-full-files -s pr-review
+
   Specify model explicitly:
     %(prog)s -p "Security audit" -f auth.py -s security -m claude-3-5-sonnet-20241022
 
+  Consult several models at once (files processed once, models run concurrently):
+    %(prog)s -p "Review design" -f design.md -s council -m gpt-5.2-pro -m claude-opus-4-5
+
   Use custom LiteLLM proxy:
     %(prog)s -p "Code review" -f app.py -s review --base-url http://localhost:8000
 
   Lower reasoning effort (faster, cheaper):
     %(prog)s -p "Quick check" -f code.py -s quick --reasoning-effort low
 
+  Stream the response as it is generated:
+    %(prog)s -p "Quick check" -f code.py -s quick --stream
+
   Check session status:
     %(prog)s session my-review
 
+  Split attachments too large for one context window into parts:
+    %(prog)s -p "Find security issues" -f dump.sql -f app.log -s audit --map-reduce
+
+  Reuse the response of an identical earlier run (e.g. a retried CI job):
+    %(prog)s -p "Review this change" --diff origin/main...HEAD -s ci-review --cache
+
+  Give up (cancelling any background job) unless answered within 15 minutes:
+    %(prog)s -p "Review this change" --diff main...HEAD -s pr-review --deadline 15m
+
+  Also ask a fallback model if the first has produced no output after 2 minutes:
+    %(prog)s -p "Review this change" -f app.py -s review --hedge-model claude-opus-4-5 --hedge-after 2m
+
+  Ask a follow-up question, sending only files changed since:
+    %(prog)s followup my-review -p "Is the fix in auth.py right?" -f src/auth.py
+
+  Rerun a failed session:
+    %(prog)s retry audit
+
+  Follow a running session's output from another terminal:
+    %(prog)s session my-review --follow
+
   List all sessions:
     %(prog)s list
 
   List available models from proxy:
     %(prog)s models --base-url http://localhost:8000
 
+  Run a JSONL batch of consultations, 8 at a time:
+    %(prog)s batch jobs.jsonl -o results.jsonl -j 8
+
+  Run the warm daemon (later invocations hand off to it automatically):
+    %(prog)s daemon
+
 SUBCOMMANDS:
   session <slug>    Check status of a session by its slug
+  followup <slug>   Continue a finished session with a new question
+  retry <slug>      Rerun a failed session (only failed parts of map-reduce)
   list              List all sessions with their status
   models            List available models (from proxy or known models)
+  batch <file>      Run consultations from a JSONL file concurrently
+  daemon            Run the consultant daemon in the foreground
 
 For more information, see the consultant plugin documentation.
 """,
@@ -397,11 +1186,69 @@ For more information, see the consultant plugin documentation.
         action="append",
         dest="files",
         metavar="PATH",
-        help="""File to attach for analysis. Can be specified multiple times
-                to attach multiple files. Each file's contents will be included
-                in the prompt sent to the LLM. Supports any text file format.
-                Example: -f src/main.py -f src/utils.py -f README.md""",
+        help="""File, directory or glob to attach for analysis. Can be specified
+                multiple times. Each file's contents will be included in the
+                prompt sent to the LLM. Directories are walked recursively and
+                globs expanded ('**' for any depth; quote them), skipping
+                .gitignore'd paths, binary files and files over
+                --max-file-size. Example: -f src/ -f 'docs/**/*.md' -f README.md""",
+    )
+    parser.add_argument(
+        "--include",
+        action="append",
+        metavar="GLOB",
+        help="""Only attach files from directories/globs that match GLOB (relative
+                path, or file name for patterns without '/'). Can be specified
+                multiple times. Images and office documents found in
+                directories are only attached when an --include names them.
+                Files given by exact path are never filtered.""",
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        metavar="GLOB",
+        help="""Skip files from directories/globs that match GLOB (same matching
+                as --include). Can be specified multiple times.
+                Example: --exclude '*_test.py' --exclude 'vendor/*'""",
+    )
+    parser.add_argument(
+        "--max-file-size",
+        type=parse_size,
+        default=config.EXPAND_MAX_FILE_BYTES,
+        metavar="SIZE",
+        help=f"""Skip files from directories/globs larger than SIZE (e.g. 512K,
+                2M; default: {config.EXPAND_MAX_FILE_BYTES // 1024}K)""",
+    )
+    parser.add_argument(
+        "--diff",
+        metavar="BASE..HEAD",
+        help="""Attach the changes in a local git revision range instead of
+                whole files: one attachment per changed file with its hunks.
+                BASE...HEAD diffs against the merge base; a single revision
+                compares it with the working tree. Can be combined with -f.
+                Example: --diff main..HEAD""",
     )
+    parser.add_argument(
+        "--diff-context",
+        type=int,
+        default=config.DIFF_CONTEXT_LINES,
+        metavar="LINES",
+        help=f"""Lines of unchanged context around each --diff hunk
+                (default: {config.DIFF_CONTEXT_LINES})""",
+    )
+    parser.add_argument(
+        "--diff-full-files",
+        nargs="?",
+        type=parse_size,
+        const=config.DIFF_FULL_FILE_MAX_BYTES,
+        metavar="SIZE",
+        help=f"""Also attach the full text (at HEAD) of touched files up to SIZE
+                (default: {config.DIFF_FULL_FILE_MAX_BYTES // 1024}K); larger
+                files are only represented by their hunks""",
+    )
+    # Directory git runs in for --diff; set by the CLI when handing off to
+    # the daemon
+    parser.set_defaults(diff_dir=None)
     parser.add_argument(
         "-s",
         "--slug",
@@ -413,10 +1260,14 @@ For more information, see the consultant plugin documentation.
     parser.add_argument(
         "-m",
         "--model",
+        action="append",
+        dest="models",
         metavar="MODEL_ID",
-        default="gpt-5.2-pro",
-        help="""Specific LLM model to use. Default: gpt-5.2-pro. Examples:
+        help=f"""Specific LLM model to use. Default: {DEFAULT_MODEL}. Examples:
                 "gpt-5.2", "claude-opus-4-5", "gemini/gemini-2.5-flash".
+                Can be specified multiple times to consult several models
+                concurrently on identical input (council mode); each model
+                gets its own session named <slug>-<model>.
                 Use the "models" subcommand to see available models.""",
     )
     parser.add_argument(
@@ -434,6 +1285,92 @@ For more information, see the consultant plugin documentation.
                 for keys in environment variables: LITELLM_API_KEY, OPENAI_API_KEY,
                 or ANTHROPIC_API_KEY (in that order).""",
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="""Stream the response as it is generated. Text is printed to stdout
+                and appended to the session's output.txt as it arrives, so it
+                can also be tailed with "session <slug> --follow". In council
+                mode each session streams to its own output.txt.""",
+    )
+    parser.add_argument(
+        "--pack",
+        action="store_true",
+        help="""Fit attachments into the context budget instead of failing when
+                they are too large. Files are demoted from full text to an
+                outline (signatures only) to omitted, lowest --priority and
+                largest first, and the trimmed files are reported.""",
+    )
+    parser.add_argument(
+        "--priority",
+        action="append",
+        dest="priorities",
+        metavar="GLOB=N",
+        help="""Packing priority for files matching GLOB (default 0; higher is
+                kept longer). Can be specified multiple times; the last
+                matching pattern wins. Example: --priority 'src/core/*=10'
+                --priority '*_test.py=-5'. Only used with --pack.""",
+    )
+    parser.add_argument(
+        "--map-reduce",
+        action="store_true",
+        help="""When attachments do not fit the context window, split them into
+                context-sized parts, consult the model on each part
+                concurrently and merge the findings in a final call. Each part
+                is recorded in the session, so "retry <slug>" reruns only the
+                parts that failed. Cannot be combined with --pack.""",
+    )
+    cache_group = parser.add_mutually_exclusive_group()
+    cache_group.add_argument(
+        "--cache",
+        action="store_true",
+        default=None,
+        help=f"""Serve an identical earlier consultation (same prompt, files,
+                images, model, base URL and reasoning effort) from the response
+                cache instead of calling the model, and cache this one.
+                Entries expire after {config.RESPONSE_CACHE_TTL // 86400} days.
+                On by default when {config.ENV_RESPONSE_CACHE}=1.""",
+    )
+    cache_group.add_argument(
+        "--no-cache",
+        action="store_false",
+        dest="cache",
+        help=f"Bypass the response cache even if {config.ENV_RESPONSE_CACHE} is set",
+    )
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="""Run in this process even if the consultant daemon is running.
+                By default, when a daemon is listening (see the "daemon"
+                subcommand), the request is handed to it and this process only
+                waits for the results.""",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=parse_duration,
+        metavar="DURATION",
+        help="""End-to-end time budget, e.g. 90s, 15m or 1h. Requests
+                time out when it runs out, a background job still running then
+                is cancelled, and no retry starts that could not finish in
+                time (judged by how long similar consultations took).""",
+    )
+    parser.add_argument(
+        "--hedge-model",
+        metavar="MODEL",
+        help="""Fallback model (e.g. another provider) asked as well when the
+                model has produced no output after --hedge-after, or fails.
+                The first answer wins and the other request is abandoned
+                (cancelled where the API allows it). Both attempts are
+                recorded in the session metadata.""",
+    )
+    parser.add_argument(
+        "--hedge-after",
+        type=parse_duration,
+        default=config.HEDGE_AFTER_SECONDS,
+        metavar="DURATION",
+        help=f"""How long to wait for output before asking the --hedge-model,
+                e.g. 90s or 2m (default: {config.HEDGE_AFTER_SECONDS}s)""",
+    )
     parser.add_argument(
         "--reasoning-effort",
         choices=["low", "medium", "high", "xhigh"],
@@ -454,14 +1391,126 @@ For more information, see the consultant plugin documentation.
     session_parser.add_argument(
         "slug", help="Session slug/identifier to check (the value passed to -s/--slug)"
     )
+    session_parser.add_argument(
+        "--follow",
+        action="store_true",
+        help="""Print the session's output as it grows until the session finishes,
+                then print its final status. Most useful with sessions started
+                with --stream.""",
+    )
+
+    # Retry subcommand
+    retry_parser = subparsers.add_parser(
+        "retry",
+        help="Rerun a failed session",
+        description="""Rerun a failed session in place with its original model and
+                       settings, then wait for it like a normal invocation.
+                       Map-reduce sessions rerun only the parts that failed,
+                       and background jobs resume where they stopped.""",
+    )
+    retry_parser.add_argument(
+        "slug", help="Session slug (or full session id) of the failed session"
+    )
+    retry_parser.add_argument(
+        "--api-key",
+        metavar="KEY",
+        help="""API key for the LLM provider (not stored with the session).
+                Defaults to the environment variables used by the main
+                invocation.""",
+    )
+    retry_parser.add_argument(
+        "--deadline",
+        type=parse_duration,
+        metavar="DURATION",
+        help="Time budget for the retry (the original deadline does not carry over)",
+    )
+
+    # Follow-up subcommand
+    followup_parser = subparsers.add_parser(
+        "followup",
+        help="Ask a follow-up question in a finished session's conversation",
+        description="""Continue a completed session with a new question, using
+                       the same model. Responses API models chain to the stored
+                       response (previous_response_id); other providers get the
+                       earlier turns rebuilt from the session directories. Only
+                       attachments that are new or changed since earlier turns
+                       are sent. The turn is a new session with the same slug,
+                       so the next followup continues from it.""",
+    )
+    followup_parser.add_argument(
+        "slug", help="Session slug (or full session id) to continue"
+    )
+    followup_parser.add_argument(
+        "-p", "--prompt", required=True, metavar="TEXT", help="The follow-up question"
+    )
+    followup_parser.add_argument(
+        "-f",
+        "--file",
+        action="append",
+        dest="files",
+        metavar="PATH",
+        help="""File, directory or glob to attach, as for the main invocation.
+                Files already sent in the conversation with the same content are
+                skipped; changed ones are sent again, marked "(updated)".""",
+    )
+    followup_parser.add_argument(
+        "--reasoning-effort",
+        choices=["low", "medium", "high", "xhigh"],
+        metavar="LEVEL",
+        help="Reasoning effort for this turn (default: the session's)",
+    )
+    followup_parser.add_argument(
+        "--stream", action="store_true", help="Stream the response as it is generated"
+    )
+    followup_parser.add_argument(
+        "--deadline",
+        type=parse_duration,
+        metavar="DURATION",
+        help="End-to-end time budget for this turn, as for the main invocation",
+    )
+    followup_parser.add_argument(
+        "--api-key",
+        metavar="KEY",
+        help="""API key for the LLM provider (not stored with the session).
+                Defaults to the environment variables used by the main
+                invocation.""",
+    )
+    followup_parser.set_defaults(
+        include=None, exclude=None, max_file_size=config.EXPAND_MAX_FILE_BYTES
+    )
 
     # List sessions subcommand
-    subparsers.add_parser(
+    list_parser = subparsers.add_parser(
         "list",
         help="List all consultation sessions",
-        description="""List all consultation sessions with their status.
+        description="""List consultation sessions with their status, newest first.
                        Shows session slug, status, creation time, model used, and any errors.""",
     )
+    list_parser.add_argument(
+        "--status",
+        choices=["running", "calling_llm", "polling", "completed", "error"],
+        help="Only list sessions with this status",
+    )
+    list_parser.add_argument(
+        "--model", metavar="MODEL", help="Only list sessions that used this model"
+    )
+    list_parser.add_argument(
+        "--since",
+        metavar="DATE",
+        help="Only list sessions created on or after this ISO date (e.g. 2025-01-31)",
+    )
+    list_parser.add_argument(
+        "--limit",
+        type=int,
+        default=50,
+        help="Maximum number of sessions to show (default: 50, 0 for all)",
+    )
+    list_parser.add_argument(
+        "--offset",
+        type=int,
+        default=0,
+        help="Number of matching sessions to skip (default: 0)",
+    )
 
     # List models subcommand
     models_parser = subparsers.add_parser(
@@ -477,24 +1526,124 @@ For more information, see the consultant plugin documentation.
         help="Base URL of LiteLLM proxy to query for available models",
     )
 
+    # Batch subcommand
+    batch_parser = subparsers.add_parser(
+        "batch",
+        help="Run many consultations from a JSONL file",
+        description="""Run consultations listed in a JSONL file, one JSON object per
+                       line: {"prompt": ..., "slug": ..., "files": [...],
+                       "model": ..., "effort": ...}. "prompt" and "slug" are
+                       required and slugs must be unique. Jobs run concurrently up
+                       to --concurrency, attachments shared between jobs are
+                       processed once, and one JSON result per job is appended to
+                       the output file as soon as that job finishes.""",
+    )
+    batch_parser.add_argument("input", help="Path to the JSONL batch file")
+    batch_parser.add_argument(
+        "-o",
+        "--output",
+        metavar="PATH",
+        help="JSONL file to append results to (default: <input>.results.jsonl)",
+    )
+    batch_parser.add_argument(
+        "-j",
+        "--concurrency",
+        type=int,
+        default=config.BATCH_CONCURRENCY,
+        metavar="N",
+        help=f"Maximum consultations running at once (default: {config.BATCH_CONCURRENCY})",
+    )
+    batch_parser.add_argument(
+        "-m",
+        "--model",
+        metavar="MODEL_ID",
+        help=f"Model for jobs that don't set one (default: {DEFAULT_MODEL})",
+    )
+    batch_parser.add_argument(
+        "--base-url",
+        metavar="URL",
+        help="Custom base URL for LiteLLM proxy server",
+    )
+    batch_parser.add_argument(
+        "--api-key",
+        metavar="KEY",
+        help="API key for the LLM provider",
+    )
+    batch_parser.add_argument(
+        "--deadline",
+        type=parse_duration,
+        metavar="DURATION",
+        help="Time budget for the whole batch; jobs still running then fail",
+    )
+    batch_cache_group = batch_parser.add_mutually_exclusive_group()
+    batch_cache_group.add_argument(
+        "--cache",
+        action="store_true",
+        default=None,
+        help="Serve identical earlier jobs from the response cache",
+    )
+    batch_cache_group.add_argument(
+        "--no-cache",
+        action="store_false",
+        dest="cache",
+        help=f"Bypass the response cache even if {config.ENV_RESPONSE_CACHE} is set",
+    )
+
+    # Daemon subcommand
+    daemon_parser = subparsers.add_parser(
+        "daemon",
+        help="Run the consultant daemon (keeps litellm warm)",
+        description="""Run a local daemon in the foreground that keeps litellm and
+                       markitdown loaded and starts sessions on behalf of the CLI.
+                       While it runs, consultations skip the import and start-up
+                       cost. It listens on a Unix socket only reachable by the
+                       current user and uses its own environment for provider
+                       API keys. Stop it with Ctrl-C.""",
+    )
+    daemon_parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        help=f"Unix socket path to listen on (default: {config.DAEMON_SOCKET_PATH})",
+    )
+
     args = parser.parse_args()
 
+    # The budget runs from now: from here on, --deadline is the epoch time
+    # by which the invocation has to finish
+    if getattr(args, "deadline", None):
+        args.deadline = time.time() + args.deadline
+
     # Handle commands
     if args.command == "session":
         return handle_session_status(args)
 
+    elif args.command == "retry":
+        return handle_retry(args)
+
+    elif args.command == "followup":
+        return handle_followup(args)
+
     elif args.command == "list":
         return handle_list_sessions(args)
 
     elif args.command == "models":
         return handle_list_models(args)
 
+    elif args.command == "batch":
+        return handle_batch(args)
+
+    elif args.command == "daemon":
+        return handle_daemon(args)
+
     else:
         # Main invocation
         if not args.prompt or not args.slug:
             parser.print_help()
             print("\nERROR: --prompt and --slug are required", file=sys.stderr)
             return 1
+        if args.pack and args.map_reduce:
+            print("ERROR: --pack and --map-reduce cannot be combined", file=sys.stderr)
+            return 1
 
         return handle_invocation(args)
 
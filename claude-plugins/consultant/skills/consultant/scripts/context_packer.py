@@ -0,0 +1,220 @@
+"""
+Budget-aware packing of reference files into the model's context.
+Demotes attachments from full text to an outline to omitted, lowest priority
+first, until the prompt fits the available token budget.
+"""
+
+import ast
+import dataclasses
+import fnmatch
+import re
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from file_handler import FileCategory, ProcessedFile, build_prompt_segments
+
+FULL = "full"
+OUTLINE = "outline"
+OMITTED = "omitted"
+
+# Lines kept in outlines of non-Python files: declarations and headings
+_DECLARATION = re.compile(
+    r"^\s*(?:export\s+|default\s+|pub(?:\(\w+\))?\s+|public\s+|private\s+"
+    r"|protected\s+|internal\s+|static\s+|abstract\s+|async\s+|final\s+)*"
+    r"(?:def|class|function|interface|type|enum|struct|trait|impl|fn|func"
+    r"|module|namespace|object|record)\b"
+    r"|^#{1,6}\s"
+)
+
+
+@dataclass
+class PackedFile:
+    """Packing decision for one reference file"""
+
+    path: str
+    priority: int
+    full_tokens: int
+    tier: str = FULL
+    tokens: int = 0  # tokens at the chosen tier
+
+    def describe(self) -> str:
+        if self.tier == FULL:
+            return f"{self.path}: full ({self.full_tokens:,} tokens)"
+        if self.tier == OUTLINE:
+            return (
+                f"{self.path}: outline ({self.full_tokens:,} -> {self.tokens:,} tokens)"
+            )
+        return f"{self.path}: omitted ({self.full_tokens:,} tokens)"
+
+
+def parse_priorities(specs: list[str]) -> list[tuple[str, int]]:
+    """
+    Parse --priority values of the form GLOB=N.
+
+    Raises:
+        ValueError: If a value is not GLOB=N with an integer N
+    """
+    priorities: list[tuple[str, int]] = []
+    for spec in specs:
+        pattern, sep, value = spec.rpartition("=")
+        try:
+            priority = int(value)
+        except ValueError:
+            priority = None
+        if not sep or not pattern or priority is None:
+            raise ValueError(f"Invalid priority '{spec}', expected GLOB=N")
+        priorities.append((pattern, priority))
+    return priorities
+
+
+def file_priority(path: str, priorities: list[tuple[str, int]]) -> int:
+    """Priority of a file; the last matching pattern wins, default 0"""
+    result = 0
+    for pattern, priority in priorities:
+        if fnmatch.fnmatch(path, pattern):
+            result = priority
+    return result
+
+
+def outline(file: ProcessedFile) -> str:
+    """
+    Signatures-only view of a file.
+
+    Python files keep class/function headers (with the first docstring line);
+    other files keep declaration lines and markdown headings.
+    """
+    if file.path.endswith((".py", ".pyi")) and file.category == FileCategory.TEXT:
+        try:
+            return _python_outline(file.content)
+        except (SyntaxError, ValueError):
+            pass
+    return "\n".join(
+        line.rstrip() for line in file.content.splitlines() if _DECLARATION.match(line)
+    )
+
+
+def _python_outline(source: str) -> str:
+    lines = source.splitlines()
+    nodes = sorted(
+        (
+            node
+            for node in ast.walk(ast.parse(source))
+            if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef))
+        ),
+        key=lambda node: node.lineno,
+    )
+
+    kept: list[str] = []
+    for node in nodes:
+        first = min([node.lineno, *(d.lineno for d in node.decorator_list)])
+        kept.extend(lines[first - 1 : node.body[0].lineno - 1])
+
+        indent = " " * (node.col_offset + 4)
+        docstring = ast.get_docstring(node)
+        if docstring:
+            kept.append(f'{indent}"""{docstring.splitlines()[0]}"""')
+        kept.append(f"{indent}...")
+
+    return "\n".join(kept)
+
+
+def pack_files(
+    prompt: str,
+    files: list[ProcessedFile],
+    budget: int,
+    priorities: list[tuple[str, int]],
+    count_tokens: Callable[[list[str]], list[int]],
+) -> tuple[list[tuple[ProcessedFile | None, str]], list[PackedFile]]:
+    """
+    Fit the reference files into budget tokens.
+
+    Files are demoted one tier at a time (full -> outline -> omitted),
+    lowest priority first and, within a priority, largest first, until the
+    whole prompt fits. An outline that is empty or no smaller than the file
+    skips straight to omitted. Images are never demoted.
+
+    Args:
+        prompt: The user's prompt
+        files: Processed attachments
+        budget: Token budget for the whole prompt
+        priorities: (glob, priority) pairs; higher priorities are kept longer
+        count_tokens: Counts tokens for a list of texts
+
+    Returns:
+        Tuple of (prompt segments after packing, decision per text file)
+    """
+    text_files = [f for f in files if f.category != FileCategory.IMAGE]
+    images = [f for f in files if f.category == FileCategory.IMAGE]
+
+    full_counts = count_tokens([f.content for f in text_files])
+    decisions = [
+        PackedFile(f.path, file_priority(f.path, priorities), n, tokens=n)
+        for f, n in zip(text_files, full_counts, strict=True)
+    ]
+    outlines: dict[int, str] = {}
+
+    def segments() -> list[tuple[ProcessedFile | None, str]]:
+        kept: list[ProcessedFile] = []
+        for index, (file, decision) in enumerate(
+            zip(text_files, decisions, strict=True)
+        ):
+            if decision.tier == FULL:
+                kept.append(file)
+            elif decision.tier == OUTLINE:
+                kept.append(
+                    dataclasses.replace(
+                        file,
+                        path=f"{file.path} (outline: signatures only)",
+                        content=outlines[index],
+                    )
+                )
+
+        omitted = [d.path for d in decisions if d.tier == OMITTED]
+        note = ""
+        if omitted:
+            note = (
+                f"\n\n*Note: {len(omitted)} reference file(s) omitted to fit "
+                "the context window:*\n"
+            ) + "".join(f"- {p}\n" for p in omitted)
+        packed: list[tuple[ProcessedFile | None, str]] = build_prompt_segments(
+            prompt, kept + images, note
+        )
+        return packed
+
+    def wrapper_tokens() -> int:
+        wrapper = "".join(text for file, text in segments() if file is None)
+        return count_tokens([wrapper])[0]
+
+    # The prompt, headings, outline labels and the note listing omitted files
+    # grow as files are demoted, so they are re-measured whenever the files
+    # alone would fit, and demotion goes on until the measured total does
+    wrapper, measured = wrapper_tokens(), True
+    while True:
+        if wrapper + sum(d.tokens for d in decisions) <= budget:
+            if measured:
+                break
+            wrapper, measured = wrapper_tokens(), True
+            continue
+
+        candidates = [
+            (d.priority, -d.tokens, -index)
+            for index, d in enumerate(decisions)
+            if d.tier != OMITTED
+        ]
+        if not candidates:
+            break  # Only the prompt itself is left; let validation report it
+
+        # Demote the lowest-priority, largest file still in the prompt (the
+        # one attached last on ties)
+        index = -min(candidates)[2]
+        decision = decisions[index]
+        measured = False
+        if decision.tier == FULL:
+            outlines[index] = outline(text_files[index])
+            outline_tokens = count_tokens([outlines[index]])[0]
+            if outlines[index] and outline_tokens < decision.tokens:
+                decision.tier, decision.tokens = OUTLINE, outline_tokens
+                continue
+        decision.tier, decision.tokens = OMITTED, 0
+
+    return segments(), decisions
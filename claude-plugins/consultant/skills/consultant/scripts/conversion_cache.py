@@ -0,0 +1,203 @@
+"""
+Content-addressed on-disk cache for file conversions.
+Stores markitdown output and image encodings keyed by a hash of the file
+content and the converter version, with LRU eviction under a size cap.
+"""
+
+import contextlib
+import fcntl
+import hashlib
+import os
+import tempfile
+import threading
+from collections.abc import Iterator
+from importlib import metadata
+from pathlib import Path
+
+import config
+
+# Bump when the image encoding output changes for identical input
+IMAGE_ENCODER_VERSION = "2"
+
+_HASH_CHUNK_BYTES = 1024 * 1024
+
+# File in a cache directory's root holding the running total of its entries,
+# and the lock file serializing updates to it across processes
+SIZE_FILE = "size"
+SIZE_LOCK_FILE = "size.lock"
+
+
+def converter_version(kind: str) -> str:
+    """Version string folded into cache keys for a conversion kind"""
+    if kind == "office":
+        try:
+            return f"markitdown-{metadata.version('markitdown')}"
+        except metadata.PackageNotFoundError:
+            return "markitdown-unknown"
+    return f"{kind}-{IMAGE_ENCODER_VERSION}"
+
+
+class CacheSize:
+    """
+    Running size of a cache directory, kept in SIZE_FILE, under a byte cap.
+
+    Writers report the bytes they add or remove, so the directory is only
+    scanned once the total passes max_bytes (or is unknown); the scan then
+    evicts the least recently used entries (by mtime) matching pattern and
+    records the real size. Updates hold an flock on SIZE_LOCK_FILE, so
+    threads and processes sharing the directory never lose each other's.
+    """
+
+    def __init__(self, cache_dir: Path, pattern: str, max_bytes: int) -> None:
+        self.cache_dir = cache_dir
+        self.pattern = pattern
+        self.max_bytes = max_bytes
+
+    def add(self, delta: int) -> None:
+        """Account for delta bytes written (negative: removed), evicting if over"""
+        with contextlib.suppress(OSError), self._locked():
+            total = self._read()
+            if total is not None:
+                total += delta
+            if total is None or total > self.max_bytes:
+                total = self._evict()
+            write_atomic(self.cache_dir / SIZE_FILE, str(max(total, 0)).encode())
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        fd = os.open(self.cache_dir / SIZE_LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)  # releases the lock
+
+    def _read(self) -> int | None:
+        try:
+            return int((self.cache_dir / SIZE_FILE).read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _evict(self) -> int:
+        """Delete least recently used entries until the cache fits max_bytes"""
+        entries: list[tuple[float, int, Path]] = []
+        total = 0
+        for entry in self.cache_dir.glob(self.pattern):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+            total += stat.st_size
+
+        if total <= self.max_bytes:
+            return total
+
+        for _, size, entry in sorted(entries):
+            with contextlib.suppress(OSError):
+                entry.unlink()
+                total -= size
+            if total <= self.max_bytes:
+                break
+        return total
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """
+    Replace path with data through a uniquely named temporary file, so
+    concurrent writers and readers never see a partially written file
+    """
+    fd, tmp_name = tempfile.mkstemp(
+        dir=path.parent, prefix=f"{path.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_name)
+        raise
+
+
+def file_size(path: Path) -> int:
+    """Size of a file, 0 if it does not exist"""
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+class ConversionCache:
+    """
+    Persistent cache of converted file content.
+
+    Entries are plain text files named by their key. Reading an entry
+    refreshes its mtime, and writes evict the least recently used entries
+    once the cache exceeds max_bytes (see CacheSize). Hit/miss counters
+    cover this instance.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path | None = None,
+        max_bytes: int = config.CONVERSION_CACHE_MAX_BYTES,
+    ) -> None:
+        self.cache_dir = cache_dir or config.CONVERSION_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._counter_lock = threading.Lock()
+        self._size = CacheSize(self.cache_dir, "*/*", max_bytes)
+
+    def key_for(self, path: Path, kind: str) -> str:
+        """Hash the file content together with the converter version"""
+        digest = hashlib.sha256(f"{kind}:{converter_version(kind)}\0".encode())
+        with path.open("rb") as f:
+            while chunk := f.read(_HASH_CHUNK_BYTES):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def key_for_bytes(self, data: bytes, kind: str) -> str:
+        """Hash in-memory content together with the converter version"""
+        digest = hashlib.sha256(f"{kind}:{converter_version(kind)}\0".encode())
+        digest.update(data)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """Return cached content for key, or None on a miss"""
+        entry = self._entry_path(key)
+        try:
+            content = entry.read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            with self._counter_lock:
+                self.misses += 1
+            return None
+
+        # Mark as recently used for LRU eviction
+        with contextlib.suppress(OSError):
+            os.utime(entry)
+        with self._counter_lock:
+            self.hits += 1
+        return content
+
+    def put(self, key: str, content: str) -> None:
+        """Store content under key, then evict old entries if over the cap"""
+        entry = self._entry_path(key)
+        data = content.encode("utf-8")
+        try:
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            replaced = file_size(entry)
+            write_atomic(entry, data)
+        except OSError:
+            # Caching is best-effort; a read-only home must not fail the run
+            return
+
+        self._size.add(len(data) - replaced)
+
+    def stats(self) -> str:
+        """Human-readable hit/miss summary"""
+        return f"{self.hits} hit(s), {self.misses} miss(es)"
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key
@@ -0,0 +1,172 @@
+"""
+Optional local consultant daemon.
+Keeps litellm and markitdown loaded and owns the SessionManager, so CLI
+invocations skip the cold start. Serves a small HTTP API over a Unix socket.
+"""
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+import orjson
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import Response, StreamingResponse
+
+import config
+from session_manager import SessionManager
+
+# Defaults for POST /consultations - mirrors the CLI's main invocation flags
+CONSULTATION_DEFAULTS: dict[str, Any] = {
+    "files": [],
+    "models": [],
+    "base_url": None,
+    "api_key": None,
+    "reasoning_effort": "xhigh",
+    "stream": False,
+    "pack": False,
+    "priorities": [],
+    "map_reduce": False,
+    "include": [],
+    "exclude": [],
+    "max_file_size": config.EXPAND_MAX_FILE_BYTES,
+    "diff": None,
+    "diff_context": config.DIFF_CONTEXT_LINES,
+    "diff_full_files": None,
+    "diff_dir": None,
+    "cache": False,
+    "deadline": None,
+    "hedge_model": None,
+    "hedge_after": config.HEDGE_AFTER_SECONDS,
+}
+
+
+def json_response(content: Any) -> Response:
+    """JSON response rendered with orjson"""
+    return Response(content=orjson.dumps(content), media_type="application/json")
+
+
+def warm_up() -> None:
+    """Import the heavy dependencies once so every request finds them loaded"""
+
+    import file_handler
+    import litellm_client  # noqa: F401  (imports litellm and loads model_cost)
+
+    file_handler.FileHandler()._markitdown  # noqa: B018
+
+
+def create_app(session_mgr: SessionManager | None = None) -> FastAPI:
+    """Build the daemon's FastAPI application"""
+
+    import consultant_cli
+
+    session_mgr = session_mgr or SessionManager()
+    app = FastAPI(title="consultant daemon")
+
+    # Preparation prints progress to stdout/stderr, which is captured per
+    # request and returned to the client; redirection is process-wide, so
+    # submissions are prepared one at a time. LLM calls still run
+    # concurrently in the session worker processes.
+    submit_lock = threading.Lock()
+
+    def health() -> Response:
+        return json_response({"status": "ok", "pid": os.getpid()})
+
+    def submit(body: dict[str, Any]) -> Response:
+        missing = [key for key in ("prompt", "slug") if not body.get(key)]
+        if missing:
+            raise HTTPException(status_code=422, detail=f"Missing fields: {missing}")
+
+        # Reap finished session workers
+        multiprocessing.active_children()
+
+        args = argparse.Namespace(**{**CONSULTATION_DEFAULTS, **body})
+        log = io.StringIO()
+
+        with (
+            submit_lock,
+            contextlib.redirect_stdout(log),
+            contextlib.redirect_stderr(log),
+        ):
+            try:
+                exit_code, sessions = consultant_cli.start_sessions(args, session_mgr)
+            except SystemExit as e:
+                # e.g. validate_vision_support exits on unsupported models
+                exit_code = e.code if isinstance(e.code, int) else 1
+                sessions = []
+            except Exception as e:
+                print(f"ERROR: {e}")
+                exit_code, sessions = 1, []
+
+        return json_response(
+            {"exit_code": exit_code, "log": log.getvalue(), "sessions": sessions}
+        )
+
+    def list_sessions(
+        status: str | None = None,
+        model: str | None = None,
+        since: str | None = None,
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> Response:
+        return json_response(
+            session_mgr.list_sessions(status, model, since, limit, offset)
+        )
+
+    def session_status(slug: str) -> Response:
+        status = session_mgr.get_session_status(slug)
+        if "error" in status and "No session found" in status["error"]:
+            raise HTTPException(status_code=404, detail=status["error"])
+        return json_response(status)
+
+    def wait_session(session_id: str, timeout: float | None = None) -> Response:
+        # Blocks on the worker's completion pipe, which only this process holds
+        if not (session_mgr.sessions_dir / session_id).is_dir():
+            raise HTTPException(status_code=404, detail=f"No session: {session_id}")
+        try:
+            return json_response(session_mgr.wait_for_completion(session_id, timeout))
+        except TimeoutError as e:
+            raise HTTPException(status_code=504, detail=str(e)) from e
+
+    def stream_session(session_id: str) -> StreamingResponse:
+        if not (session_mgr.sessions_dir / session_id).is_dir():
+            raise HTTPException(status_code=404, detail=f"No session: {session_id}")
+        return StreamingResponse(
+            session_mgr.follow_output(session_id), media_type="text/plain"
+        )
+
+    app.add_api_route("/health", health, methods=["GET"])
+    app.add_api_route("/consultations", submit, methods=["POST"])
+    app.add_api_route("/sessions", list_sessions, methods=["GET"])
+    app.add_api_route("/sessions/{slug}", session_status, methods=["GET"])
+    app.add_api_route("/sessions/{session_id}/stream", stream_session, methods=["GET"])
+    app.add_api_route("/sessions/{session_id}/wait", wait_session, methods=["GET"])
+
+    return app
+
+
+def serve(socket_path: Path | None = None) -> None:
+    """Run the daemon in the foreground until interrupted"""
+
+    import uvicorn
+
+    socket_path = socket_path or config.DAEMON_SOCKET_PATH
+
+    # uvicorn makes the socket world-writable, so access is restricted by
+    # keeping it in a directory only the current user can enter
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    socket_path.parent.chmod(0o700)
+    socket_path.unlink(missing_ok=True)
+
+    print("Loading litellm and markitdown...")
+    warm_up()
+
+    print(f"Consultant daemon listening on {socket_path} (pid {os.getpid()})")
+    try:
+        uvicorn.run(create_app(), uds=str(socket_path), log_level="warning")
+    finally:
+        socket_path.unlink(missing_ok=True)
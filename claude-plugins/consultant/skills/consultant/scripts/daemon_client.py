@@ -0,0 +1,105 @@
+"""
+Client for the consultant daemon.
+Uses only the standard library so that probing for the daemon stays cheap.
+"""
+
+import http.client
+import json
+import socket
+from pathlib import Path
+from typing import Any
+
+import config
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection over a Unix domain socket"""
+
+    def __init__(self, socket_path: Path, timeout: float | None) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(str(self.socket_path))
+        self.sock = sock
+
+
+class DaemonClient:
+    """Talks to a consultant daemon listening on a Unix socket"""
+
+    def __init__(self, socket_path: Path | None = None) -> None:
+        self.socket_path = socket_path or config.DAEMON_SOCKET_PATH
+
+    def is_running(self) -> bool:
+        """Check whether a daemon is listening and healthy"""
+
+        if not self.socket_path.exists():
+            return False
+
+        try:
+            health = self._request(
+                "GET", "/health", timeout=config.DAEMON_CONNECT_TIMEOUT
+            )
+        except (OSError, RuntimeError, ValueError):
+            return False
+        return bool(health.get("status") == "ok")
+
+    def submit(self, payload: dict[str, Any]) -> dict[str, Any]:
+        """
+        Submit a consultation.
+
+        Returns dict with 'exit_code', 'log' (the preparation output) and
+        'sessions' as [model, session_id] pairs.
+        """
+        result: dict[str, Any] = self._request(
+            "POST",
+            "/consultations",
+            body=payload,
+            timeout=config.DAEMON_SUBMIT_TIMEOUT,
+        )
+        return result
+
+    def wait_for_completion(
+        self, session_id: str, timeout: float | None = None
+    ) -> dict[str, Any]:
+        """
+        Block until the daemon reports the session finished. Without a
+        timeout, the daemon bounds the wait by the session's deadline.
+        """
+        if timeout is None:
+            path, request_timeout = f"/sessions/{session_id}/wait", None
+        else:
+            path = f"/sessions/{session_id}/wait?timeout={timeout}"
+            request_timeout = timeout + config.DAEMON_CONNECT_TIMEOUT + 30
+        result: dict[str, Any] = self._request("GET", path, timeout=request_timeout)
+        return result
+
+    def _request(
+        self,
+        method: str,
+        path: str,
+        body: dict[str, Any] | None = None,
+        timeout: float | None = 30,
+    ) -> Any:
+        """Send a JSON request and decode the JSON response"""
+
+        conn = UnixHTTPConnection(self.socket_path, timeout=timeout)
+        try:
+            headers = {"Content-Type": "application/json"}
+            data = json.dumps(body).encode() if body is not None else None
+            conn.request(method, path, body=data, headers=headers)
+            response = conn.getresponse()
+            payload = response.read()
+        finally:
+            conn.close()
+
+        if response.status == 504:
+            raise TimeoutError(json.loads(payload).get("detail", "Daemon timed out"))
+        if response.status >= 400:
+            raise RuntimeError(
+                f"Daemon returned {response.status} for {method} {path}: "
+                f"{payload.decode(errors='replace')}"
+            )
+        return json.loads(payload)
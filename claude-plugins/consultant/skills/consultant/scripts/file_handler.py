@@ -4,14 +4,51 @@ Categorizes and processes files: images, office documents, and text files.
 """
 
 import base64
+import codecs
+import hashlib
+import json
 import mimetypes
+import os
 import sys
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-from markitdown import MarkItDown
+from conversion_cache import ConversionCache
+from image_pipeline import (
+    ImageLimits,
+    estimate_image_tokens,
+    limits_for_models,
+    pillow_available,
+    prepare_image,
+)
+
+if TYPE_CHECKING:
+    from markitdown import MarkItDown
+
+
+# Separates the reference files from the question that follows them. The
+# files form a stable prefix that provider prompt caches reuse across
+# different questions about the same files.
+QUESTION_SEPARATOR = "\n\n" + "=" * 80 + "\n\n"
+
+
+class Prompt(str):
+    """
+    Prompt text that knows where its reference files prefix ends, as
+    recorded when the prompt was written out (prefix_chars, None if not
+    recorded). The question may contain QUESTION_SEPARATOR itself, so the
+    prefix cannot be found by searching the text.
+    """
+
+    prefix_chars: int | None
+
+    def __new__(cls, *args: Any, prefix_chars: int | None = None) -> "Prompt":
+        prompt = super().__new__(cls, *args)
+        prompt.prefix_chars = prefix_chars
+        return prompt
 
 
 class FileCategory(Enum):
@@ -29,8 +66,12 @@ class ProcessedFile:
     path: str
     category: FileCategory
     content: str = ""  # For text/office: the text content
-    base64_data: str = ""  # For images: base64 encoded data
-    mime_type: str = ""  # For images: the MIME type
+    # For images: the base64 data URL, the only in-memory copy of the image
+    data_url: str = ""
+    mime_type: str = ""  # For images: the MIME type (after re-encoding)
+    width: int = 0  # For images: pixels after downscaling (0 if unknown)
+    height: int = 0
+    source_bytes: int = 0  # For images: size of the file on disk
 
 
 @dataclass
@@ -45,15 +86,40 @@ class FileError:
 IMAGE_EXTENSIONS = frozenset({".png", ".jpg", ".jpeg", ".gif", ".webp"})
 OFFICE_EXTENSIONS = frozenset({".xls", ".xlsx", ".docx", ".pptx"})
 
-# Size limits
+# Size limits (images: after downscaling and re-encoding)
 MAX_IMAGE_SIZE_BYTES = 20 * 1024 * 1024  # 20MB
 
+# Text files are sniffed for binary content before being read in full
+BINARY_SNIFF_BYTES = 8192
+
+# Parallelism: file reads/decodes run on threads, markitdown conversions
+# (CPU-bound Python) run in worker processes
+MAX_IO_WORKERS = 16
+MAX_CONVERSION_WORKERS = os.cpu_count() or 1
+
 
 class FileHandler:
     """Main file processing coordinator"""
 
-    def __init__(self) -> None:
-        self._markitdown = MarkItDown()
+    def __init__(
+        self,
+        cache: ConversionCache | None = None,
+        image_limits: ImageLimits | None = None,
+    ) -> None:
+        self._markitdown_instance: MarkItDown | None = None
+        # Optional on-disk cache for office conversions and image encodings
+        self.cache = cache
+        # Resolution images are downscaled to (see limits_for_models())
+        self.image_limits = image_limits or limits_for_models([])
+
+    @property
+    def _markitdown(self) -> "MarkItDown":
+        """MarkItDown converter, created on first office document"""
+        if self._markitdown_instance is None:
+            from markitdown import MarkItDown
+
+            self._markitdown_instance = MarkItDown()
+        return self._markitdown_instance
 
     def process_files(
         self, file_paths: list[str]
@@ -61,40 +127,102 @@ class FileHandler:
         """
         Process a list of file paths and return categorized results.
 
+        Text and image files are read concurrently on a thread pool; when
+        several office documents are attached they are converted in parallel
+        worker processes. Results keep the order of file_paths.
+
         Returns:
             Tuple of (successfully processed files, errors)
         """
+        paths = [Path(file_path) for file_path in file_paths]
+        results: list[ProcessedFile | FileError | None] = [None] * len(paths)
+
+        office_indexes = [
+            i
+            for i, path in enumerate(paths)
+            if self._categorize(path) == FileCategory.OFFICE and path.is_file()
+        ]
+        # Worker processes only pay off for several documents and several CPUs
+        if len(office_indexes) < 2 or MAX_CONVERSION_WORKERS < 2:
+            office_indexes = []
+        converted = set(office_indexes)
+        io_indexes = [i for i in range(len(paths)) if i not in converted]
+
+        # Serve cached conversions here; only misses go to the workers
+        office_keys: dict[int, str | None] = {}
+        for i in office_indexes:
+            office_keys[i], results[i] = self._lookup_office(paths[i])
+        office_indexes = [i for i in office_indexes if results[i] is None]
+
+        conversion_pool = None
+        conversions: dict[int, Future[ProcessedFile | FileError]] = {}
+        if office_indexes:
+            # Submit conversions first: with the fork start method all workers
+            # are created on first submit, before any I/O threads exist
+            conversion_pool = ProcessPoolExecutor(
+                max_workers=min(len(office_indexes), MAX_CONVERSION_WORKERS)
+            )
+            conversions = {
+                i: conversion_pool.submit(_convert_office_file, str(paths[i]))
+                for i in office_indexes
+            }
+
+        try:
+            if len(io_indexes) > 1:
+                workers = min(len(io_indexes), MAX_IO_WORKERS)
+                with ThreadPoolExecutor(max_workers=workers) as io_pool:
+                    io_results = io_pool.map(
+                        self._process_path, [paths[i] for i in io_indexes]
+                    )
+                    for i, result in zip(io_indexes, io_results, strict=True):
+                        results[i] = result
+            else:
+                for i in io_indexes:
+                    results[i] = self._process_path(paths[i])
+
+            for i, future in conversions.items():
+                try:
+                    converted_file = future.result()
+                except Exception as e:
+                    converted_file = FileError(
+                        path=str(paths[i]), reason=f"markitdown conversion failed: {e}"
+                    )
+                self._store_office(office_keys.get(i), converted_file)
+                results[i] = converted_file
+        finally:
+            if conversion_pool:
+                conversion_pool.shutdown()
+
         processed: list[ProcessedFile] = []
         errors: list[FileError] = []
+        for outcome in results:
+            if isinstance(outcome, FileError):
+                errors.append(outcome)
+            elif outcome is not None:
+                processed.append(outcome)
 
-        for file_path in file_paths:
-            path = Path(file_path)
+        _share_duplicate_images(processed)
+        return processed, errors
 
-            # Validate file exists
-            if not path.exists():
-                errors.append(FileError(path=str(path), reason="File not found"))
-                continue
+    def _process_path(self, path: Path) -> ProcessedFile | FileError:
+        """Validate and process a single file"""
 
-            if not path.is_file():
-                errors.append(FileError(path=str(path), reason="Not a file"))
-                continue
+        # Validate file exists
+        if not path.exists():
+            return FileError(path=str(path), reason="File not found")
 
-            # Categorize and process
-            category = self._categorize(path)
+        if not path.is_file():
+            return FileError(path=str(path), reason="Not a file")
 
-            if category == FileCategory.IMAGE:
-                result = self._process_image(path)
-            elif category == FileCategory.OFFICE:
-                result = self._process_office(path)
-            else:  # FileCategory.TEXT
-                result = self._process_text(path)
+        # Categorize and process
+        category = self._categorize(path)
 
-            if isinstance(result, FileError):
-                errors.append(result)
-            else:
-                processed.append(result)
-
-        return processed, errors
+        if category == FileCategory.IMAGE:
+            return self._process_image(path)
+        elif category == FileCategory.OFFICE:
+            return self._process_office(path)
+        else:  # FileCategory.TEXT
+            return self._process_text(path)
 
     def _categorize(self, path: Path) -> FileCategory:
         """Determine the category of a file based on extension"""
@@ -110,48 +238,107 @@ class FileHandler:
         return FileCategory.TEXT
 
     def _process_image(self, path: Path) -> ProcessedFile | FileError:
-        """Process an image file: validate size and encode to base64"""
+        """
+        Process an image file: downscale and re-encode it (see
+        image_pipeline), validate the size and encode it as a data URL
+        """
         try:
             # Read binary content
             data = path.read_bytes()
 
-            # Check size limit
-            if len(data) > MAX_IMAGE_SIZE_BYTES:
-                size_mb = len(data) / (1024 * 1024)
+            # Reuse a cached encoding of identical content at the same limits
+            cache_key = None
+            if self.cache:
+                limits = self.image_limits
+                kind = (
+                    f"image-{limits.max_edge}-{limits.max_short_edge}-"
+                    f"{limits.max_pixels}-{'pil' if pillow_available() else 'raw'}"
+                )
+                cache_key = self.cache.key_for_bytes(data, kind)
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    image: dict[str, Any] = json.loads(cached)
+                    return ProcessedFile(
+                        path=str(path),
+                        category=FileCategory.IMAGE,
+                        source_bytes=len(data),
+                        **image,
+                    )
+
+            prepared = prepare_image(data, _image_mime_type(path), self.image_limits)
+
+            # Check size limit on what will actually be uploaded
+            if len(prepared.data) > MAX_IMAGE_SIZE_BYTES:
+                size_mb = len(prepared.data) / (1024 * 1024)
                 max_mb = MAX_IMAGE_SIZE_BYTES / (1024 * 1024)
                 return FileError(
                     path=str(path),
                     reason=f"Image too large: {size_mb:.1f}MB (max {max_mb:.0f}MB)",
                 )
 
-            # Encode to base64
-            base64_data = base64.b64encode(data).decode("utf-8")
-
-            # Determine MIME type
-            mime_type, _ = mimetypes.guess_type(str(path))
-            if not mime_type:
-                # Fallback based on extension
-                ext = path.suffix.lower()
-                mime_map = {
-                    ".png": "image/png",
-                    ".jpg": "image/jpeg",
-                    ".jpeg": "image/jpeg",
-                    ".gif": "image/gif",
-                    ".webp": "image/webp",
-                }
-                mime_type = mime_map.get(ext, "application/octet-stream")
+            encoded = base64.b64encode(prepared.data).decode("ascii")
+            image = {
+                "data_url": f"data:{prepared.mime_type};base64,{encoded}",
+                "mime_type": prepared.mime_type,
+                "width": prepared.width,
+                "height": prepared.height,
+            }
+            del encoded, prepared
+            if self.cache and cache_key:
+                self.cache.put(cache_key, json.dumps(image))
 
             return ProcessedFile(
                 path=str(path),
                 category=FileCategory.IMAGE,
-                base64_data=base64_data,
-                mime_type=mime_type,
+                source_bytes=len(data),
+                **image,
             )
         except Exception as e:
             return FileError(path=str(path), reason=f"Failed to process image: {e}")
 
     def _process_office(self, path: Path) -> ProcessedFile | FileError:
-        """Process an office document using markitdown"""
+        """Process an office document, using the conversion cache if set"""
+        cache_key, cached = self._lookup_office(path)
+        if cached is not None:
+            return cached
+
+        result = self._convert_office(path)
+        self._store_office(cache_key, result)
+        return result
+
+    def _lookup_office(self, path: Path) -> tuple[str | None, ProcessedFile | None]:
+        """
+        Look up a cached office conversion.
+
+        Returns:
+            Tuple of (cache key or None if caching is off, cached result or None)
+        """
+        if not self.cache:
+            return None, None
+
+        try:
+            cache_key = self.cache.key_for(path, "office")
+        except OSError:
+            # Unreadable file - let the conversion report the error
+            return None, None
+
+        content = self.cache.get(cache_key)
+        if content is None:
+            return cache_key, None
+
+        return cache_key, ProcessedFile(
+            path=str(path), category=FileCategory.OFFICE, content=content
+        )
+
+    def _store_office(
+        self, cache_key: str | None, result: ProcessedFile | FileError
+    ) -> None:
+        """Cache a successful office conversion"""
+        if self.cache and cache_key and isinstance(result, ProcessedFile):
+            self.cache.put(cache_key, result.content)
+
+    def _convert_office(self, path: Path) -> ProcessedFile | FileError:
+        """Convert an office document to text using markitdown"""
         try:
             result = self._markitdown.convert(str(path))
             content = result.text_content
@@ -172,9 +359,16 @@ class FileHandler:
             )
 
     def _process_text(self, path: Path) -> ProcessedFile | FileError:
-        """Process a text file: attempt UTF-8 decode"""
+        """Process a text file: sniff for binary content, then UTF-8 decode"""
         try:
-            content = path.read_text(encoding="utf-8")
+            with path.open("rb") as f:
+                if looks_binary(f.read(BINARY_SNIFF_BYTES)):
+                    return FileError(
+                        path=str(path),
+                        reason="Not a valid UTF-8 text file: binary content",
+                    )
+                f.seek(0)
+                content = f.read().decode("utf-8")
 
             # Check for empty or whitespace-only files
             if not content or not content.strip():
@@ -197,6 +391,18 @@ class FileHandler:
             return FileError(path=str(path), reason=f"Failed to read file: {e}")
 
 
+# FileHandler reused by office conversions within one worker process
+_worker_handler: FileHandler | None = None
+
+
+def _convert_office_file(path: str) -> ProcessedFile | FileError:
+    """Convert one office document inside a conversion worker process"""
+    global _worker_handler
+    if _worker_handler is None:
+        _worker_handler = FileHandler()
+    return _worker_handler._convert_office(Path(path))
+
+
 def validate_vision_support(model: str, has_images: bool) -> None:
     """
     Validate that the model supports vision if images are present.
@@ -242,40 +448,160 @@ def build_prompt_with_references(prompt: str, files: list[ProcessedFile]) -> str
         files: List of successfully processed files
 
     Returns:
-        The full prompt with reference files section appended
+        The reference files section followed by the prompt
     """
-    # Filter to text and office files only (images handled separately)
-    text_content_files = [
-        f for f in files if f.category in (FileCategory.TEXT, FileCategory.OFFICE)
+    return "".join(text for _, text in build_prompt_segments(prompt, files))
+
+
+def split_prompt(prompt: str) -> tuple[str, str]:
+    """
+    Split a prompt into the reference files prefix and the question
+    (starting with the separator). Only a Prompt with a recorded prefix is
+    split; the prefix is empty for any other prompt, or one without
+    attachments.
+    """
+    prefix_chars = getattr(prompt, "prefix_chars", None)
+    if not prefix_chars:
+        return "", prompt
+    return prompt[:prefix_chars], prompt[prefix_chars:]
+
+
+def looks_binary(head: bytes, complete: bool = False) -> bool:
+    """
+    Whether the first bytes of a file rule it out as UTF-8 text: a NUL byte
+    or an invalid sequence. A character cut off at the end is allowed unless
+    head is the complete file.
+    """
+    if b"\0" in head:
+        return True
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=complete)
+    except UnicodeDecodeError:
+        return True
+    return False
+
+
+def _image_mime_type(path: Path) -> str:
+    """MIME type of an image file, from its name"""
+    mime_type, _ = mimetypes.guess_type(str(path))
+    if not mime_type:
+        # Fallback based on extension
+        ext = path.suffix.lower()
+        mime_map = {
+            ".png": "image/png",
+            ".jpg": "image/jpeg",
+            ".jpeg": "image/jpeg",
+            ".gif": "image/gif",
+            ".webp": "image/webp",
+        }
+        mime_type = mime_map.get(ext, "application/octet-stream")
+    return mime_type
+
+
+def _share_duplicate_images(files: list[ProcessedFile]) -> None:
+    """
+    Give identical images the first one's data URL string, so each distinct
+    image is kept in memory once. Each file keeps its own (equal) data;
+    which ones are sent is decided per request (see duplicate_images).
+    """
+    first_by_url: dict[str, str] = {}
+    for file in files:
+        if file.category == FileCategory.IMAGE:
+            file.data_url = first_by_url.setdefault(file.data_url, file.data_url)
+
+
+def duplicate_images(files: list[ProcessedFile]) -> dict[str, str]:
+    """
+    Path of each image identical to an earlier image in files, mapped to
+    that earlier image's path. Only the first of identical images is sent.
+    """
+    first_by_url: dict[str, str] = {}
+    duplicates: dict[str, str] = {}
+    for file in files:
+        if file.category != FileCategory.IMAGE:
+            continue
+        first = first_by_url.setdefault(file.data_url, file.path)
+        if first != file.path:
+            duplicates[file.path] = first
+    return duplicates
+
+
+def _distinct_images(files: list[ProcessedFile]) -> list[ProcessedFile]:
+    duplicates = duplicate_images(files)
+    return [
+        f
+        for f in files
+        if f.category == FileCategory.IMAGE and f.path not in duplicates
     ]
 
+
+def count_image_tokens(files: list[ProcessedFile], model: str) -> int:
+    """Estimated input tokens of the distinct images among files for model"""
+    return sum(
+        estimate_image_tokens(f.width, f.height, model) for f in _distinct_images(files)
+    )
+
+
+def build_prompt_segments(
+    prompt: str, files: list[ProcessedFile], note: str = ""
+) -> list[tuple[ProcessedFile | None, str]]:
+    """
+    Split the prompt built by build_prompt_with_references into segments.
+
+    The reference files come first, sorted by path, then the image note and
+    note (e.g. files left out by packing), and the user's prompt last, after
+    QUESTION_SEPARATOR. Identical attachments therefore give an identical
+    prefix whatever the question and -f order, which provider prompt caches
+    can reuse.
+
+    Each text/office file's content is its own segment, paired with that file
+    (the content string itself, not a copy); everything else (the user's
+    prompt, headings, code fences, notes) is paired with None. Joining the
+    texts in order gives the full prompt, so it can be written out piece by
+    piece and token counts can be computed and cached per file.
+    """
+    # Filter to text and office files only (images handled separately)
+    text_content_files = sorted(
+        (f for f in files if f.category in (FileCategory.TEXT, FileCategory.OFFICE)),
+        key=lambda f: f.path,
+    )
+
     # Also get image files for the note
     image_files = [f for f in files if f.category == FileCategory.IMAGE]
+    duplicates = duplicate_images(image_files)
 
-    if not text_content_files and not image_files:
-        return prompt
-
-    parts = [prompt]
+    segments: list[tuple[ProcessedFile | None, str]] = []
 
     # Add reference files section if there are text/office files
     if text_content_files:
-        parts.append("\n\n" + "=" * 80)
-        parts.append("\n\n## Reference Files\n")
+        segments.append((None, "## Reference Files\n"))
 
         for file in text_content_files:
-            parts.append(f"\n### {file.path}\n")
-            parts.append(f"```\n{file.content}\n```\n")
+            segments.append((None, f"\n### {file.path}\n```\n"))
+            segments.append((file, file.content))
+            segments.append((None, "\n```\n"))
 
     # Add note about images if present
     if image_files:
-        parts.append("\n\n" + "-" * 40)
-        parts.append(
-            f"\n*Note: {len(image_files)} image(s) attached for visual analysis.*\n"
+        image_note = [
+            "\n\n" + "-" * 40,
+            f"\n*Note: {len(image_files)} image(s) attached for visual analysis.*\n",
+        ]
+        image_note.extend(
+            f"- {img.path} (same image as {duplicates[img.path]})\n"
+            if img.path in duplicates
+            else f"- {img.path}\n"
+            for img in image_files
         )
-        for img in image_files:
-            parts.append(f"- {img.path}\n")
+        segments.append((None, "".join(image_note)))
 
-    return "".join(parts)
+    if note:
+        segments.append((None, note))
+
+    if segments:
+        segments.append((None, QUESTION_SEPARATOR))
+    segments.append((None, prompt))
+    return segments
 
 
 def build_multimodal_content(
@@ -298,25 +624,37 @@ def build_multimodal_content(
     Returns:
         Multimodal content array
     """
-    content: list[dict[str, Any]] = []
-
-    # Text content
-    content.append({"type": "text", "text": text_prompt})
-
-    # Images with base64 data URLs
-    for f in files:
-        if f.category == FileCategory.IMAGE:
-            content.append(
-                {
-                    "type": "image_url",
-                    "image_url": {
-                        "url": f"data:{f.mime_type};base64,{f.base64_data}",
-                        "detail": "auto",
-                    },
-                }
-            )
+    return [{"type": "text", "text": text_prompt}, *build_image_content(files)]
 
-    return content
+
+def build_image_content(files: list[ProcessedFile]) -> list[dict[str, Any]]:
+    """
+    Build the image entries of a multimodal content array (base64 data URLs).
+
+    Sessions store these next to prompt.txt, and the worker puts the prompt
+    text in front of them. Entries share each file's data URL rather than
+    copying it, and duplicate images are sent once.
+    """
+    return [
+        {
+            "type": "image_url",
+            "image_url": {"url": f.data_url, "detail": "auto"},
+        }
+        for f in _distinct_images(files)
+    ]
+
+
+def attachment_digests(files: list[ProcessedFile]) -> dict[str, str]:
+    """
+    Content hash of each attachment by label, recorded with a session so
+    follow-up turns only attach files that are new or changed
+    """
+    return {
+        f.path: hashlib.sha256(
+            (f.data_url if f.category == FileCategory.IMAGE else f.content).encode()
+        ).hexdigest()
+        for f in files
+    }
 
 
 def has_images(files: list[ProcessedFile]) -> bool:
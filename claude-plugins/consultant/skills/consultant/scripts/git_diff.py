@@ -0,0 +1,213 @@
+"""
+Git diff attachments for review consultations.
+Turns a local revision range into one attachment per changed file holding
+only its hunks, plus optionally the full text of small touched files.
+"""
+
+import codecs
+import os
+import re
+import subprocess
+from dataclasses import dataclass, field
+
+from file_handler import BINARY_SNIFF_BYTES, FileCategory, ProcessedFile, looks_binary
+
+_RANGE = re.compile(r"^(?P<base>.*?)(?P<dots>\.{2,3})(?P<head>.*)$")
+
+
+@dataclass
+class DiffAttachments:
+    """Attachments built from a revision range"""
+
+    spec: str
+    files: list[ProcessedFile] = field(default_factory=list)
+    changed: int = 0
+    added_lines: int = 0
+    removed_lines: int = 0
+    full_files: int = 0
+
+    def describe(self) -> str:
+        summary = (
+            f"Diff {self.spec}: {self.changed} file(s) changed "
+            f"(+{self.added_lines} -{self.removed_lines})"
+        )
+        if self.full_files:
+            summary += f", full text of {self.full_files} touched file(s) attached"
+        return summary
+
+
+def diff_attachments(
+    spec: str,
+    context_lines: int,
+    full_file_max_bytes: int | None = None,
+    cwd: str | None = None,
+) -> DiffAttachments:
+    """
+    Build attachments for the changes in a local revision range.
+
+    spec is 'BASE..HEAD', 'BASE...HEAD' (changes since the merge base) or a
+    single revision, which is compared with the working tree; an empty side
+    means HEAD. Each changed file becomes one attachment labelled
+    '<path> (diff <spec>)' with its hunks and context_lines of surrounding
+    context. With full_file_max_bytes, the head version of every touched
+    text file up to that size is attached as well.
+
+    Raises:
+        ValueError: If cwd is not in a git repository or the range is invalid
+    """
+    match = _RANGE.match(spec)
+    if match:
+        base = match["base"] or "HEAD"
+        head: str | None = match["head"] or "HEAD"
+        range_args = [f"{base}{match['dots']}{head}"]
+    else:
+        head = None  # working tree
+        range_args = [spec]
+
+    top = _git(["rev-parse", "--show-toplevel"], cwd).decode().strip()
+    output = _git(
+        [
+            "diff",
+            "--no-color",
+            "--no-ext-diff",
+            "--find-renames",
+            f"--unified={context_lines}",
+            *range_args,
+            "--",
+        ],
+        top,
+    )
+
+    result = DiffAttachments(spec)
+    touched: list[str] = []
+    for path, deleted, text in _split_diff(output.decode("utf-8", errors="replace")):
+        result.changed += 1
+        for line in text.splitlines():
+            if line.startswith("+") and not line.startswith("+++"):
+                result.added_lines += 1
+            elif line.startswith("-") and not line.startswith("---"):
+                result.removed_lines += 1
+        result.files.append(
+            ProcessedFile(
+                path=f"{path} (diff {spec})", category=FileCategory.TEXT, content=text
+            )
+        )
+        if not deleted:
+            touched.append(path)
+
+    if full_file_max_bytes is not None and touched:
+        for path, content in _read_files(top, head, touched, full_file_max_bytes):
+            label = f"{path} (at {head})" if head else f"{path} (working tree)"
+            result.files.append(
+                ProcessedFile(path=label, category=FileCategory.TEXT, content=content)
+            )
+            result.full_files += 1
+
+    return result
+
+
+def _git(args: list[str], cwd: str | None, stdin: bytes | None = None) -> bytes:
+    try:
+        completed = subprocess.run(
+            ["git", *args], cwd=cwd, input=stdin, capture_output=True, check=False
+        )
+    except OSError as e:
+        raise ValueError(f"Cannot run git: {e}") from e
+    if completed.returncode != 0:
+        message = completed.stderr.decode(errors="replace").strip()
+        raise ValueError(f"git {args[0]} failed: {message}")
+    return completed.stdout
+
+
+def _split_diff(output: str) -> list[tuple[str, bool, str]]:
+    """(path, deleted, diff text) for each file section of a git diff"""
+    sections: list[tuple[str, bool, str]] = []
+    for section in re.split(r"^(?=diff --git )", output, flags=re.MULTILINE):
+        if not section.startswith("diff --git "):
+            continue
+        old = new = None
+        for line in section.splitlines():
+            if line.startswith("--- "):
+                old = _diff_path(line[4:], "a/")
+            elif line.startswith("+++ "):
+                new = _diff_path(line[4:], "b/")
+            elif line.startswith("rename to "):
+                new = line[len("rename to ") :]
+            elif line.startswith("@@"):
+                break
+        path = new or old
+        if path is None:
+            # No ---/+++ lines (binary or mode-only change): use the header
+            path = section.split("\n", 1)[0].rsplit(" b/", 1)[-1]
+        sections.append((path, new is None and old is not None, section))
+    return sections
+
+
+def _diff_path(value: str, prefix: str) -> str | None:
+    if value == "/dev/null":
+        return None
+    if value.startswith('"') and value.endswith('"'):
+        # C-style quoting with octal escapes of the UTF-8 bytes
+        value = codecs.escape_decode(value[1:-1].encode())[0].decode(
+            "utf-8", errors="replace"
+        )
+    return value.removeprefix(prefix)
+
+
+def _read_files(
+    top: str, revision: str | None, paths: list[str], max_bytes: int
+) -> list[tuple[str, str]]:
+    """Text of the files at revision (None: working tree) up to max_bytes"""
+    if revision is None:
+        texts: list[tuple[str, str]] = []
+        for path in paths:
+            full_path = os.path.join(top, path)
+            try:
+                if os.path.getsize(full_path) > max_bytes:
+                    continue
+                with open(full_path, "rb") as f:
+                    data = f.read()
+            except OSError:
+                continue
+            if not looks_binary(
+                data[:BINARY_SNIFF_BYTES], len(data) <= BINARY_SNIFF_BYTES
+            ):
+                texts.append((path, data.decode("utf-8", errors="replace")))
+        return texts
+
+    # One cat-file process for sizes, one for the contents of the small ones
+    objects = [f"{revision}:{path}" for path in paths]
+    checks = _git(
+        ["cat-file", "--batch-check"], top, "\n".join(objects).encode() + b"\n"
+    ).splitlines()
+    small = [
+        path
+        for path, check in zip(paths, checks, strict=True)
+        if 0 <= _blob_size(check) <= max_bytes
+    ]
+    if not small:
+        return []
+
+    batch = _git(
+        ["cat-file", "--batch"],
+        top,
+        "\n".join(f"{revision}:{path}" for path in small).encode() + b"\n",
+    )
+    texts = []
+    offset = 0  # each object is '<oid> blob <size>\n<content>\n'
+    for path in small:
+        header_end = batch.index(b"\n", offset)
+        size = int(batch[offset:header_end].rsplit(b" ", 1)[1])
+        data = batch[header_end + 1 : header_end + 1 + size]
+        offset = header_end + 1 + size + 1
+        if not looks_binary(data[:BINARY_SNIFF_BYTES], size <= BINARY_SNIFF_BYTES):
+            texts.append((path, data.decode("utf-8", errors="replace")))
+    return texts
+
+
+def _blob_size(check: bytes) -> int:
+    """Size from a 'cat-file --batch-check' line, -1 if not a blob"""
+    parts = check.split()
+    if len(parts) == 3 and parts[1] == b"blob":
+        return int(parts[2])
+    return -1
@@ -0,0 +1,192 @@
+"""
+Hedged requests to a fallback model.
+When the primary model has produced no output within a latency threshold,
+or fails, the same request also goes to a fallback model or provider. The
+first usable answer wins and the other request is abandoned, its background
+job cancelled where the API allows it, so a provider brownout costs the
+threshold instead of the full wait.
+"""
+
+import shutil
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from retry_policy import DeadlineExceededError, RequestAbandonedError
+
+# Each attempt keeps its state (e.g. response_id.txt) in its own directory
+# under the stage directory, so the two never resume each other's jobs
+HEDGE_DIR = "hedge"
+
+# Runs one attempt: (model, attempt_dir, on_delta) -> result
+Attempt = Callable[[str, Path, Callable[[str], None]], dict[str, Any]]
+
+# Cancels what an abandoned attempt left running: (model, attempt_dir)
+Cancel = Callable[[str, Path], None]
+
+
+class _Attempt:
+    """One of the hedged requests, updated by its thread under the lock"""
+
+    def __init__(self, model: str, role: str, attempt_dir: Path) -> None:
+        self.model = model
+        self.role = role  # "primary" or "fallback"
+        self.dir = attempt_dir
+        self.started_at = time.time()
+        self.first_output_at: float | None = None
+        self.finished_at: float | None = None
+        self.result: dict[str, Any] | None = None
+        self.error: Exception | None = None
+        self.abandoned = threading.Event()
+
+    def record(self, winner: "_Attempt | None") -> dict[str, Any]:
+        """The attempt as recorded in the session metadata"""
+        if self is winner:
+            outcome = "won"
+        elif self.error is not None and not self.abandoned.is_set():
+            outcome = "failed"
+        elif self.abandoned.is_set():
+            outcome = "abandoned"
+        elif self.result is not None:
+            outcome = "completed"
+        else:
+            outcome = "running"
+        record: dict[str, Any] = {
+            "model": self.model,
+            "role": self.role,
+            "outcome": outcome,
+            "seconds": round((self.finished_at or time.time()) - self.started_at, 3),
+        }
+        if self.first_output_at is not None:
+            record["first_output_seconds"] = round(
+                self.first_output_at - self.started_at, 3
+            )
+        if outcome == "failed":
+            record["error"] = str(self.error)[:500]
+        return record
+
+
+def run_hedged(
+    attempt: Attempt,
+    cancel: Cancel,
+    model: str,
+    fallback_model: str,
+    hedge_after: float,
+    stage_dir: Path,
+    on_delta: Callable[[str], None] | None = None,
+    on_update: Callable[[list[dict[str, Any]]], None] | None = None,
+) -> dict[str, Any]:
+    """
+    Ask model, and fallback_model as well once model has streamed no output
+    for hedge_after seconds or has failed. Returns the result of the first
+    attempt to succeed, with 'hedge' recording every attempt.
+
+    Attempts always stream, so the first output can be timed. Deltas reach
+    on_delta from whichever attempt produced output first; if the other one
+    wins, the caller replaces the streamed text with the full response.
+    on_update receives the attempt records whenever an attempt starts or the
+    race is decided. A primary that won keeps its response_id.txt in
+    stage_dir, where follow-up turns look for it.
+
+    Raises:
+        Exception: The primary's error when no attempt succeeded
+    """
+    hedge_dir = stage_dir / HEDGE_DIR
+    lock = threading.Condition()
+    attempts: list[_Attempt] = []
+    streaming: list[_Attempt] = []  # the attempt whose deltas are forwarded
+
+    def start(attempt_model: str, role: str) -> None:
+        current = _Attempt(attempt_model, role, hedge_dir / role)
+        current.dir.mkdir(parents=True, exist_ok=True)
+
+        def forward(delta: str) -> None:
+            if current.abandoned.is_set():
+                raise RequestAbandonedError(f"Hedged request to {attempt_model} lost")
+            with lock:
+                if current.first_output_at is None:
+                    current.first_output_at = time.time()
+                    lock.notify_all()
+                if not streaming:
+                    streaming.append(current)
+            if on_delta and streaming[0] is current:
+                on_delta(delta)
+
+        def run() -> None:
+            try:
+                result = attempt(attempt_model, current.dir, forward)
+            except Exception as e:
+                with lock:
+                    current.error = e
+                    current.finished_at = time.time()
+                    lock.notify_all()
+                return
+            with lock:
+                current.result = result
+                current.finished_at = time.time()
+                lock.notify_all()
+
+        attempts.append(current)
+        # Daemon threads: an abandoned request that cannot be cancelled must
+        # not keep the worker alive once the winner is recorded
+        threading.Thread(target=run, name=f"hedge-{role}", daemon=True).start()
+        print(f"Hedge: asking {role} model {attempt_model}")
+
+    def report(winner: _Attempt | None = None) -> None:
+        if on_update is not None:
+            on_update([a.record(winner) for a in attempts])
+
+    start(model, "primary")
+    report()
+    primary = attempts[0]
+
+    winner: _Attempt | None = None
+    with lock:
+        while True:
+            winner = next((a for a in attempts if a.result is not None), None)
+            if winner is not None:
+                break
+            timeout = None
+            if len(attempts) > 1:
+                if all(a.finished_at for a in attempts):
+                    break
+            elif primary.error is not None:
+                # Out of time: the fallback could not finish either
+                if isinstance(primary.error, DeadlineExceededError):
+                    break
+                print(f"Hedge: primary model failed ({primary.error})")
+                start(fallback_model, "fallback")
+                report()
+                continue
+            elif primary.first_output_at is None:
+                waited = time.time() - primary.started_at
+                if waited >= hedge_after:
+                    print(f"Hedge: no output from {model} after {waited:.0f}s")
+                    start(fallback_model, "fallback")
+                    report()
+                    continue
+                timeout = hedge_after - waited
+            lock.wait(timeout)
+
+    # Abandon the attempt that lost, cancelling its background job if any
+    for loser in attempts:
+        if loser is not winner and loser.finished_at is None:
+            loser.abandoned.set()
+            cancel(loser.model, loser.dir)
+    report(winner)
+
+    if winner is None:
+        raise primary.error or RuntimeError("Hedged request failed")
+
+    if winner is primary and (winner.dir / "response_id.txt").exists():
+        shutil.copyfile(winner.dir / "response_id.txt", stage_dir / "response_id.txt")
+    print(f"Hedge: {winner.role} model {winner.model} answered first")
+
+    result = winner.result or {}
+    result["hedge"] = {
+        "winner": winner.role,
+        "attempts": [a.record(winner) for a in attempts],
+    }
+    return result
@@ -0,0 +1,116 @@
+"""
+Shared keep-alive HTTP connection pools.
+One httpx client per base URL is reused for token counting, model discovery
+and litellm traffic, so repeated calls skip the TCP/TLS handshake.
+"""
+
+import os
+import sys
+import threading
+from importlib.util import find_spec
+from typing import Any
+
+import httpx
+
+import config
+
+# Key used for the pool serving provider APIs directly (no base URL)
+DIRECT_POOL = "direct"
+
+# Key of the pool behind litellm.client_session (see use_pool_for_litellm)
+LITELLM_POOL = "litellm"
+
+_clients: dict[str, httpx.Client] = {}
+_handlers: dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def _pool_key(base_url: str | None) -> str:
+    return base_url.rstrip("/") if base_url else DIRECT_POOL
+
+
+def _reset_after_fork() -> None:
+    """
+    Forget pools inherited from the parent process.
+
+    Session workers are forked; sharing the parent's sockets would interleave
+    traffic on one connection, so each child builds its own pools.
+    """
+    global _lock
+    litellm: Any = sys.modules.get("litellm")
+    if litellm is not None and litellm.client_session is _clients.get(LITELLM_POOL):
+        litellm.client_session = None
+    _clients.clear()
+    _handlers.clear()
+    _lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def http2_enabled() -> bool:
+    """HTTP/2 is used when configured and the optional h2 package is present"""
+    return config.HTTP_POOL_HTTP2 and find_spec("h2") is not None
+
+
+def get_http_client(base_url: str | None = None) -> httpx.Client:
+    """Return the pooled client for base_url, creating it on first use"""
+
+    return _client_for(_pool_key(base_url))
+
+
+def _client_for(key: str) -> httpx.Client:
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = httpx.Client(
+                http2=http2_enabled(),
+                limits=httpx.Limits(
+                    max_connections=config.HTTP_POOL_MAX_CONNECTIONS,
+                    max_keepalive_connections=config.HTTP_POOL_MAX_KEEPALIVE,
+                    keepalive_expiry=config.HTTP_POOL_KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(
+                    config.HTTP_TIMEOUT, connect=config.HTTP_CONNECT_TIMEOUT
+                ),
+                follow_redirects=True,
+            )
+            _clients[key] = client
+        return client
+
+
+def get_litellm_handler(base_url: str | None = None) -> Any:
+    """
+    Return a litellm HTTPHandler wrapping the pooled client for base_url.
+
+    Passed as client= to litellm.responses() and litellm.get_responses().
+    """
+
+    from litellm.llms.custom_httpx.http_handler import HTTPHandler
+
+    http_client = get_http_client(base_url)
+    key = _pool_key(base_url)
+    with _lock:
+        handler = _handlers.get(key)
+        if handler is None:
+            handler = HTTPHandler(client=http_client)
+            _handlers[key] = handler
+        return handler
+
+
+def use_pool_for_litellm() -> None:
+    """
+    Route litellm's provider SDK clients through a pooled client.
+
+    completion() only takes a provider SDK client per call, so its HTTP
+    traffic goes through the process-wide litellm.client_session instead.
+    That is set once, to a client of its own: httpx keeps connections per
+    origin, so one client serves every base URL and concurrent requests to
+    different endpoints never swap it under each other.
+    """
+
+    import litellm
+
+    client = _client_for(LITELLM_POOL)
+    if litellm.client_session is None:
+        litellm.client_session = client
@@ -0,0 +1,175 @@
+"""
+Image pre-processing for vision requests.
+Downscales attachments to the largest resolution the target providers
+actually use, re-encodes them compactly and estimates their token cost.
+"""
+
+import io
+import math
+from dataclasses import dataclass
+from importlib.util import find_spec
+from typing import TYPE_CHECKING
+
+import config
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+ANTHROPIC = "anthropic"
+OPENAI = "openai"
+GEMINI = "gemini"
+
+
+@dataclass(frozen=True)
+class ImageLimits:
+    """Largest image a provider looks at; bigger images are scaled down"""
+
+    max_edge: int  # longest side, pixels
+    max_short_edge: int  # shortest side, pixels
+    max_pixels: int
+
+
+# Effective resolutions of each provider's vision models
+PROVIDER_LIMITS = {
+    # Long edge 1568px and about 1.15 megapixels
+    ANTHROPIC: ImageLimits(1568, 1568, 1_150_000),
+    # High detail: fit in 2048x2048, then the shortest side to 768px
+    OPENAI: ImageLimits(2048, 768, 2048 * 768),
+    # Tiled at 768px; 3072px covers the largest tiling used
+    GEMINI: ImageLimits(3072, 3072, 3072 * 3072),
+}
+
+
+@dataclass
+class PreparedImage:
+    """Image bytes ready for base64 encoding"""
+
+    data: bytes
+    mime_type: str
+    width: int = 0  # 0 when the image could not be decoded
+    height: int = 0
+    resized: bool = False
+
+
+def provider_for(model: str) -> str:
+    """Vision provider family of a model id (OpenAI for anything unknown)"""
+    name = model.lower()
+    if "claude" in name or name.startswith(("anthropic/", "bedrock/anthropic")):
+        return ANTHROPIC
+    if "gemini" in name:
+        return GEMINI
+    return OPENAI
+
+
+def limits_for_models(models: list[str]) -> ImageLimits:
+    """
+    Limits that serve every model: the most generous of their providers.
+
+    Each provider downscales (and bills) images to its own limits, so sending
+    the largest resolution any of them uses loses no detail. Without models,
+    the limits cover every provider.
+    """
+    limits = [PROVIDER_LIMITS[provider_for(model)] for model in models] or list(
+        PROVIDER_LIMITS.values()
+    )
+    return ImageLimits(
+        max(limit.max_edge for limit in limits),
+        max(limit.max_short_edge for limit in limits),
+        max(limit.max_pixels for limit in limits),
+    )
+
+
+def pillow_available() -> bool:
+    """Images are only re-encoded when the optional Pillow package is present"""
+    return find_spec("PIL") is not None
+
+
+def prepare_image(data: bytes, mime_type: str, limits: ImageLimits) -> PreparedImage:
+    """
+    Downscale an image to limits and re-encode it as WebP (JPEG/PNG if the
+    Pillow build lacks WebP).
+
+    The original bytes are kept when Pillow is missing, the image cannot be
+    decoded, it is animated, or re-encoding would not make it smaller
+    without resizing.
+    """
+    original = PreparedImage(data, mime_type)
+    if not pillow_available():
+        return original
+
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        with Image.open(io.BytesIO(data)) as opened:
+            original.width, original.height = opened.size
+            if getattr(opened, "is_animated", False):
+                return original
+
+            image = ImageOps.exif_transpose(opened)
+            width, height = image.size
+            scale = _scale(width, height, limits)
+            if scale < 1:
+                image = image.resize(
+                    (max(1, round(width * scale)), max(1, round(height * scale))),
+                    Image.Resampling.LANCZOS,
+                )
+
+            encoded, encoded_type = _encode(image)
+    except (UnidentifiedImageError, OSError, ValueError):
+        return original
+
+    if scale >= 1 and len(encoded) >= len(data):
+        return original
+    return PreparedImage(
+        encoded, encoded_type, image.width, image.height, resized=scale < 1
+    )
+
+
+def _scale(width: int, height: int, limits: ImageLimits) -> float:
+    return min(
+        1.0,
+        limits.max_edge / max(width, height),
+        limits.max_short_edge / min(width, height),
+        math.sqrt(limits.max_pixels / (width * height)),
+    )
+
+
+def _encode(image: "Image.Image") -> tuple[bytes, str]:
+    from PIL import features
+
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+    image = image.convert("RGBA" if has_alpha else "RGB")
+
+    buffer = io.BytesIO()
+    if features.check("webp"):
+        image.save(buffer, "WEBP", quality=config.IMAGE_QUALITY, method=4)
+        return buffer.getvalue(), "image/webp"
+    if has_alpha:
+        image.save(buffer, "PNG", optimize=True)
+        return buffer.getvalue(), "image/png"
+    image.save(buffer, "JPEG", quality=config.IMAGE_QUALITY, optimize=True)
+    return buffer.getvalue(), "image/jpeg"
+
+
+def estimate_image_tokens(width: int, height: int, model: str) -> int:
+    """
+    Approximate input tokens for one image, after the provider's own
+    downscaling. Unknown dimensions are costed as a maximum-size image.
+    """
+    provider = provider_for(model)
+    limits = PROVIDER_LIMITS[provider]
+    if not width or not height:
+        width = height = limits.max_edge
+
+    scale = _scale(width, height, limits)
+    width = max(1, round(width * scale))
+    height = max(1, round(height * scale))
+
+    if provider == ANTHROPIC:
+        return math.ceil(width * height / 750)
+    if provider == GEMINI:
+        if width <= 384 and height <= 384:
+            return 258
+        return math.ceil(width / 768) * math.ceil(height / 768) * 258
+    # OpenAI high detail: 170 tokens per 512px tile plus 85
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
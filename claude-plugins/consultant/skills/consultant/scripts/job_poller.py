@@ -0,0 +1,225 @@
+"""
+Shared poller for background jobs.
+Session workers hand the OpenAI/Azure background jobs they start to one
+poller process and exit, so waiting on N jobs costs a single process and
+connection pool instead of N worker processes.
+"""
+
+import atexit
+import heapq
+import itertools
+import multiprocessing
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from multiprocessing.connection import Connection
+from multiprocessing.process import BaseProcess
+from typing import Any
+
+import config
+from poll_schedule import PollSchedule
+
+
+@dataclass
+class PendingJob:
+    """A started background job handed off by a session worker"""
+
+    session_id: str
+    response_id: str
+    model: str
+    base_url: str | None
+    api_key: str | None
+    reasoning_effort: str
+    cache_key: str | None = None
+    started_at: float | None = None  # None when resumed from response_id.txt
+    job_durations: list[float] = field(default_factory=list)
+    deadline: float | None = None  # epoch seconds; the job is cancelled then
+    token_estimate: int = 0  # charged to the rate limit when the job started
+
+
+@dataclass
+class _Tracked:
+    job: PendingJob
+    schedule: PollSchedule
+    handed_off_at: float
+    attempt: int = 0  # consecutive network errors
+
+
+# Called in the poller with the job and its result, or the error that ended it
+OnFinished = Callable[[PendingJob, dict[str, Any] | None, Exception | None], None]
+
+# Message asking the poller to exit once its outstanding jobs are done
+_CLOSE = "close"
+
+
+class JobHandoff:
+    """
+    Write end of the poller's pipe, inherited by session workers.
+
+    A pipe written under a lock rather than a multiprocessing.Queue, so no
+    feeder thread runs in the parent while it forks workers.
+    """
+
+    def __init__(self, conn: Connection) -> None:
+        self._conn = conn
+        self._lock = multiprocessing.Lock()
+        self.pid: int | None = None  # of the poller process
+
+    def put(self, message: PendingJob | str) -> None:
+        with self._lock:
+            self._conn.send(message)
+
+
+class JobPoller:
+    """
+    One process polling every background job handed off by session workers.
+
+    The process starts before the first worker that may hand off a job. It
+    polls each outstanding job when its PollSchedule says so, through the
+    keep-alive pool of the job's base URL, and reports finished jobs to
+    on_finished. At exit, the owning process waits for its workers, then
+    for the poller to finish the jobs they handed off.
+    """
+
+    def __init__(self, on_finished: OnFinished) -> None:
+        self._on_finished = on_finished
+        self._workers: list[BaseProcess] = []
+        self._process: BaseProcess | None = None
+        self._handoff: JobHandoff | None = None
+        atexit.register(self.close)
+
+    def start(self) -> JobHandoff:
+        """Start the poller process if needed; the handoff for a new worker"""
+        if self._process is not None and self._handoff is not None:
+            if self._process.is_alive():
+                return self._handoff
+
+        recv_conn, send_conn = multiprocessing.Pipe(duplex=False)
+        handoff = JobHandoff(send_conn)
+        process = multiprocessing.Process(
+            target=_run,
+            args=(recv_conn, send_conn, self._on_finished),
+            name="job-poller",
+        )
+        process.start()
+        recv_conn.close()
+        handoff.pid = process.pid
+        self._process, self._handoff = process, handoff
+        return handoff
+
+    def watch(self, process: BaseProcess) -> None:
+        """Track a started worker, which may hand off a job until it exits"""
+        self._workers = [p for p in self._workers if p.is_alive()]
+        self._workers.append(process)
+
+    def close(self) -> None:
+        """Wait for the watched workers, then for the poller to drain"""
+        for process in self._workers:
+            process.join()
+        self._workers = []
+        if self._process is not None and self._handoff is not None:
+            if self._process.is_alive():
+                self._handoff.put(_CLOSE)
+                self._process.join()
+        self._process = self._handoff = None
+
+
+def _run(conn: Connection, handoff_conn: Connection, on_finished: OnFinished) -> None:
+    """Poller process: receive jobs and poll each when it is due"""
+    # The write end is inherited from the parent; holding it here would hide
+    # the EOF that tells the poller its parent and workers are gone
+    handoff_conn.close()
+    pending: list[tuple[float, int, _Tracked]] = []
+    order = itertools.count()
+    closing = False
+
+    while pending or not closing:
+        timeout = max(pending[0][0] - time.time(), 0) if pending else None
+        if not closing:
+            if conn.poll(timeout):
+                try:
+                    message = conn.recv()
+                except EOFError:
+                    # Parent and workers are gone; finish what is outstanding
+                    message = _CLOSE
+                if isinstance(message, PendingJob):
+                    tracked = _Tracked(
+                        message, PollSchedule(message.job_durations), time.time()
+                    )
+                    due = time.time() + _delay(tracked)
+                    heapq.heappush(pending, (due, next(order), tracked))
+                elif message == _CLOSE:
+                    closing = True
+                continue
+        elif timeout:
+            time.sleep(timeout)
+
+        while pending and pending[0][0] <= time.time():
+            _, _, tracked = heapq.heappop(pending)
+            delay = _poll(tracked, on_finished)
+            if delay is not None:
+                heapq.heappush(pending, (time.time() + delay, next(order), tracked))
+
+
+def _delay(tracked: _Tracked) -> float:
+    """Seconds until the job's next regular poll, the last one at its deadline"""
+    started_at = tracked.job.started_at or tracked.handed_off_at
+    delay: float = tracked.schedule.next_delay(time.time() - started_at)
+    if tracked.job.deadline is not None:
+        delay = max(min(delay, tracked.job.deadline - time.time()), 0)
+    return delay
+
+
+def _poll(tracked: _Tracked, on_finished: OnFinished) -> float | None:
+    """Poll a job once; the delay until the next poll, None once finished"""
+    from http_pool import get_litellm_handler
+    from response_strategy import BackgroundJobStrategy
+    from retry_policy import DeadlineExceededError, RetryPolicy, is_retryable
+
+    job = tracked.job
+    connection: dict[str, Any] = {"client": get_litellm_handler(job.base_url)}
+    if job.base_url:
+        connection["api_base"] = job.base_url
+    if job.api_key:
+        connection["api_key"] = job.api_key
+
+    strategy = BackgroundJobStrategy()
+    try:
+        completion = strategy.poll_once(job.response_id, job.started_at, **connection)
+    except Exception as e:
+        try:
+            # Back off without holding up the other jobs
+            delay: float | None = RetryPolicy(job.deadline).next_delay(
+                e, tracked.attempt
+            )
+        except DeadlineExceededError as deadline_error:
+            strategy.cancel(job.response_id, **connection)
+            on_finished(job, None, deadline_error)
+            return None
+        if delay is not None:
+            tracked.attempt += 1
+            return delay
+        if is_retryable(e):
+            e = RuntimeError(f"Network errors exceeded max retries: {e}")
+        on_finished(job, None, e)
+        return None
+
+    tracked.attempt = 0
+    if completion is not None:
+        on_finished(job, completion, None)
+        return None
+    if job.deadline is not None and time.time() >= job.deadline:
+        strategy.cancel(job.response_id, **connection)
+        error: Exception = DeadlineExceededError(
+            f"Background job {job.response_id} did not complete before the deadline"
+        )
+        on_finished(job, None, error)
+        return None
+    if time.time() - tracked.handed_off_at > config.POLL_TIMEOUT:
+        error = TimeoutError(
+            f"Background job {job.response_id} did not complete "
+            f"within {config.POLL_TIMEOUT}s"
+        )
+        on_finished(job, None, error)
+        return None
+    return _delay(tracked)
@@ -3,10 +3,12 @@ LiteLLM client wrapper with token counting and error handling
 """
 
 import os
+import statistics
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-import requests
 from litellm import (
     completion_cost,
     get_max_tokens,
@@ -16,7 +18,13 @@ from litellm import (
 from litellm.utils import get_model_info
 
 import config
-from response_strategy import ResponseStrategyFactory
+from http_pool import get_http_client, get_litellm_handler, use_pool_for_litellm
+from rate_limiter import RateLimiter
+from response_strategy import BackgroundJobStrategy, ResponseStrategyFactory
+from retry_policy import DeadlineExceededError, RequestAbandonedError, RetryPolicy
+
+if TYPE_CHECKING:
+    from token_cache import TokenCache
 
 
 class LiteLLMClient:
@@ -39,6 +47,10 @@ class LiteLLMClient:
         session_dir: Path | None = None,
         reasoning_effort: str = "xhigh",
         multimodal_content: list[dict[str, Any]] | None = None,
+        on_delta: Callable[[str], None] | None = None,
+        job_durations: list[float] | None = None,
+        deadline: float | None = None,
+        token_estimate: int | None = None,
         **kwargs: Any,
     ) -> dict[str, Any]:
         """
@@ -54,10 +66,21 @@ class LiteLLMClient:
             session_dir: Optional session directory for state persistence (enables resumability)
             reasoning_effort: Reasoning effort level (low, medium, high, xhigh) - default xhigh
             multimodal_content: Optional multimodal content array for images
+            on_delta: Optional callback for streamed text deltas (enables streaming)
+            job_durations: Seconds similar earlier consultations took, to
+                schedule background job polls and to judge whether a retry
+                can finish before the deadline
+            deadline: Optional epoch time by which the consultation must end;
+                requests time out then and no retry starts that could not
+                finish before it
+            token_estimate: Input tokens of the prompt, charged to the
+                model's rate limit before each request (counted here when
+                a rate limit applies and it is not given)
             **kwargs: Additional args passed to litellm.responses()
 
         Returns:
-            Dict with 'content' and optional 'usage'
+            Dict with 'content' and optional 'usage'; with a rate limit also
+            'token_estimate', the tokens charged for the request
         """
 
         # Add base_url if configured
@@ -67,6 +90,30 @@ class LiteLLMClient:
         # Add reasoning_effort parameter
         kwargs["reasoning_effort"] = reasoning_effort
 
+        if job_durations:
+            kwargs["job_durations"] = job_durations
+
+        # Requests wait for the model's shared rate limit budget, if one is
+        # configured, charging the prompt's tokens up front
+        rate_limiter = RateLimiter.for_model(model, self.base_url, self.api_key)
+        if rate_limiter is not None and token_estimate is None:
+            from token_cache import TokenCache
+
+            token_estimate = self.count_tokens_batch([prompt], model, TokenCache())[0]
+
+        # One retry policy for every request the strategy makes
+        kwargs["retry_policy"] = RetryPolicy(
+            deadline,
+            expected_seconds=statistics.median(job_durations) if job_durations else 0,
+            rate_limiter=rate_limiter,
+            tokens=token_estimate or 0,
+        )
+
+        # Route litellm's HTTP traffic through the shared keep-alive pools:
+        # client= for the Responses API, client_session for everything else
+        use_pool_for_litellm()
+        kwargs.setdefault("client", get_litellm_handler(self.base_url))
+
         # Select appropriate strategy based on model
         strategy = ResponseStrategyFactory.get_strategy(model)
 
@@ -84,10 +131,18 @@ class LiteLLMClient:
                 prompt=prompt,
                 session_dir=session_dir,
                 multimodal_content=multimodal_content,
+                on_delta=on_delta,
                 **kwargs,
             )
+            if rate_limiter is not None:
+                # Correct the up-front charge once the real usage is known
+                rate_limiter.settle(token_estimate or 0, result.get("usage"))
+                result["token_estimate"] = token_estimate or 0
             return result
 
+        except (DeadlineExceededError, RequestAbandonedError):
+            raise
+
         except Exception as e:
             # Map to standardized errors
             error_msg = str(e)
@@ -101,6 +156,27 @@ class LiteLLMClient:
             else:
                 raise RuntimeError(f"LLM request failed: {error_msg}") from e
 
+    def cancel(self, model: str, session_dir: Path) -> None:
+        """
+        Cancel the background job a request to model started in session_dir,
+        if any, once its answer is no longer needed. The job's response_id.txt
+        is removed, so a retry starts afresh instead of resuming it.
+        """
+        response_id_file = session_dir / "response_id.txt"
+        strategy = ResponseStrategyFactory.get_strategy(model)
+        if not isinstance(strategy, BackgroundJobStrategy):
+            return
+        if not response_id_file.exists():
+            return
+
+        connection: dict[str, Any] = {"client": get_litellm_handler(self.base_url)}
+        if self.base_url:
+            connection["api_base"] = self.base_url
+        if self.api_key:
+            connection["api_key"] = self.api_key
+        strategy.cancel(response_id_file.read_text().strip(), **connection)
+        response_id_file.unlink(missing_ok=True)
+
     def count_tokens(self, text: str, model: str) -> int:
         """
         Count tokens for given text and model.
@@ -118,7 +194,9 @@ class LiteLLMClient:
             if self.api_key:
                 headers["Authorization"] = f"Bearer {self.api_key}"
 
-            response = requests.post(url, json=payload, headers=headers, timeout=30)
+            response = get_http_client(self.base_url).post(
+                url, json=payload, headers=headers, timeout=config.TOKEN_COUNT_TIMEOUT
+            )
             response.raise_for_status()
 
             # Response typically has format: {"token_count": 123}
@@ -133,6 +211,43 @@ class LiteLLMClient:
         # Use local token counter (direct API mode)
         return int(token_counter(model=model, text=text))
 
+    def count_tokens_batch(
+        self, texts: list[str], model: str, cache: "TokenCache | None" = None
+    ) -> list[int]:
+        """
+        Count tokens for several texts, returning one count per text.
+
+        Counts found in the cache are reused; the rest are counted
+        concurrently (one proxy request each in proxy mode) and stored.
+        """
+
+        tokenizer = f"{self.base_url or 'litellm'}|{model}"
+        keys = [
+            cache.key_for(tokenizer, text) if cache else str(i)
+            for i, text in enumerate(texts)
+        ]
+        counts = cache.get_many(keys) if cache else {}
+
+        # Identical texts share a key and are only counted once
+        pending = {
+            key: text
+            for key, text in zip(keys, texts, strict=True)
+            if key not in counts
+        }
+
+        if pending:
+            workers = min(config.TOKEN_COUNT_WORKERS, len(pending))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = pool.map(
+                    lambda text: self.count_tokens(text, model), pending.values()
+                )
+                fresh = dict(zip(pending, results, strict=True))
+            if cache:
+                cache.put_many(fresh)
+            counts.update(fresh)
+
+        return [counts[key] for key in keys]
+
     def get_max_tokens(self, model: str) -> int:
         """Get maximum context size for model"""
 
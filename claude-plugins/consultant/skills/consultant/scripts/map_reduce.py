@@ -0,0 +1,276 @@
+"""
+Map-reduce consultations for attachment sets larger than the context window.
+Reference files are split into context-sized shards that are consulted
+concurrently; a final reduce call merges the partial findings. Every stage
+lives in the session directory so failed shards can be retried alone.
+"""
+
+import dataclasses
+import json
+import math
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import config
+from file_handler import (
+    FileCategory,
+    ProcessedFile,
+    build_image_content,
+    build_prompt_segments,
+)
+
+SHARDS_DIR = "shards"
+REDUCE_DIR = "reduce"
+
+SHARD_INSTRUCTIONS = """
+
+---
+This request is being answered in parts because the reference files do not
+fit in one context window. The files above are part {index} of {total}.
+Answer the request using only these files: report every relevant finding with
+the file it comes from, and do not speculate about files you cannot see. A
+final step merges the findings of all parts.
+"""
+
+REDUCE_INSTRUCTIONS = """
+
+---
+The request above was answered separately over {total} parts of the reference
+files, because they did not fit in one context window. Below are the findings
+from each part. Merge them into a single answer to the request: combine
+duplicates, resolve contradictions, keep the file references and order the
+result by importance. Do not mention the parts or the merging process.
+"""
+
+
+@dataclass
+class Shard:
+    """Input of one map stage, written to shards/NN/ in the session directory"""
+
+    files: list[str]  # labels of the reference files in this shard
+    prompt: list[str]  # prompt parts, written to prompt.txt
+    images: list[dict[str, Any]] | None = None
+
+
+# Signature of the callback running one stage: (stage_dir, on_delta) -> result
+Consult = Callable[[Path, Callable[[str], None] | None], dict[str, Any]]
+
+
+def plan_shards(
+    files: list[ProcessedFile],
+    budget: int,
+    count_tokens: Callable[[list[str]], list[int]],
+) -> list[list[ProcessedFile]]:
+    """
+    Split reference files into shards of at most budget tokens.
+
+    Files keep their order and are packed greedily; a file larger than the
+    budget is split by lines into labelled parts. Images go into the first
+    shard.
+
+    Args:
+        files: Processed attachments
+        budget: Token budget per shard for file contents
+        count_tokens: Counts tokens for a list of texts
+    """
+    text_files = [f for f in files if f.category != FileCategory.IMAGE]
+    images = [f for f in files if f.category == FileCategory.IMAGE]
+
+    pieces: list[tuple[ProcessedFile, int]] = []
+    for file, tokens in zip(
+        text_files, count_tokens([f.content for f in text_files]), strict=True
+    ):
+        if tokens <= budget:
+            pieces.append((file, tokens))
+            continue
+        parts = _split_lines(file.content, math.ceil(tokens / (budget * 0.9)))
+        for number, part in enumerate(parts, start=1):
+            piece = dataclasses.replace(
+                file,
+                path=f"{file.path} (part {number}/{len(parts)})",
+                content=part,
+            )
+            pieces.append((piece, count_tokens([part])[0]))
+
+    shards: list[list[ProcessedFile]] = [[]]
+    used = 0
+    for piece, tokens in pieces:
+        if shards[-1] and used + tokens > budget:
+            shards.append([])
+            used = 0
+        shards[-1].append(piece)
+        used += tokens
+
+    shards[0].extend(images)
+    return shards
+
+
+def _split_lines(content: str, count: int) -> list[str]:
+    """Split text into about count chunks of similar size at line breaks"""
+    target = math.ceil(len(content) / count)
+    chunks: list[str] = []
+    current: list[str] = []
+    size = 0
+    for line in content.splitlines(keepends=True):
+        if current and size + len(line) > target and len(chunks) < count - 1:
+            chunks.append("".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line)
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def build_shards(prompt: str, shards: list[list[ProcessedFile]]) -> list[Shard]:
+    """Shard inputs: the request, the part instructions and the shard's files"""
+    built: list[Shard] = []
+    for index, files in enumerate(shards):
+        instructions = SHARD_INSTRUCTIONS.format(index=index + 1, total=len(shards))
+        segments = build_prompt_segments(prompt + instructions, files)
+        built.append(
+            Shard(
+                files=[f.path for f in files],
+                prompt=[text for _, text in segments],
+                images=build_image_content(files) or None,
+            )
+        )
+    return built
+
+
+def reduce_prompt(prompt: str, findings: list[tuple[list[str], str]]) -> str:
+    """Prompt for the reduce call from (file labels, output) per shard"""
+    parts = [prompt, REDUCE_INSTRUCTIONS.format(total=len(findings))]
+    for index, (paths, output) in enumerate(findings, start=1):
+        parts.append(f"\n## Findings from part {index}\n")
+        parts.append(f"Files: {', '.join(paths)}\n\n{output}\n")
+    return "".join(parts)
+
+
+def shard_dirs(session_dir: Path) -> list[Path]:
+    """Stage directories of the map step, in order"""
+    return sorted(p for p in (session_dir / SHARDS_DIR).iterdir() if p.is_dir())
+
+
+def read_stage(stage_dir: Path) -> dict[str, Any]:
+    """Recorded state of a stage ({} if it never ran)"""
+    status_file = stage_dir / "status.json"
+    if not status_file.exists():
+        return {}
+    state: dict[str, Any] = json.loads(status_file.read_text())
+    return state
+
+
+def run_map_reduce(
+    session_dir: Path,
+    consult: Consult,
+    on_progress: Callable[[str], None],
+    on_delta: Callable[[str], None] | None = None,
+) -> dict[str, Any]:
+    """
+    Run the pending shards concurrently, then the reduce call.
+
+    Shards that already completed (from an earlier attempt) are reused.
+    If any shard fails, the reduce step is skipped and RuntimeError names
+    the failed shards; retrying the session reruns only those.
+
+    Returns:
+        Dict with the reduce 'content' and 'usage'/'cost_info' summed over
+        every stage
+    """
+    stages = shard_dirs(session_dir)
+    pending = [d for d in stages if read_stage(d).get("status") != "completed"]
+    on_progress(
+        f"map: {len(stages) - len(pending)}/{len(stages)} shards done, "
+        f"running {len(pending)}"
+    )
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(config.MAP_REDUCE_CONCURRENCY, len(pending)))
+    ) as pool:
+        list(pool.map(lambda d: _run_stage(d, consult), pending))
+
+    failed = [d.name for d in stages if read_stage(d).get("status") != "completed"]
+    if failed:
+        raise RuntimeError(
+            f"{len(failed)} of {len(stages)} shard(s) failed ({', '.join(failed)}); "
+            "retry the session to rerun only the failed shards"
+        )
+
+    findings = [
+        (
+            json.loads((d / "files.json").read_text()),
+            (d / "output.txt").read_text(encoding="utf-8"),
+        )
+        for d in stages
+    ]
+    request = (session_dir / "prompt.txt").read_text(encoding="utf-8")
+
+    on_progress("reduce")
+    reduce_dir = session_dir / REDUCE_DIR
+    reduce_dir.mkdir(exist_ok=True)
+    (reduce_dir / "prompt.txt").write_text(
+        reduce_prompt(request, findings), encoding="utf-8"
+    )
+    _run_stage(reduce_dir, consult, on_delta)
+
+    reduced = read_stage(reduce_dir)
+    if reduced.get("status") != "completed":
+        raise RuntimeError(f"Reduce step failed: {reduced.get('error')}")
+
+    results = [read_stage(d) for d in [*stages, reduce_dir]]
+    return {
+        "content": (reduce_dir / "output.txt").read_text(encoding="utf-8"),
+        "usage": _sum_numbers([r.get("usage") for r in results]),
+        "cost_info": _sum_numbers([r.get("cost_info") for r in results]),
+    }
+
+
+def _run_stage(
+    stage_dir: Path, consult: Consult, on_delta: Callable[[str], None] | None = None
+) -> None:
+    """Run one stage and record its outcome in stage_dir/status.json"""
+    status_file = stage_dir / "status.json"
+    status_file.write_text(json.dumps({"status": "running"}))
+    try:
+        result = consult(stage_dir, on_delta)
+    except Exception as e:
+        status_file.write_text(json.dumps({"status": "error", "error": str(e)}))
+        return
+
+    (stage_dir / "output.txt").write_text(result.get("content", ""), encoding="utf-8")
+    status_file.write_text(
+        json.dumps(
+            {
+                "status": "completed",
+                "usage": result.get("usage"),
+                "cost_info": result.get("cost_info"),
+            }
+        )
+    )
+
+
+def _sum_numbers(dicts: list[dict[str, Any] | None]) -> dict[str, Any] | None:
+    """
+    Add up the numeric values of several usage/cost dicts, including nested
+    ones such as prompt_tokens_details
+    """
+    present = [d for d in dicts if d]
+    if not present:
+        return None
+    total: dict[str, Any] = {}
+    for key in dict.fromkeys(k for d in present for k in d):
+        values = [d[key] for d in present if key in d]
+        numbers = [
+            v for v in values if isinstance(v, (int, float)) and not isinstance(v, bool)
+        ]
+        if numbers:
+            total[key] = sum(numbers)
+        elif any(isinstance(v, dict) for v in values):
+            total[key] = _sum_numbers([v for v in values if isinstance(v, dict)])
+        else:
+            total[key] = values[0]
+    return total
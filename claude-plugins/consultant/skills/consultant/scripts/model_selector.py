@@ -4,8 +4,8 @@ Model discovery and selection logic
 
 from typing import Any
 
-import requests
-from litellm import model_cost
+import config
+from http_pool import get_http_client
 
 
 class ModelSelector:
@@ -25,11 +25,12 @@ class ModelSelector:
             return ModelSelector._get_litellm_models()
 
         # Try LiteLLM proxy /models endpoint first, then OpenAI-compatible /v1/models
+        client = get_http_client(base_url)
         last_error = None
         for endpoint in ["/models", "/v1/models"]:
             try:
                 models_url = f"{base_url.rstrip('/')}{endpoint}"
-                response = requests.get(models_url, timeout=10)
+                response = client.get(models_url, timeout=config.MODEL_LIST_TIMEOUT)
                 response.raise_for_status()
 
                 data = response.json()
@@ -123,6 +124,8 @@ class ModelSelector:
         Get models from LiteLLM's model_cost dictionary.
         This provides dynamic model discovery without hardcoded lists.
         """
+        # Imported lazily: listing models from a proxy doesn't need litellm
+        from litellm import model_cost
 
         if not model_cost:
             raise RuntimeError("LiteLLM model_cost is empty - cannot discover models")
@@ -0,0 +1,411 @@
+"""
+Expansion of directory and glob attachments into file paths.
+Walks directories with os.scandir, skips what git ignores and filters by
+include/exclude patterns, size and a sniff of the first few KB, so binary
+assets are never read in full. Inside a git work tree git itself lists the
+ignored paths; elsewhere a .gitignore matcher stands in for it.
+"""
+
+import fnmatch
+import glob
+import os
+import re
+import subprocess
+from collections import Counter
+from dataclasses import dataclass, field
+
+import config
+from file_handler import (
+    BINARY_SNIFF_BYTES,
+    IMAGE_EXTENSIONS,
+    OFFICE_EXTENSIONS,
+    looks_binary,
+)
+
+# Reasons a file found by expansion was left out
+IGNORED = "gitignored"
+EXCLUDED = "excluded"
+NOT_TEXT = "image/office (use --include)"
+TOO_LARGE = "over size cap"
+BINARY = "binary"
+EMPTY = "empty"
+
+_GLOB_CHARS = re.compile(r"[*?\[]")
+
+# (directory the rule applies under, compiled pattern, negated, directories only)
+_Rule = tuple[str, re.Pattern[str], bool, bool]
+
+
+@dataclass
+class Expansion:
+    """Result of expanding the -f arguments"""
+
+    paths: list[str] = field(default_factory=list)
+    expanded_args: int = 0  # directory/glob arguments among the inputs
+    skipped: Counter[str] = field(default_factory=Counter)
+
+    def describe(self) -> str:
+        """One-line summary of what the expansion found and skipped"""
+        summary = (
+            f"Expanded {self.expanded_args} directory/glob argument(s) "
+            f"to {len(self.paths)} file(s)"
+        )
+        if self.skipped:
+            reasons = ", ".join(f"{n} {reason}" for reason, n in self.skipped.items())
+            summary += f"; skipped {reasons}"
+        return summary
+
+
+def expand_paths(
+    args: list[str],
+    include: list[str] | None = None,
+    exclude: list[str] | None = None,
+    max_file_bytes: int = config.EXPAND_MAX_FILE_BYTES,
+) -> Expansion:
+    """
+    Expand directories and glob patterns among args into attachable files.
+
+    Paths of existing files are kept as given, unfiltered. Directories are
+    walked recursively and glob patterns ('**' matches any depth) are
+    expanded; the files they yield are filtered by, in order: git's ignore
+    rules (as `git ls-files --exclude-standard` applies them inside a work
+    tree, .gitignore files matched by hand outside one), include/exclude
+    patterns, type (images and office documents only when an
+    include pattern names them), size cap, and a binary/UTF-8 sniff of the
+    first few KB.
+
+    Patterns match the path relative to the directory argument (or to the
+    leading directories of a glob that contain no wildcards), and patterns
+    without '/' also match the file name. Results keep
+    argument order, directory contents sorted, without duplicates.
+
+    Raises:
+        ValueError: If a glob pattern matches nothing
+    """
+    expansion = Expansion()
+    include = include or []
+    exclude = exclude or []
+    ignores: dict[str, _Ignore] = {}
+
+    def add(
+        path: str, abs_path: str, rel: str, ignore: "_Ignore", check_parents: bool
+    ) -> None:
+        if ignore.ignored(abs_path, is_dir=False, check_parents=check_parents):
+            expansion.skipped[IGNORED] += 1
+            return
+        reason = _filter_reason(path, rel, include, exclude, max_file_bytes)
+        if reason:
+            expansion.skipped[reason] += 1
+        else:
+            expansion.paths.append(path)
+
+    for arg in args:
+        if os.path.isfile(arg):
+            expansion.paths.append(arg)
+        elif os.path.isdir(arg):
+            # A directory named explicitly is walked even if it is ignored
+            expansion.expanded_args += 1
+            root = os.path.abspath(arg)
+            ignore = _ignore_for(root, ignores)
+            for path, abs_path in _walk(arg, root, ignore, expansion.skipped):
+                rel = abs_path[len(root) + 1 :]
+                add(os.path.normpath(path), abs_path, rel, ignore, False)
+        elif glob_char := _GLOB_CHARS.search(arg):
+            expansion.expanded_args += 1
+            matches = sorted(glob.glob(arg, recursive=True))
+            if not matches:
+                raise ValueError(f"No files match '{arg}'")
+            # Patterns apply below the glob's fixed leading directories
+            base = os.path.dirname(arg[: glob_char.start()]) or "."
+            for match in matches:
+                if os.path.isfile(match):
+                    abs_path = os.path.abspath(match)
+                    directory = os.path.dirname(abs_path)
+                    ignore = _ignore_for(_repo_root(directory) or directory, ignores)
+                    rel = os.path.relpath(match, base)
+                    add(match, abs_path, rel, ignore, True)
+        else:
+            # Missing paths are reported by FileHandler like any other file
+            expansion.paths.append(arg)
+
+    expansion.paths = list(dict.fromkeys(expansion.paths))
+    return expansion
+
+
+def _walk(
+    root: str, abs_root: str, ignore: "_Ignore", skipped: Counter[str]
+) -> list[tuple[str, str]]:
+    """
+    (path, absolute path) of the files under root, depth first in sorted
+    order, pruning ignored directories
+    """
+    found: list[tuple[str, str]] = []
+    stack = [(root, abs_root)]
+    while stack:
+        directory, abs_directory = stack.pop()
+        try:
+            with os.scandir(directory) as scan:
+                entries = sorted(scan, key=lambda e: e.name)
+        except OSError:
+            continue
+
+        subdirs: list[tuple[str, str]] = []
+        for entry in entries:
+            if entry.name == ".git":
+                continue
+            # Symlinked directories are not followed, so the walk cannot loop
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if not is_dir and not entry.is_file():
+                continue
+            abs_path = os.path.join(abs_directory, entry.name)
+            if ignore.ignored(abs_path, is_dir, check_parents=False):
+                skipped[IGNORED] += 1
+            elif is_dir:
+                subdirs.append((entry.path, abs_path))
+            else:
+                found.append((entry.path, abs_path))
+        stack.extend(reversed(subdirs))
+    return found
+
+
+def _filter_reason(
+    path: str,
+    rel: str,
+    include: list[str],
+    exclude: list[str],
+    max_file_bytes: int,
+) -> str | None:
+    """Why an expanded file is left out, or None to attach it"""
+    rel = rel.replace(os.sep, "/")
+    included = _matches(rel, include)
+    if (include and not included) or _matches(rel, exclude):
+        return EXCLUDED
+
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix in IMAGE_EXTENSIONS or suffix in OFFICE_EXTENSIONS:
+        # Converted by FileHandler; only attached when asked for by name
+        return None if included else NOT_TEXT
+
+    try:
+        size = os.path.getsize(path)
+        if size > max_file_bytes:
+            return TOO_LARGE
+        with open(path, "rb") as f:
+            head = f.read(BINARY_SNIFF_BYTES)
+    except OSError:
+        return None  # Let FileHandler report it
+    complete = size <= BINARY_SNIFF_BYTES
+    if looks_binary(head, complete):
+        return BINARY
+    if complete and not head.strip():
+        return EMPTY
+    return None
+
+
+def _matches(rel: str, patterns: list[str]) -> bool:
+    name = rel.rsplit("/", 1)[-1]
+    return any(
+        fnmatch.fnmatch(rel, pattern)
+        or ("/" not in pattern and fnmatch.fnmatch(name, pattern))
+        for pattern in patterns
+    )
+
+
+def _ignore_for(directory: str, ignores: dict[str, "_Ignore"]) -> "_Ignore":
+    """
+    What is ignored under a directory: git's own listing inside a work tree,
+    the .gitignore matcher outside one or when git cannot say
+    """
+    if directory not in ignores:
+        top = _repo_root(directory)
+        ignore = _git_ignored(directory) if top else None
+        ignores[directory] = ignore or _GitIgnore(top or directory)
+    return ignores[directory]
+
+
+def _repo_root(directory: str) -> str | None:
+    current = directory
+    while True:
+        if os.path.exists(os.path.join(current, ".git")):
+            return current
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None
+        current = parent
+
+
+def _git_ignored(directory: str) -> "_GitIgnored | None":
+    """
+    The ignored untracked paths under a directory as git lists them, or None
+    if git cannot list them (not installed, not a work tree, or the
+    directory is itself ignored)
+    """
+    try:
+        completed = subprocess.run(
+            ["git", "-C", directory, "ls-files", "-z", "--others", "--ignored"]
+            + ["--exclude-standard", "--directory"],
+            capture_output=True,
+            check=False,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if completed.returncode != 0:
+        return None
+    entries = [os.fsdecode(e) for e in completed.stdout.split(b"\0") if e]
+    if "./" in entries:
+        # git reports an ignored directory as a whole; the matcher still
+        # tells the files below an explicitly named one apart
+        return None
+    return _GitIgnored(directory, entries)
+
+
+class _GitIgnored:
+    """
+    Ignored paths under a directory from `git ls-files --ignored`, which
+    collapses an ignored directory to one 'dir/' entry. Tracked files are
+    never listed, so like git this keeps them even when a pattern matches.
+    """
+
+    def __init__(self, top: str, entries: list[str]) -> None:
+        self.top = top
+        self._files: set[str] = set()
+        self._dirs: set[str] = set()
+        for entry in entries:
+            path = os.path.join(top, os.path.normpath(entry))
+            (self._dirs if entry.endswith("/") else self._files).add(path)
+
+    def ignored(self, path: str, is_dir: bool, check_parents: bool) -> bool:
+        """Same contract as _GitIgnore.ignored"""
+        if not path.startswith(self.top + os.sep):
+            return False
+        if path in (self._dirs if is_dir else self._files):
+            return True
+        if check_parents:
+            parent = os.path.dirname(path)
+            while parent != self.top:
+                if parent in self._dirs:
+                    return True
+                parent = os.path.dirname(parent)
+        return False
+
+
+class _GitIgnore:
+    """
+    .gitignore rules of a tree, loaded lazily per directory; the fallback for
+    trees git cannot list.
+
+    Supports the usual syntax: comments, negation with '!', trailing '/' for
+    directories, anchoring with a leading or inner '/', and '*', '?', '[...]'
+    and '**' wildcards. The last matching rule wins, and rules in a
+    subdirectory's .gitignore apply relative to that subdirectory.
+    """
+
+    def __init__(self, top: str) -> None:
+        self.top = top
+        self._rules: dict[str, list[_Rule]] = {}
+
+    def ignored(self, path: str, is_dir: bool, check_parents: bool) -> bool:
+        """
+        Whether an absolute path is ignored. With check_parents, an ignored
+        directory between the top and the path also ignores it (a walk
+        prunes those directories instead).
+        """
+        if not path.startswith(self.top + os.sep):
+            return False
+        if check_parents:
+            parent = os.path.dirname(path)
+            if parent != self.top and self.ignored(parent, True, True):
+                return True
+
+        result = False
+        for base, regex, negate, dir_only in self._rules_for(os.path.dirname(path)):
+            if dir_only and not is_dir:
+                continue
+            rel = path[len(base) + 1 :].replace(os.sep, "/")
+            if regex.fullmatch(rel):
+                result = not negate
+        return result
+
+    def _rules_for(self, directory: str) -> list[_Rule]:
+        rules = self._rules.get(directory)
+        if rules is None:
+            if directory == self.top:
+                exclude = os.path.join(directory, ".git", "info", "exclude")
+                inherited = _load_rules(exclude, directory)
+            else:
+                inherited = self._rules_for(os.path.dirname(directory))
+            gitignore = os.path.join(directory, ".gitignore")
+            rules = inherited + _load_rules(gitignore, directory)
+            self._rules[directory] = rules
+        return rules
+
+
+_Ignore = _GitIgnored | _GitIgnore
+
+
+def _load_rules(path: str, base: str) -> list[_Rule]:
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return []
+    rules: list[_Rule] = []
+    for line in lines:
+        rule = _compile_rule(line, base)
+        if rule:
+            rules.append(rule)
+    return rules
+
+
+def _compile_rule(line: str, base: str) -> _Rule | None:
+    if not line.strip() or line.startswith("#"):
+        return None
+    line = line.rstrip()
+    negate = line.startswith("!")
+    if negate:
+        line = line[1:]
+    if line.startswith("\\"):
+        line = line[1:]  # escaped leading '#' or '!'
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+
+    # A slash anywhere but the end anchors the pattern to its directory
+    anchored = "/" in line
+    regex = _translate(line.lstrip("/"))
+    if not anchored:
+        regex = "(?:.*/)?" + regex
+    return base, re.compile(regex), negate, dir_only
+
+
+def _translate(pattern: str) -> str:
+    """gitignore glob to regex: '*' and '?' stop at '/', '**' crosses it"""
+    out: list[str] = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            out.append("[^/]*")
+        elif char == "?":
+            out.append("[^/]")
+        elif char == "[" and "]" in pattern[i + 1 :]:
+            end = pattern.index("]", i + 1)
+            body = pattern[i + 1 : end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            out.append(f"[{body}]")
+            i = end + 1
+            continue
+        else:
+            out.append(re.escape(char))
+        i += 1
+    return "".join(out)
@@ -0,0 +1,41 @@
+"""
+Polling schedule for background jobs.
+Spaces polls by how long earlier jobs with the same model and reasoning
+effort took: sparse while the job is unlikely to be done, tight around the
+times similar jobs finished.
+"""
+
+from collections.abc import Iterable
+
+import config
+
+
+class PollSchedule:
+    """
+    Delays between polls of one background job.
+
+    With enough history, the next poll comes before more than
+    POLL_FINISH_PROBABILITY of the past jobs that ran at least this long
+    would have finished, so the wait added after completion stays around
+    POLL_MIN_INTERVAL. Without history (or once the job outlasts it), the
+    delay starts at POLL_MIN_INTERVAL and grows by POLL_BACKOFF up to
+    POLL_INTERVAL.
+    """
+
+    def __init__(self, durations: Iterable[float] = ()) -> None:
+        self.durations = sorted(d for d in durations if d > 0)
+        self._backoff = float(config.POLL_MIN_INTERVAL)
+
+    def next_delay(self, elapsed: float) -> float:
+        """Seconds to wait before the next poll, elapsed seconds into the job"""
+        remaining = [d - elapsed for d in self.durations if d > elapsed]
+        if len(remaining) >= config.POLL_HISTORY_MIN_SAMPLES:
+            delay = remaining[int(len(remaining) * config.POLL_FINISH_PROBABILITY)]
+            self._backoff = float(config.POLL_MIN_INTERVAL)
+            return float(
+                min(max(delay, config.POLL_MIN_INTERVAL), config.POLL_MAX_INTERVAL)
+            )
+
+        delay = self._backoff
+        self._backoff = min(self._backoff * config.POLL_BACKOFF, config.POLL_INTERVAL)
+        return delay
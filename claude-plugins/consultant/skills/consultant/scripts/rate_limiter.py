@@ -0,0 +1,249 @@
+"""
+Client-side rate limiting per provider, model and API key.
+Request and token budgets are token buckets in an SQLite file shared by
+every consultant process, so concurrent sessions, batches and the daemon
+draw on one budget instead of each running into the provider's limits.
+"""
+
+import contextlib
+import fnmatch
+import hashlib
+import json
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import config
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    key TEXT PRIMARY KEY,
+    requests REAL NOT NULL,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    paused_until REAL NOT NULL DEFAULT 0
+)
+"""
+
+
+@dataclass
+class RateLimit:
+    """Budget per minute; None leaves that dimension unlimited"""
+
+    rpm: float | None = None
+    tpm: float | None = None
+
+
+def load_rate_limits(path: Path | None = None) -> dict[str, RateLimit]:
+    """
+    Model patterns and their budgets from RATE_LIMITS_PATH, a JSON object
+    such as {"anthropic/*": {"rpm": 50, "tpm": 40000}}. Empty without the file.
+
+    Raises:
+        ValueError: If the file is not a valid rate limit configuration
+    """
+    path = path or config.RATE_LIMITS_PATH
+    if not path.exists():
+        return {}
+    try:
+        entries = json.loads(path.read_text())
+        return {
+            str(pattern): RateLimit(
+                rpm=float(entry["rpm"]) if entry.get("rpm") else None,
+                tpm=float(entry["tpm"]) if entry.get("tpm") else None,
+            )
+            for pattern, entry in entries.items()
+        }
+    except (AttributeError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid rate limits in {path}: {e}") from e
+
+
+def rate_limit_for(model: str, limits: dict[str, RateLimit]) -> RateLimit | None:
+    """
+    Budget for a model: the last pattern matching the model name, or its
+    provider-qualified form (e.g. "openai/gpt-5.2-pro" for "gpt-5.2-pro")
+    """
+    names = {model.lower()}
+    with contextlib.suppress(Exception):
+        from litellm import get_llm_provider
+
+        model_name, provider, _, _ = get_llm_provider(model)
+        names.add(f"{provider}/{model_name}".lower())
+
+    match = None
+    for pattern, limit in limits.items():
+        if any(fnmatch.fnmatch(name, pattern.lower()) for name in names):
+            match = limit
+    return match
+
+
+class RateLimiter:
+    """
+    Token buckets for one model and API key, shared across processes.
+
+    Each bucket holds one minute of the budget, scaled by
+    RATE_LIMIT_HEADROOM so throughput stays just under the provider's quota,
+    and refills continuously. acquire() blocks until a request and its
+    estimated tokens fit; settle() charges the difference to the tokens
+    actually used; pause() holds every process back while the provider asks
+    for a break. Database errors degrade to no limiting.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        limit: RateLimit,
+        base_url: str | None = None,
+        api_key: str | None = None,
+        db_path: Path | None = None,
+    ) -> None:
+        self.model = model
+        self.limit = limit
+        self.db_path = db_path or config.RATE_LIMIT_DB_PATH
+        key_hash = hashlib.sha256((api_key or "").encode()).hexdigest()[:16]
+        self.key = f"{base_url or ''}|{model}|{key_hash}"
+        self.request_capacity = (limit.rpm or 0) * config.RATE_LIMIT_HEADROOM
+        self.token_capacity = (limit.tpm or 0) * config.RATE_LIMIT_HEADROOM
+
+    @classmethod
+    def for_model(
+        cls, model: str, base_url: str | None = None, api_key: str | None = None
+    ) -> "RateLimiter | None":
+        """The limiter for a model, None if no rate limit is configured for it"""
+        limit = rate_limit_for(model, load_rate_limits())
+        if limit is None or not (limit.rpm or limit.tpm):
+            return None
+        return cls(model, limit, base_url, api_key)
+
+    def acquire(self, tokens: int = 0, deadline: float | None = None) -> float:
+        """
+        Take one request and an estimate of its tokens from the buckets,
+        waiting until they fit. Returns the seconds waited.
+
+        A request larger than the whole token budget waits for a full bucket.
+
+        Raises:
+            DeadlineExceededError: If the wait would outlast the deadline
+        """
+        from retry_policy import DeadlineExceededError
+
+        if self.token_capacity:
+            tokens = min(tokens, int(self.token_capacity))
+        waited = 0.0
+        while True:
+            wait = self._take(tokens)
+            if wait <= 0:
+                if waited:
+                    print(f"Rate limit for {self.model}: waited {waited:.1f}s")
+                return waited
+            if deadline is not None and time.time() + wait > deadline:
+                raise DeadlineExceededError(
+                    f"Rate limit for {self.model} leaves no time before the deadline"
+                )
+            time.sleep(wait)
+            waited += wait
+
+    def settle(self, estimated: int, usage: dict[str, Any] | None) -> None:
+        """Charge (or refund) the difference between estimated and used tokens"""
+        if not self.token_capacity or not usage:
+            return
+        used = usage.get("total_tokens") or (
+            (usage.get("input_tokens") or usage.get("prompt_tokens") or 0)
+            + (usage.get("output_tokens") or usage.get("completion_tokens") or 0)
+        )
+        if used:
+            self._update(tokens=float(used) - estimated)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every request on this bucket for a provider back-off"""
+        self._update(paused_until=time.time() + seconds)
+
+    def _take(self, tokens: int) -> float:
+        """Take from the buckets if possible; else the seconds until they fit"""
+        with contextlib.suppress(sqlite3.Error, OSError):
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                now = time.time()
+                requests, available, paused_until = self._refill(conn, now)
+                wait = max(
+                    paused_until - now,
+                    self._shortfall(
+                        min(1, self.request_capacity) - requests, self.request_capacity
+                    ),
+                    self._shortfall(tokens - available, self.token_capacity),
+                )
+                if wait <= 0:
+                    requests -= 1
+                    available -= tokens
+                self._store(conn, requests, available, now)
+                conn.execute("COMMIT")
+                return wait
+            finally:
+                conn.close()
+        return 0.0
+
+    def _update(self, tokens: float = 0.0, paused_until: float | None = None) -> None:
+        """Charge tokens and/or extend the pause in one transaction"""
+        with contextlib.suppress(sqlite3.Error, OSError):
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                now = time.time()
+                requests, available, _ = self._refill(conn, now)
+                self._store(conn, requests, available - tokens, now)
+                if paused_until is not None:
+                    conn.execute(
+                        "UPDATE buckets SET paused_until = MAX(paused_until, ?) "
+                        "WHERE key = ?",
+                        (paused_until, self.key),
+                    )
+                conn.execute("COMMIT")
+            finally:
+                conn.close()
+
+    def _refill(
+        self, conn: sqlite3.Connection, now: float
+    ) -> tuple[float, float, float]:
+        """The buckets' contents at now: (requests, tokens, paused_until)"""
+        row = conn.execute(
+            "SELECT requests, tokens, updated_at, paused_until FROM buckets "
+            "WHERE key = ?",
+            (self.key,),
+        ).fetchone()
+        if row is None:
+            # A new bucket starts full
+            return self.request_capacity, self.token_capacity, 0.0
+        requests, tokens, updated_at, paused_until = row
+        elapsed = max(now - updated_at, 0)
+        return (
+            min(requests + elapsed * self.request_capacity / 60, self.request_capacity),
+            min(tokens + elapsed * self.token_capacity / 60, self.token_capacity),
+            float(paused_until),
+        )
+
+    def _store(
+        self, conn: sqlite3.Connection, requests: float, tokens: float, now: float
+    ) -> None:
+        conn.execute(
+            "INSERT INTO buckets (key, requests, tokens, updated_at) "
+            "VALUES (?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+            "requests = excluded.requests, tokens = excluded.tokens, "
+            "updated_at = excluded.updated_at",
+            (self.key, requests, tokens, now),
+        )
+
+    @staticmethod
+    def _shortfall(missing: float, capacity: float) -> float:
+        """Seconds until a bucket of capacity per minute refills by missing"""
+        if not capacity or missing <= 0:
+            return 0.0
+        return missing * 60 / capacity
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        conn.execute(_SCHEMA)
+        return conn
@@ -0,0 +1,111 @@
+"""
+Opt-in on-disk cache of complete consultation responses.
+Identical requests (same input, model, endpoint and reasoning effort) are
+answered from the cache instead of calling the model again.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any
+
+import config
+from conversion_cache import CacheSize, file_size, write_atomic
+
+# Bump when the key derivation or entry format changes
+RESPONSE_CACHE_VERSION = "1"
+
+# Session input files that make up a request, at any stage depth
+_INPUT_FILES = {"prompt.txt", "images.json", "files.json"}
+_HASH_CHUNK_BYTES = 1024 * 1024
+
+
+class ResponseCache:
+    """
+    Exact-match cache of responses with a TTL and LRU eviction.
+
+    Entries are JSON files named by their key. Expired entries are dropped
+    when read; reading an entry refreshes its mtime, and writes evict the
+    least recently used entries once the cache exceeds max_bytes (see
+    CacheSize). All failures degrade to cache misses.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path | None = None,
+        max_bytes: int = config.RESPONSE_CACHE_MAX_BYTES,
+        ttl: float = config.RESPONSE_CACHE_TTL,
+    ) -> None:
+        self.cache_dir = cache_dir or config.RESPONSE_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._size = CacheSize(self.cache_dir, "*/*.json", max_bytes)
+
+    @staticmethod
+    def key_for(
+        input_dir: Path, model: str, base_url: str | None, reasoning_effort: str
+    ) -> str:
+        """
+        Hash the request written to a session directory (prompt, images and
+        map-reduce shards) together with model, endpoint and effort
+        """
+        digest = hashlib.sha256(
+            f"{RESPONSE_CACHE_VERSION}\0{model}\0{base_url or ''}\0"
+            f"{reasoning_effort}\0".encode()
+        )
+        for path in sorted(input_dir.rglob("*")):
+            if path.name not in _INPUT_FILES:
+                continue
+            digest.update(f"{path.relative_to(input_dir).as_posix()}\0".encode())
+            with path.open("rb") as f:
+                while chunk := f.read(_HASH_CHUNK_BYTES):
+                    digest.update(chunk)
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        """Return the cached entry for key, or None if missing or expired"""
+        entry = self._entry_path(key)
+        try:
+            cached: dict[str, Any] = json.loads(entry.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - cached.get("stored_at", 0) > self.ttl:
+            size = file_size(entry)
+            with contextlib.suppress(OSError):
+                entry.unlink()
+                self._size.add(-size)
+            return None
+
+        # Mark as recently used for LRU eviction
+        with contextlib.suppress(OSError):
+            os.utime(entry)
+        return cached
+
+    def put(self, key: str, session_id: str, result: dict[str, Any]) -> None:
+        """Store a completed result, then evict old entries if over the cap"""
+        cached = {
+            "content": result.get("content", ""),
+            "usage": result.get("usage"),
+            "cost_info": result.get("cost_info"),
+            "session_id": session_id,
+            "stored_at": time.time(),
+        }
+        entry = self._entry_path(key)
+        try:
+            data = json.dumps(cached).encode("utf-8")
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            replaced = file_size(entry)
+            write_atomic(entry, data)
+        except (OSError, TypeError, ValueError):
+            # Caching is best-effort; it must never fail the session
+            return
+
+        self._size.add(len(data) - replaced)
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
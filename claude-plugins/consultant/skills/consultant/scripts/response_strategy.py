@@ -4,15 +4,26 @@ Handles retries, background jobs, and provider-specific quirks.
 Automatically detects responses API vs completions API support.
 """
 
+import contextlib
+import hashlib
 import time
 from abc import ABC, abstractmethod
+from collections.abc import Callable
 from pathlib import Path
 from typing import Any
 
 import litellm
-from litellm import _should_retry, completion, responses
+from litellm import completion, responses
 
 import config
+from file_handler import split_prompt
+from poll_schedule import PollSchedule
+from retry_policy import (
+    DeadlineExceededError,
+    RequestAbandonedError,
+    RetryPolicy,
+    is_retryable,
+)
 
 
 def _is_responses_api_model(model_name: str) -> bool:
@@ -112,6 +123,24 @@ def supports_responses_api(model: str) -> bool:
     return _is_responses_api_model(model_name)
 
 
+def supports_cache_control(model: str) -> bool:
+    """
+    Whether prompt caching has to be requested with cache_control breakpoints
+    (Anthropic models, also on Bedrock and Vertex); other providers cache
+    prompt prefixes automatically
+    """
+    model_lower = model.lower()
+    return "claude" in model_lower or model_lower.startswith("anthropic/")
+
+
+def prompt_cache_key(prefix: str) -> str:
+    """
+    Responses API prompt_cache_key for a reference files prefix, so requests
+    sharing the prefix are routed to the same prompt cache
+    """
+    return "consultant-" + hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:32]
+
+
 class ResponseStrategy(ABC):
     """Base class for response strategies"""
 
@@ -122,6 +151,7 @@ class ResponseStrategy(ABC):
         prompt: str,
         session_dir: Path | None = None,
         multimodal_content: list[dict[str, Any]] | None = None,
+        on_delta: Callable[[str], None] | None = None,
         **kwargs: Any,
     ) -> dict[str, Any]:
         """
@@ -133,7 +163,10 @@ class ResponseStrategy(ABC):
             prompt: Text prompt
             session_dir: Optional session directory for state persistence
             multimodal_content: Optional multimodal content array for images
-            **kwargs: Additional provider-specific arguments
+            on_delta: Optional callback receiving text deltas as they stream in.
+                When set, the request is made in streaming mode.
+            **kwargs: Additional provider-specific arguments; retry_policy is
+                the RetryPolicy for the requests (default: no deadline)
         """
         raise NotImplementedError
 
@@ -142,16 +175,87 @@ class ResponseStrategy(ABC):
         """Whether this strategy supports resuming after failure"""
         raise NotImplementedError
 
-    def _calculate_backoff_delay(
-        self, attempt: int, base_delay: int, max_delay: int
-    ) -> float:
-        """Calculate exponential backoff delay with jitter"""
-        import random
+    def _convert_to_responses_api_format(
+        self, multimodal_content: list[dict[str, Any]]
+    ) -> list[dict[str, Any]]:
+        """
+        Convert multimodal content from Completions API format to Responses API format.
+
+        Completions format: [{"type": "text/image_url", ...}]
+        Responses format: [{"type": "input_text/input_image", ...}]
+        """
+        converted: list[dict[str, Any]] = []
+        for item in multimodal_content:
+            item_type = item.get("type", "")
+            if item_type == "text":
+                converted.append({"type": "input_text", "text": item.get("text", "")})
+            elif item_type == "image_url":
+                # Extract URL from nested object
+                image_url = item.get("image_url", {})
+                url = image_url.get("url", "") if isinstance(image_url, dict) else ""
+                converted.append({"type": "input_image", "image_url": url})
+        return converted
+
+    def _layout_content(
+        self, prompt: str, multimodal_content: list[dict[str, Any]] | None
+    ) -> tuple[list[dict[str, Any]], int]:
+        """
+        Completions-format content blocks in cache-friendly order: the
+        reference files, the images, then the question. Also returns the
+        index of the last block of that stable prefix (-1 if there is none).
+        """
+        prefix, question = split_prompt(prompt)
+        blocks: list[dict[str, Any]] = []
+        if prefix:
+            blocks.append({"type": "text", "text": prefix})
+        blocks.extend(
+            item for item in multimodal_content or [] if item.get("type") == "image_url"
+        )
+        last_stable = len(blocks) - 1
+        blocks.append({"type": "text", "text": question})
+        return blocks, last_stable
+
+    def _history_content(
+        self, content: str | list[dict[str, Any]]
+    ) -> tuple[str, list[dict[str, Any]] | None]:
+        """Prompt text and multimodal content of an earlier user turn"""
+        if isinstance(content, str):
+            return content, None
+        text = next((i.get("text", "") for i in content if i.get("type") == "text"), "")
+        return text, content
+
+    def _responses_input(
+        self,
+        prompt: str,
+        multimodal_content: list[dict[str, Any]] | None,
+        history: list[dict[str, Any]] | None,
+    ) -> str | list[dict[str, Any]]:
+        """
+        Responses API input: the prompt (converted to input items when it has
+        images), after the messages of earlier turns for follow-ups
+        """
 
-        delay = min(base_delay * (2**attempt), max_delay)
-        # Add 10% jitter to avoid thundering herd
-        jitter = delay * 0.1 * random.random()
-        return float(delay + jitter)
+        def convert(
+            text: str, content: list[dict[str, Any]] | None
+        ) -> str | list[dict[str, Any]]:
+            if not content:
+                return text
+            blocks, _ = self._layout_content(text, content)
+            return self._convert_to_responses_api_format(blocks)
+
+        current = convert(prompt, multimodal_content)
+        if not history:
+            return current
+
+        items: list[dict[str, Any]] = []
+        for message in history:
+            if message["role"] == "user":
+                content = convert(*self._history_content(message["content"]))
+            else:
+                content = message["content"]
+            items.append({"role": message["role"], "content": content})
+        items.append({"role": "user", "content": current})
+        return items
 
     def _extract_content(self, response: Any) -> str:
         """
@@ -176,6 +280,50 @@ class ResponseStrategy(ABC):
                 # Skip 'reasoning' items (ResponseReasoningItem) - they have summary, not content
         return content
 
+    def _consume_responses_stream(
+        self,
+        stream: Any,
+        on_delta: Callable[[str], None],
+        on_created: Callable[[str], None] | None = None,
+    ) -> tuple[str, Any]:
+        """
+        Consume a Responses API event stream.
+
+        Forwards each output text delta to on_delta and reports the response id
+        from the 'response.created' event to on_created (used to persist it for
+        resumability). Returns the accumulated text and the final response object.
+        """
+        content = ""
+        final_response = None
+
+        for event in stream:
+            event_type = getattr(event, "type", None)
+
+            if event_type == "response.created" and on_created:
+                response = getattr(event, "response", None)
+                response_id = getattr(response, "id", None)
+                if response_id:
+                    on_created(response_id)
+            elif event_type == "response.output_text.delta":
+                delta = getattr(event, "delta", "") or ""
+                if delta:
+                    content += delta
+                    on_delta(delta)
+            elif event_type == "response.completed":
+                final_response = getattr(event, "response", None)
+            elif event_type in ("response.failed", "error"):
+                response = getattr(event, "response", None)
+                error = getattr(response, "error", None) or getattr(
+                    event, "message", "Unknown error"
+                )
+                raise RuntimeError(f"Streamed response failed: {error}")
+
+        # Prefer the authoritative text from the completed response if present
+        if final_response is not None:
+            content = self._extract_content(final_response) or content
+
+        return content, final_response
+
     def _serialize_usage(self, usage: Any) -> dict[str, Any] | None:
         """
         Safely convert usage object to a JSON-serializable dict.
@@ -210,159 +358,377 @@ class ResponseStrategy(ABC):
             return None
 
 
+class _StreamStartError(RuntimeError):
+    """A streamed background job failed before the job was created"""
+
+
+class _StreamUnsupportedError(_StreamStartError):
+    """The provider cannot stream background jobs; polling still works"""
+
+
+# Messages of errors saying a provider cannot stream background jobs
+_STREAM_UNSUPPORTED_MESSAGES = ("not supported", "unsupported", "does not support")
+
+
+def _stream_unsupported(error: Exception) -> bool:
+    """Whether error rejects streaming itself, rather than the request"""
+    if isinstance(error, NotImplementedError):
+        return True
+    message = str(error).lower()
+    return "stream" in message and any(
+        x in message for x in _STREAM_UNSUPPORTED_MESSAGES
+    )
+
+
 class BackgroundJobStrategy(ResponseStrategy):
     """
-    For OpenAI/Azure - uses background jobs with response_id polling.
+    For OpenAI/Azure - uses background jobs, waiting on their event stream
+    and polling by response_id when the stream is unavailable or drops.
     Supports resuming after network failures by persisting response_id.
     """
 
-    def _convert_to_responses_api_format(
-        self, multimodal_content: list[dict[str, Any]]
-    ) -> list[dict[str, Any]]:
-        """
-        Convert multimodal content from Completions API format to Responses API format.
-
-        Completions format: [{"type": "text/image_url", ...}]
-        Responses format: [{"type": "input_text/input_image", ...}]
-        """
-        converted: list[dict[str, Any]] = []
-        for item in multimodal_content:
-            item_type = item.get("type", "")
-            if item_type == "text":
-                converted.append({"type": "input_text", "text": item.get("text", "")})
-            elif item_type == "image_url":
-                # Extract URL from nested object
-                image_url = item.get("image_url", {})
-                url = image_url.get("url", "") if isinstance(image_url, dict) else ""
-                converted.append({"type": "input_image", "image_url": url})
-        return converted
-
     def execute(
         self,
         model: str,
         prompt: str,
         session_dir: Path | None = None,
         multimodal_content: list[dict[str, Any]] | None = None,
+        on_delta: Callable[[str], None] | None = None,
         **kwargs: Any,
     ) -> dict[str, Any]:
-        """Execute with background job and polling"""
+        """Execute with a background job, streamed or polled"""
 
         response_id_file = session_dir / "response_id.txt" if session_dir else None
 
+        # Completion times of similar past jobs, to schedule the polls
+        schedule = PollSchedule(kwargs.pop("job_durations", None) or ())
+        policy: RetryPolicy = kwargs.pop("retry_policy", None) or RetryPolicy()
+
+        # With detach, a started job is returned as pending instead of being
+        # waited on, for the caller to poll along with other jobs
+        detach = kwargs.pop("detach", False) and not on_delta
+
         # Check if we're resuming an existing background job
         if response_id_file and response_id_file.exists():
             response_id = response_id_file.read_text().strip()
             print(f"Resuming background job: {response_id}")
-            return self._poll_for_completion(response_id)
+            if detach:
+                return {"pending_response_id": response_id, "started_at": None}
+            return self._poll_for_completion(
+                response_id, schedule, deadline=policy.deadline, **kwargs
+            )
 
-        # Build input - convert multimodal to Responses API format if provided
-        input_content: str | list[dict[str, Any]]
-        if multimodal_content:
-            input_content = self._convert_to_responses_api_format(multimodal_content)
-        else:
-            input_content = prompt
+        # Build input - convert multimodal to Responses API format if provided,
+        # after the earlier turns of a follow-up rebuilt from its session
+        history = kwargs.pop("history", None)
+        input_content = self._responses_input(prompt, multimodal_content, history)
+
+        # Route requests with the same reference files to the same prompt cache
+        prefix, _ = split_prompt(
+            self._history_content(history[0]["content"])[0] if history else prompt
+        )
+        if prefix:
+            kwargs.setdefault("prompt_cache_key", prompt_cache_key(prefix))
+
+        if on_delta:
+            return self._stream_with_retries(
+                policy,
+                lambda: self._stream_background_job(
+                    model,
+                    input_content,
+                    response_id_file,
+                    on_delta,
+                    schedule,
+                    policy,
+                    **kwargs,
+                ),
+            )
+
+        # Wait on the job's event stream even without a consumer for the
+        # deltas: it ends the moment the job completes, where polls would
+        # add a delay. Polling takes over if the stream drops, or if the
+        # provider cannot stream background jobs at all.
+        if not detach:
+            try:
+                return self._stream_with_retries(
+                    policy,
+                    lambda: self._stream_background_job(
+                        model,
+                        input_content,
+                        response_id_file,
+                        lambda delta: None,
+                        schedule,
+                        policy,
+                        **kwargs,
+                    ),
+                )
+            except _StreamUnsupportedError as e:
+                print(f"Background stream unavailable ({e.__cause__}), polling instead")
 
         # Start new background job
-        try:
-            response = responses(
+        started_at = time.time()
+
+        def start(options: dict[str, Any]) -> Any:
+            nonlocal started_at
+            started_at = time.time()
+            return responses(
                 model=model,
                 input=input_content,
                 background=True,  # Returns immediately with response_id
-                num_retries=config.MAX_RETRIES,  # Use LiteLLM's built-in retries
+                **options,
                 **kwargs,
             )
 
-            response_id = response.id
+        try:
+            response = policy.run(start)
+        except DeadlineExceededError:
+            raise
+        except Exception as e:
+            # If background mode fails, maybe not supported - raise for fallback
+            raise RuntimeError(f"Background job failed to start: {e}") from e
+
+        response_id = response.id
+
+        # Persist response_id for resumability
+        if response_id_file:
+            response_id_file.write_text(response_id)
+            print(f"Started background job: {response_id}")
+
+        if detach:
+            return {"pending_response_id": response_id, "started_at": started_at}
 
-            # Persist response_id for resumability
+        # Poll until complete
+        return self._poll_for_completion(
+            response_id, schedule, started_at, policy.deadline, **kwargs
+        )
+
+    @staticmethod
+    def _stream_with_retries(
+        policy: RetryPolicy,
+        stream: Callable[[], dict[str, Any]],
+    ) -> dict[str, Any]:
+        """
+        Run stream, retrying failures to start the job the way
+        RetryPolicy.run does (back-off, Retry-After, rate limiter pause,
+        deadline).
+
+        Raises:
+            _StreamUnsupportedError: If the provider cannot stream background
+                jobs, so the caller can poll instead
+            _StreamStartError: If starting failed with an error that is not
+                retried (or no retries are left)
+        """
+        attempt = 0
+        while True:
+            try:
+                return stream()
+            except _StreamStartError as e:
+                error = e.__cause__ if isinstance(e.__cause__, Exception) else e
+                if _stream_unsupported(error):
+                    raise _StreamUnsupportedError(str(e)) from error
+                delay = policy.next_delay(error, attempt)
+                if delay is None:
+                    raise
+                print(
+                    f"Retryable error, waiting {delay:.1f}s before retry "
+                    f"{attempt + 1}/{policy.max_retries}..."
+                )
+                time.sleep(delay)
+                attempt += 1
+
+    def _stream_background_job(
+        self,
+        model: str,
+        input_content: str | list[dict[str, Any]],
+        response_id_file: Path | None,
+        on_delta: Callable[[str], None],
+        schedule: PollSchedule,
+        policy: RetryPolicy,
+        **kwargs: Any,
+    ) -> dict[str, Any]:
+        """
+        Start a background job in streaming mode.
+
+        The response_id is persisted as soon as the job is created, so if the
+        stream drops the job is still resumable by polling.
+        """
+        response_id: str | None = None
+
+        def remember_response_id(new_id: str) -> None:
+            nonlocal response_id
+            response_id = new_id
             if response_id_file:
-                response_id_file.write_text(response_id)
-                print(f"Started background job: {response_id}")
+                response_id_file.write_text(new_id)
+                print(f"Started background job: {new_id}")
 
-            # Poll until complete
-            return self._poll_for_completion(response_id)
+        def forward_delta(delta: str) -> None:
+            policy.check()
+            on_delta(delta)
 
+        try:
+            started_at = time.time()
+            stream = responses(
+                model=model,
+                input=input_content,
+                background=True,
+                stream=True,
+                **policy.request_options(),
+                **kwargs,
+            )
+            content, response = self._consume_responses_stream(
+                stream, forward_delta, on_created=remember_response_id
+            )
         except Exception as e:
-            # If background mode fails, maybe not supported - raise for fallback
-            raise RuntimeError(f"Background job failed to start: {e}") from e
+            if response_id is None:
+                if isinstance(e, (DeadlineExceededError, RequestAbandonedError)):
+                    raise
+                raise _StreamStartError(f"Background job failed to start: {e}") from e
+            if isinstance(e, (DeadlineExceededError, RequestAbandonedError)):
+                self.cancel(response_id, **kwargs)
+                raise
+            print(f"Stream interrupted ({e}), polling background job: {response_id}")
+            return self._poll_for_completion(
+                response_id, schedule, started_at, policy.deadline, **kwargs
+            )
 
-    def _poll_for_completion(self, response_id: str) -> dict[str, Any]:
-        """Poll for completion with exponential backoff and retries"""
+        if response is None:
+            # Stream ended without a terminal event - the job may still be running
+            if response_id is None:
+                raise RuntimeError("Stream ended before the background job started")
+            return self._poll_for_completion(
+                response_id, schedule, started_at, policy.deadline, **kwargs
+            )
 
-        start_time = time.time()
+        if not content:
+            raise RuntimeError("No content in completed response")
+
+        return {
+            "content": content,
+            "usage": self._serialize_usage(getattr(response, "usage", None)),
+            "response": response,  # Include full response for cost calculation
+            "job_seconds": time.time() - started_at,
+        }
+
+    def _poll_for_completion(
+        self,
+        response_id: str,
+        schedule: PollSchedule,
+        started_at: float | None = None,
+        deadline: float | None = None,
+        **kwargs: Any,
+    ) -> dict[str, Any]:
+        """
+        Poll for completion on the schedule, retrying failed polls as the
+        RetryPolicy allows, until POLL_TIMEOUT or the deadline (epoch
+        seconds). A job still running at the deadline is cancelled.
+
+        started_at is when the job was created, if this process created it;
+        the result then records the job's duration as job_seconds. Only
+        connection settings (api_base, api_key, client) are taken from
+        kwargs, so polls reuse the same endpoint and keep-alive pool as the
+        job itself.
+        """
+        connection = {
+            key: kwargs[key]
+            for key in ("api_base", "api_key", "client")
+            if key in kwargs
+        }
+
+        # Polls are quick; only the wait before a retry has to fit
+        policy = RetryPolicy(deadline)
+        job_start = started_at or time.time()
+        stop_at = time.time() + config.POLL_TIMEOUT
+        if deadline is not None:
+            stop_at = min(stop_at, deadline)
         attempt = 0
 
-        while time.time() - start_time < config.POLL_TIMEOUT:
-            try:
-                # Retrieve the response by ID
-                result = litellm.get_response(response_id=response_id)
-
-                if hasattr(result, "status"):
-                    if result.status == "completed":
-                        content = self._extract_content(result)
-                        if not content:
-                            raise RuntimeError("No content in completed response")
-                        return {
-                            "content": content,
-                            "usage": self._serialize_usage(
-                                getattr(result, "usage", None)
-                            ),
-                            "response": result,  # Include full response for cost calculation
-                        }
-                    elif result.status == "failed":
-                        error = getattr(result, "error", "Unknown error")
-                        raise RuntimeError(f"Background job failed: {error}")
-                    elif result.status in ["in_progress", "queued"]:
-                        # Still processing, wait and retry
-                        time.sleep(config.POLL_INTERVAL)
-                        attempt += 1
-                        continue
-                    else:
-                        # Unknown status, wait and retry
-                        time.sleep(config.POLL_INTERVAL)
-                        continue
-                else:
-                    # No status field - might be complete already
-                    content = self._extract_content(result)
-                    if content:
-                        return {
-                            "content": content,
-                            "usage": self._serialize_usage(
-                                getattr(result, "usage", None)
-                            ),
-                            "response": result,  # Include full response for cost calculation
-                        }
-                    # No content, wait and retry
-                    time.sleep(config.POLL_INTERVAL)
+        try:
+            while True:
+                try:
+                    completion = self.poll_once(response_id, started_at, **connection)
+                except Exception as e:
+                    delay = policy.next_delay(e, attempt)
+                    if delay is None:
+                        if is_retryable(e):
+                            raise RuntimeError(
+                                f"Network errors exceeded max retries: {e}"
+                            ) from e
+                        raise
+                    print(
+                        f"Error polling job, retrying in {delay:.1f}s... "
+                        f"(attempt {attempt + 1}/{policy.max_retries})"
+                    )
+                    time.sleep(delay)
+                    attempt += 1
                     continue
 
-            except Exception as e:
-                error_msg = str(e).lower()
-
-                # Network errors - retry with backoff
-                if any(x in error_msg for x in ["network", "timeout", "connection"]):
-                    if attempt < config.MAX_RETRIES:
-                        delay = self._calculate_backoff_delay(
-                            attempt, config.INITIAL_RETRY_DELAY, config.MAX_RETRY_DELAY
-                        )
-                        print(
-                            f"Network error polling job, retrying in {delay:.1f}s... (attempt {attempt + 1}/{config.MAX_RETRIES})"
-                        )
-                        time.sleep(delay)
-                        attempt += 1
-                        continue
-                    else:
-                        raise RuntimeError(
-                            f"Network errors exceeded max retries: {e}"
-                        ) from e
-
-                # Other errors - raise immediately
-                raise
-
+                attempt = 0
+                if completion is not None:
+                    return completion
+                if time.time() >= stop_at:
+                    break
+                delay = schedule.next_delay(time.time() - job_start)
+                time.sleep(max(min(delay, stop_at - time.time()), 0))
+        except DeadlineExceededError:
+            self.cancel(response_id, **connection)
+            raise
+
+        if deadline is not None and stop_at == deadline:
+            self.cancel(response_id, **connection)
+            raise DeadlineExceededError(
+                f"Background job {response_id} did not complete before the deadline"
+            )
         raise TimeoutError(
             f"Background job {response_id} did not complete within {config.POLL_TIMEOUT}s"
         )
 
+    def cancel(self, response_id: str, **connection: Any) -> None:
+        """Cancel a background job nobody waits for any more, if possible"""
+        connection = {
+            key: connection[key]
+            for key in ("api_base", "api_key", "client")
+            if key in connection
+        }
+        with contextlib.suppress(Exception):
+            litellm.cancel_responses(response_id=response_id, **connection)
+            print(f"Cancelled background job: {response_id}")
+
+    def poll_once(
+        self, response_id: str, started_at: float | None = None, **connection: Any
+    ) -> dict[str, Any] | None:
+        """
+        Retrieve a background job once: its result if it has completed, None
+        while it is queued or in progress.
+
+        Raises:
+            RuntimeError: If the job failed or completed without content
+        """
+        result = litellm.get_responses(response_id=response_id, **connection)
+        status = getattr(result, "status", None)
+
+        if status == "failed":
+            error = getattr(result, "error", "Unknown error")
+            raise RuntimeError(f"Background job failed: {error}")
+        if status not in (None, "completed"):
+            # Still processing (or an unknown status)
+            return None
+
+        # Without a status field the job might be complete already
+        content = self._extract_content(result)
+        if not content:
+            if status == "completed":
+                raise RuntimeError("No content in completed response")
+            return None
+
+        completion: dict[str, Any] = {
+            "content": content,
+            "usage": self._serialize_usage(getattr(result, "usage", None)),
+            "response": result,  # Include full response for cost calculation
+        }
+        if started_at is not None:
+            completion["job_seconds"] = time.time() - started_at
+        return completion
+
     def can_resume(self) -> bool:
         return True
 
@@ -373,112 +739,84 @@ class SyncRetryStrategy(ResponseStrategy):
     Cannot resume - must retry from scratch if it fails.
     """
 
-    def _convert_to_responses_api_format(
-        self, multimodal_content: list[dict[str, Any]]
-    ) -> list[dict[str, Any]]:
-        """
-        Convert multimodal content from Completions API format to Responses API format.
-
-        Completions format: [{"type": "text/image_url", ...}]
-        Responses format: [{"type": "input_text/input_image", ...}]
-        """
-        converted: list[dict[str, Any]] = []
-        for item in multimodal_content:
-            item_type = item.get("type", "")
-            if item_type == "text":
-                converted.append({"type": "input_text", "text": item.get("text", "")})
-            elif item_type == "image_url":
-                # Extract URL from nested object
-                image_url = item.get("image_url", {})
-                url = image_url.get("url", "") if isinstance(image_url, dict) else ""
-                converted.append({"type": "input_image", "image_url": url})
-        return converted
-
     def execute(
         self,
         model: str,
         prompt: str,
         session_dir: Path | None = None,
         multimodal_content: list[dict[str, Any]] | None = None,
+        on_delta: Callable[[str], None] | None = None,
         **kwargs: Any,
     ) -> dict[str, Any]:
         """Execute with synchronous retries using responses API"""
 
-        # Build input - convert multimodal to Responses API format if provided
-        input_content: str | list[dict[str, Any]]
-        if multimodal_content:
-            input_content = self._convert_to_responses_api_format(multimodal_content)
-        else:
-            input_content = prompt
-
-        for attempt in range(config.MAX_RETRIES):
-            try:
+        # Build input - convert multimodal to Responses API format if provided,
+        # after the earlier turns of a follow-up rebuilt from its session
+        history = kwargs.pop("history", None)
+        input_content = self._responses_input(prompt, multimodal_content, history)
+        # Nothing to poll
+        kwargs.pop("job_durations", None)
+        kwargs.pop("detach", None)
+        policy: RetryPolicy = kwargs.pop("retry_policy", None) or RetryPolicy()
+
+        # Route requests with the same reference files to the same prompt cache
+        prefix, _ = split_prompt(
+            self._history_content(history[0]["content"])[0] if history else prompt
+        )
+        if prefix:
+            kwargs.setdefault("prompt_cache_key", prompt_cache_key(prefix))
+
+        # Once output has been streamed a retry would duplicate it, so only
+        # failures before the first delta are retried
+        streamed = False
+
+        def forward_delta(delta: str) -> None:
+            nonlocal streamed
+            streamed = True
+            policy.check()
+            if on_delta:
+                on_delta(delta)
+
+        def attempt(options: dict[str, Any]) -> dict[str, Any]:
+            started_at = time.time()
+            if on_delta:
+                stream = responses(
+                    model=model,
+                    input=input_content,
+                    stream=True,
+                    **options,
+                    **kwargs,
+                )
+                content, response = self._consume_responses_stream(
+                    stream, forward_delta
+                )
+            else:
                 response = responses(
                     model=model,
                     input=input_content,
                     stream=False,
-                    num_retries=config.MAX_RETRIES,  # Use LiteLLM's built-in retries
+                    **options,
                     **kwargs,
                 )
-
                 content = self._extract_content(response)
 
-                if not content:
-                    raise RuntimeError("No content in response from LLM")
-
-                return {
-                    "content": content,
-                    "usage": self._serialize_usage(getattr(response, "usage", None)),
-                    "response": response,  # Include full response for cost calculation
-                }
-
-            except Exception as e:
-                # Use LiteLLM's built-in retry logic for HTTP errors
-                if _should_retry and hasattr(e, "status_code"):
-                    retryable = _should_retry(e.status_code)
-                else:
-                    # Fallback to string matching for non-HTTP errors
-                    error_msg = str(e).lower()
-                    retryable = any(
-                        x in error_msg
-                        for x in [
-                            "network",
-                            "timeout",
-                            "connection",
-                            "429",
-                            "rate limit",
-                            "503",
-                            "overloaded",
-                        ]
-                    )
-                    non_retryable = any(
-                        x in error_msg
-                        for x in [
-                            "auth",
-                            "key",
-                            "context",
-                            "token limit",
-                            "not found",
-                            "invalid",
-                        ]
-                    )
+            if not content:
+                raise RuntimeError("No content in response from LLM")
 
-                    if non_retryable:
-                        raise
+            # Follow-up turns chain to the stored response by its id
+            response_id = getattr(response, "id", None)
+            if session_dir and response_id:
+                (session_dir / "response_id.txt").write_text(response_id)
 
-                if retryable and attempt < config.MAX_RETRIES - 1:
-                    delay = self._calculate_backoff_delay(
-                        attempt, config.INITIAL_RETRY_DELAY, config.MAX_RETRY_DELAY
-                    )
-                    print(
-                        f"Retryable error, waiting {delay:.1f}s before retry {attempt + 2}/{config.MAX_RETRIES}..."
-                    )
-                    time.sleep(delay)
-                    continue
+            return {
+                "content": content,
+                "usage": self._serialize_usage(getattr(response, "usage", None)),
+                "response": response,  # Include full response for cost calculation
+                "job_seconds": time.time() - started_at,
+            }
 
-                raise
-
-        raise RuntimeError("Max retries exceeded")
+        result: dict[str, Any] = policy.run(attempt, retry_if=lambda: not streamed)
+        return result
 
     def can_resume(self) -> bool:
         return False
@@ -496,6 +834,7 @@ class CompletionsAPIStrategy(ResponseStrategy):
         prompt: str,
         session_dir: Path | None = None,
         multimodal_content: list[dict[str, Any]] | None = None,
+        on_delta: Callable[[str], None] | None = None,
         **kwargs: Any,
     ) -> dict[str, Any]:
         """Execute with chat completions API"""
@@ -503,81 +842,130 @@ class CompletionsAPIStrategy(ResponseStrategy):
         # Remove responses-specific kwargs that don't apply to completions
         kwargs.pop("reasoning_effort", None)
         kwargs.pop("background", None)
-
-        # Build message content - use multimodal content if provided, else plain prompt
-        message_content: str | list[dict[str, Any]] = (
-            multimodal_content if multimodal_content else prompt
-        )
-
-        for attempt in range(config.MAX_RETRIES):
-            try:
-                # Use chat completions API
+        kwargs.pop("job_durations", None)
+        kwargs.pop("detach", None)
+        policy: RetryPolicy = kwargs.pop("retry_policy", None) or RetryPolicy()
+        # completion() expects a provider SDK client here; litellm.client_session
+        # already routes it through the shared pool (see use_pool_for_litellm)
+        kwargs.pop("client", None)
+
+        # Build message content: the reference files, images and question as
+        # separate blocks when there are images or a cache breakpoint to set,
+        # else the plain prompt (already prefix first)
+        message_content: str | list[dict[str, Any]] = prompt
+        blocks, last_stable = self._layout_content(prompt, multimodal_content)
+        cache_control = supports_cache_control(model)
+        if last_stable >= 0 and cache_control:
+            # Cache everything up to the question; providers ignore
+            # breakpoints on prefixes below their minimum cacheable size
+            blocks[last_stable] = {
+                **blocks[last_stable],
+                "cache_control": {"type": "ephemeral"},
+            }
+            message_content = blocks
+        elif multimodal_content:
+            message_content = blocks
+
+        # Follow-up turns carry the earlier turns rebuilt from their sessions
+        history = self._completions_history(kwargs.pop("history", None), cache_control)
+        messages = [*history, {"role": "user", "content": message_content}]
+
+        # Once output has been streamed a retry would duplicate it, so only
+        # failures before the first delta are retried
+        streamed = False
+
+        def attempt(options: dict[str, Any]) -> dict[str, Any]:
+            nonlocal streamed
+            started_at = time.time()
+            # The provider SDK must not retry on its own either
+            options["max_retries"] = 0
+
+            # Use chat completions API
+            if on_delta:
+                chunks = []
+                for chunk in completion(
+                    model=model,
+                    messages=messages,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **options,
+                    **kwargs,
+                ):
+                    chunks.append(chunk)
+                    delta = self._extract_chunk_delta(chunk)
+                    if delta:
+                        streamed = True
+                        policy.check()
+                        on_delta(delta)
+
+                # Rebuild a full response so usage and cost work as usual
+                response = litellm.stream_chunk_builder(chunks, messages=messages)
+            else:
                 response = completion(
                     model=model,
-                    messages=[{"role": "user", "content": message_content}],
+                    messages=messages,
                     stream=False,
-                    num_retries=config.MAX_RETRIES,
+                    **options,
                     **kwargs,
                 )
 
-                # Extract content from chat completion response
-                content = self._extract_completion_content(response)
-
-                if not content:
-                    raise RuntimeError("No content in response from LLM")
-
-                return {
-                    "content": content,
-                    "usage": self._serialize_usage(getattr(response, "usage", None)),
-                    "response": response,
-                }
-
-            except Exception as e:
-                # Use LiteLLM's built-in retry logic for HTTP errors
-                if _should_retry and hasattr(e, "status_code"):
-                    retryable = _should_retry(e.status_code)
-                else:
-                    error_msg = str(e).lower()
-                    retryable = any(
-                        x in error_msg
-                        for x in [
-                            "network",
-                            "timeout",
-                            "connection",
-                            "429",
-                            "rate limit",
-                            "503",
-                            "overloaded",
-                        ]
-                    )
-                    non_retryable = any(
-                        x in error_msg
-                        for x in [
-                            "auth",
-                            "key",
-                            "context",
-                            "token limit",
-                            "not found",
-                            "invalid",
-                        ]
-                    )
+            # Extract content from chat completion response
+            content = self._extract_completion_content(response)
 
-                    if non_retryable:
-                        raise
+            if not content:
+                raise RuntimeError("No content in response from LLM")
 
-                if retryable and attempt < config.MAX_RETRIES - 1:
-                    delay = self._calculate_backoff_delay(
-                        attempt, config.INITIAL_RETRY_DELAY, config.MAX_RETRY_DELAY
-                    )
-                    print(
-                        f"Retryable error, waiting {delay:.1f}s before retry {attempt + 2}/{config.MAX_RETRIES}..."
-                    )
-                    time.sleep(delay)
-                    continue
+            return {
+                "content": content,
+                "usage": self._serialize_usage(getattr(response, "usage", None)),
+                "response": response,
+                "job_seconds": time.time() - started_at,
+            }
 
-                raise
+        result: dict[str, Any] = policy.run(attempt, retry_if=lambda: not streamed)
+        return result
 
-        raise RuntimeError("Max retries exceeded")
+    def _completions_history(
+        self, history: list[dict[str, Any]] | None, cache_control: bool
+    ) -> list[dict[str, Any]]:
+        """
+        Messages of earlier turns, with user turns in cache-friendly order.
+        With cache_control, a breakpoint after the first turn's reference
+        files and one at the end of the history cache the conversation so far.
+        """
+        messages: list[dict[str, Any]] = []
+        for index, message in enumerate(history or []):
+            content = message["content"]
+            if message["role"] == "user":
+                text, multimodal_content = self._history_content(content)
+                blocks, last_stable = self._layout_content(text, multimodal_content)
+                if cache_control and index == 0 and last_stable >= 0:
+                    blocks[last_stable] = {
+                        **blocks[last_stable],
+                        "cache_control": {"type": "ephemeral"},
+                    }
+                    content = blocks
+                elif multimodal_content:
+                    content = blocks
+            messages.append({"role": message["role"], "content": content})
+
+        if cache_control and messages:
+            last = messages[-1]
+            if isinstance(last["content"], str):
+                last["content"] = [{"type": "text", "text": last["content"]}]
+            last["content"][-1] = {
+                **last["content"][-1],
+                "cache_control": {"type": "ephemeral"},
+            }
+        return messages
+
+    def _extract_chunk_delta(self, chunk: Any) -> str:
+        """Extract the text delta from a streamed chat completions chunk"""
+        if hasattr(chunk, "choices") and chunk.choices:
+            delta = getattr(chunk.choices[0], "delta", None)
+            if delta is not None:
+                return getattr(delta, "content", None) or ""
+        return ""
 
     def _extract_completion_content(self, response: Any) -> str:
         """Extract text content from chat completions response"""
@@ -0,0 +1,219 @@
+"""
+Retry policy shared by the response strategies.
+The single retry layer between a consultation and its provider: litellm is
+told not to retry on its own, server back-off hints (Retry-After) are
+honoured, and with a deadline no retry starts that could not finish in time.
+"""
+
+import random
+import time
+from collections.abc import Callable, Mapping
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Any, TypeVar
+
+import config
+
+if TYPE_CHECKING:
+    from rate_limiter import RateLimiter
+
+T = TypeVar("T")
+
+# Request timeout, conflict (e.g. a lock held by another request) and rate
+# limit; every 5xx is retried as well
+_RETRYABLE_STATUS_CODES = frozenset({408, 409, 429})
+
+# Errors without an HTTP status code are classified by their message
+_RETRYABLE_MESSAGES = [
+    "network",
+    "timeout",
+    "connection",
+    "429",
+    "rate limit",
+    "503",
+    "overloaded",
+]
+_NON_RETRYABLE_MESSAGES = [
+    "auth",
+    "key",
+    "context",
+    "token limit",
+    "not found",
+    "invalid",
+]
+
+
+class DeadlineExceededError(TimeoutError):
+    """The deadline passed, or left too little time for another attempt"""
+
+
+class RequestAbandonedError(Exception):
+    """The caller no longer needs the answer (e.g. a hedged request that lost)"""
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether a failed request is worth another attempt"""
+    status_code = getattr(error, "status_code", None)
+    if isinstance(status_code, int):
+        return status_code in _RETRYABLE_STATUS_CODES or status_code >= 500
+
+    message = str(error).lower()
+    if any(x in message for x in _NON_RETRYABLE_MESSAGES):
+        return False
+    return any(x in message for x in _RETRYABLE_MESSAGES)
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    if getattr(error, "status_code", None) == 429:
+        return True
+    message = str(error).lower()
+    return "429" in message or "rate limit" in message
+
+
+def retry_after(error: Exception) -> float | None:
+    """
+    Seconds the server asked to wait before retrying (retry-after-ms, or
+    Retry-After as seconds or an HTTP date), None without a hint
+    """
+    headers: Mapping[str, str] = {}
+    for candidate in (
+        getattr(getattr(error, "response", None), "headers", None),
+        getattr(error, "litellm_response_headers", None),
+        getattr(error, "headers", None),
+    ):
+        if isinstance(candidate, Mapping) and candidate:
+            headers = {str(k).lower(): str(v) for k, v in candidate.items()}
+            break
+
+    try:
+        if "retry-after-ms" in headers:
+            return max(float(headers["retry-after-ms"]) / 1000, 0.0)
+        if "retry-after" in headers:
+            value = headers["retry-after"]
+            try:
+                return max(float(value), 0.0)
+            except ValueError:
+                return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+class RetryPolicy:
+    """
+    When to retry a failed request, and after how long.
+
+    Errors accepted by is_retryable are retried up to max_retries times,
+    after the server's Retry-After hint (up to MAX_RETRY_AFTER) or else
+    exponential backoff with jitter. With a deadline (epoch seconds),
+    requests time out when it passes, and a retry only starts if its wait
+    plus expected_seconds (how long an attempt usually takes) fits before it.
+
+    With a rate_limiter, every attempt first waits for its request and
+    tokens (the estimate of its input) to fit the shared budget, and a rate
+    limit error pauses the budget for everyone for the back-off.
+    """
+
+    def __init__(
+        self,
+        deadline: float | None = None,
+        expected_seconds: float = 0.0,
+        max_retries: int = config.MAX_RETRIES,
+        rate_limiter: "RateLimiter | None" = None,
+        tokens: int = 0,
+    ) -> None:
+        self.deadline = deadline
+        self.expected_seconds = expected_seconds
+        self.max_retries = max_retries
+        self.rate_limiter = rate_limiter
+        self.tokens = tokens
+
+    def remaining(self) -> float | None:
+        """Seconds left until the deadline, None without one"""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.time()
+
+    def check(self) -> None:
+        """Raise DeadlineExceededError once the deadline has passed"""
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceededError("Deadline reached")
+
+    def request_options(self) -> dict[str, Any]:
+        """
+        litellm keyword arguments for one attempt: no retries of its own,
+        and a timeout at the deadline. Waits for the rate limiter first.
+        """
+        self.check()
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(self.tokens, self.deadline)
+        options: dict[str, Any] = {"num_retries": 0}
+        remaining = self.remaining()
+        if remaining is not None:
+            options["timeout"] = remaining
+        return options
+
+    def next_delay(self, error: Exception, attempt: int) -> float | None:
+        """
+        Seconds to wait before retrying after the attempt-th retry (from 0)
+        failed with error, None if it should not be retried
+
+        Raises:
+            DeadlineExceededError: If the error is retryable but the retry could
+                not finish before the deadline
+        """
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+
+        hint = retry_after(error)
+        if hint is not None:
+            if hint > config.MAX_RETRY_AFTER:
+                return None
+            delay = hint
+        else:
+            delay = min(config.INITIAL_RETRY_DELAY * 2**attempt, config.MAX_RETRY_DELAY)
+            # Add 10% jitter to avoid thundering herd
+            delay += delay * 0.1 * random.random()
+
+        if self.rate_limiter is not None and _is_rate_limited(error):
+            # Other processes sharing the budget wait it out too
+            self.rate_limiter.pause(delay)
+
+        remaining = self.remaining()
+        if remaining is not None and delay + self.expected_seconds > remaining:
+            raise DeadlineExceededError(
+                f"No time left before the deadline to retry: {error}"
+            ) from error
+        return float(delay)
+
+    def run(
+        self,
+        attempt_fn: Callable[[dict[str, Any]], T],
+        retry_if: Callable[[], bool] = lambda: True,
+    ) -> T:
+        """
+        Call attempt_fn with request_options() until it succeeds, retrying
+        while retry_if() allows (e.g. nothing was streamed yet).
+
+        Raises:
+            DeadlineExceededError: If the deadline passed, or a retryable error
+                left no time for a retry
+        """
+        attempt = 0
+        while True:
+            try:
+                return attempt_fn(self.request_options())
+            except (DeadlineExceededError, RequestAbandonedError):
+                raise
+            except Exception as e:
+                if not retry_if():
+                    raise
+                delay = self.next_delay(e, attempt)
+                if delay is None:
+                    raise
+                print(
+                    f"Retryable error, waiting {delay:.1f}s before retry "
+                    f"{attempt + 1}/{self.max_retries}..."
+                )
+                time.sleep(delay)
+                attempt += 1
@@ -0,0 +1,170 @@
+"""
+SQLite index of session metadata.
+Mirrors each session's metadata.json so slug lookups and listings never have
+to scan the sessions directory.
+"""
+
+import contextlib
+import json
+import sqlite3
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    slug TEXT NOT NULL,
+    model TEXT,
+    status TEXT,
+    created_at TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_slug ON sessions (slug, created_at);
+CREATE INDEX IF NOT EXISTS sessions_created ON sessions (created_at);
+CREATE INDEX IF NOT EXISTS sessions_status ON sessions (status, created_at);
+"""
+
+_UPSERT = (
+    "INSERT OR REPLACE INTO sessions "
+    "(id, slug, model, status, created_at, metadata) VALUES (?, ?, ?, ?, ?, ?)"
+)
+
+
+def _row(metadata: dict[str, Any]) -> tuple[Any, ...]:
+    return (
+        metadata["id"],
+        metadata.get("slug", ""),
+        metadata.get("model"),
+        metadata.get("status"),
+        metadata.get("created_at", ""),
+        json.dumps(metadata),
+    )
+
+
+class SessionIndex:
+    """
+    Index of sessions keyed by id, with lookups by slug, status and model.
+
+    metadata.json stays the source of truth; the index is rebuilt from the
+    session directories the first time it is opened. A connection is opened
+    per operation so the index can be shared with forked session workers.
+    """
+
+    def __init__(self, sessions_dir: Path) -> None:
+        self.sessions_dir = sessions_dir
+        self.db_path = sessions_dir / "index.db"
+        if not self.db_path.exists():
+            self.rebuild()
+
+    def upsert(self, metadata: dict[str, Any]) -> None:
+        """Insert or update the row for a session's metadata"""
+        with self._connect() as conn:
+            conn.execute(_UPSERT, _row(metadata))
+
+    def remove(self, session_id: str) -> None:
+        """Drop a session whose directory no longer exists"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def latest_id(self, slug: str) -> str | None:
+        """Id of the most recent session with exactly this slug"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id FROM sessions WHERE slug = ? "
+                "ORDER BY created_at DESC, rowid DESC LIMIT 1",
+                (slug,),
+            ).fetchone()
+        return str(row[0]) if row else None
+
+    def job_durations(
+        self, model: str, reasoning_effort: str, limit: int
+    ) -> list[float]:
+        """Background job durations of the latest completed sessions like this"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT json_extract(metadata, '$.job_seconds') FROM sessions "
+                "WHERE model = ? AND status = 'completed' "
+                "AND json_extract(metadata, '$.reasoning_effort') = ? "
+                "AND json_extract(metadata, '$.job_seconds') IS NOT NULL "
+                "ORDER BY created_at DESC, rowid DESC LIMIT ?",
+                (model, reasoning_effort, limit),
+            ).fetchall()
+        return [float(row[0]) for row in rows]
+
+    def query(
+        self,
+        status: str | None = None,
+        model: str | None = None,
+        since: str | None = None,
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> tuple[list[dict[str, Any]], int]:
+        """
+        Filtered sessions, newest first.
+
+        Args:
+            status: Only sessions with this status
+            model: Only sessions using this model
+            since: Only sessions created at or after this ISO date/time
+            limit: Page size (None for all)
+            offset: Number of matching sessions to skip
+
+        Returns:
+            Tuple of (metadata for the requested page, total matching count)
+        """
+        clauses: list[str] = []
+        params: list[Any] = []
+        for column, value in (("status", status), ("model", model)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._connect() as conn:
+            total = int(
+                conn.execute(
+                    f"SELECT COUNT(*) FROM sessions {where}", params
+                ).fetchone()[0]
+            )
+            rows = conn.execute(
+                f"SELECT metadata FROM sessions {where} "
+                "ORDER BY created_at DESC, rowid DESC LIMIT ? OFFSET ?",
+                [*params, -1 if limit is None else limit, offset],
+            ).fetchall()
+
+        return [json.loads(row[0]) for row in rows], total
+
+    def rebuild(self) -> None:
+        """Re-index every session directory from its metadata.json"""
+        rows = [_row(metadata) for metadata in self.scan_metadata()]
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions")
+            conn.executemany(_UPSERT, rows)
+
+    def scan_metadata(self) -> Iterator[dict[str, Any]]:
+        """Read metadata.json of every session directory"""
+        for session_dir in self.sessions_dir.iterdir():
+            metadata_file = session_dir / "metadata.json"
+            if not session_dir.is_dir() or not metadata_file.exists():
+                continue
+            try:
+                metadata = json.loads(metadata_file.read_text())
+            except (ValueError, OSError):
+                continue
+            if isinstance(metadata, dict) and metadata.get("id"):
+                yield metadata
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            with conn:
+                yield conn
+        finally:
+            conn.close()
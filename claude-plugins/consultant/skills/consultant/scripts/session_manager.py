@@ -3,16 +3,43 @@ Session management for async consultant executions
 Handles background processes, session persistence, and status tracking
 """
 
-import builtins
+import codecs
 import contextlib
 import json
+import mmap
 import multiprocessing
+import os
+import re
+import secrets
+import sqlite3
+import tempfile
+import threading
 import time
+import weakref
+from collections.abc import Callable, Iterable, Iterator
 from datetime import datetime
+from multiprocessing.connection import Connection
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import config
+from job_poller import JobHandoff, JobPoller, PendingJob
+from session_index import SessionIndex
+
+if TYPE_CHECKING:
+    from map_reduce import Shard
+
+# A lock held by another thread when a worker or the poller is forked would
+# stay held in the child forever, so forked children start with fresh ones
+_instances: "weakref.WeakSet[SessionManager]" = weakref.WeakSet()
+
+
+def _reset_locks_after_fork() -> None:
+    for manager in list(_instances):
+        manager._reset_locks()
+
+
+os.register_at_fork(after_in_child=_reset_locks_after_fork)
 
 
 class SessionManager:
@@ -21,22 +48,124 @@ class SessionManager:
     def __init__(self, sessions_dir: Path | None = None) -> None:
         self.sessions_dir = sessions_dir or config.DEFAULT_SESSIONS_DIR
         self.sessions_dir.mkdir(parents=True, exist_ok=True)
+        self.index = SessionIndex(self.sessions_dir)
+        # Read ends of the completion pipes of sessions started here
+        self._completion_conns: dict[str, Connection] = {}
+        # Polls the background jobs that workers started here hand off
+        self._poller: JobPoller | None = None
+        self._reset_locks()
+        _instances.add(self)
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Completion pipes, the poller and locks belong to the parent; never
+        # ship them to workers
+        state = {**self.__dict__, "_completion_conns": {}, "_poller": None}
+        del state["_workers_lock"], state["_metadata_lock"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._reset_locks()
+
+    def _reset_locks(self) -> None:
+        # Guards the poller and the completion pipes, shared by threads
+        # starting sessions at once (e.g. batch mode)
+        self._workers_lock = threading.Lock()
+        # Serializes metadata read-modify-writes of threads in one process
+        # (e.g. the concurrent stages of a map-reduce session)
+        self._metadata_lock = threading.Lock()
 
     def create_session(
         self,
         slug: str,
-        prompt: str,
+        prompt: str | Iterable[str],
         model: str,
         base_url: str | None = None,
         api_key: str | None = None,
         reasoning_effort: str = "xhigh",
-        multimodal_content: list[dict[str, Any]] | None = None,
+        image_content: list[dict[str, Any]] | None = None,
+        stream: bool = False,
+        extra_metadata: dict[str, Any] | None = None,
+        shards: "list[Shard] | None" = None,
+        use_cache: bool = False,
+        attachments: dict[str, str] | None = None,
+        deadline: float | None = None,
+        token_estimate: int | None = None,
     ) -> str:
-        """Create a new session and start background execution"""
+        """
+        Create a new session and start background execution.
+
+        The prompt may be given as parts (e.g. the texts of
+        build_prompt_segments), which are written to prompt.txt one by one
+        so the full prompt is never assembled in memory. Image entries of the
+        multimodal content go to images.json. The worker loads both from the
+        session directory instead of receiving them as process arguments.
+
+        extra_metadata is merged into metadata.json (e.g. context packing
+        decisions). With stream=True the worker appends text deltas to output.txt as they
+        arrive, so the session can be followed while it runs. The worker
+        signals completion over a pipe, which wait_for_completion blocks on.
 
-        session_id = f"{slug}-{int(time.time())}"
+        With shards, the session runs as a map-reduce consultation: prompt
+        is the bare request, and each shard's input goes to shards/NN/.
+
+        attachments (label -> content hash, see attachment_digests) records
+        the files the prompt carries in attachments.json, so follow-up turns
+        can skip them. A follow-up turn is a session whose extra_metadata has
+        "followup" with the "parent" session id; its prompt holds only the new
+        question and files, and the worker continues the parent's
+        conversation.
+
+        With use_cache, an identical earlier request (same input, model,
+        endpoint and effort) is answered from the response cache: the
+        session is created already completed, with "cached" in its
+        metadata, and no worker runs. Otherwise the response is stored once
+        the session completes.
+
+        deadline (epoch seconds) bounds the whole consultation, retries and
+        background job included: requests time out at the deadline, and no
+        retry starts that could not finish before it.
+
+        token_estimate (the prompt's token count, if already known) is what
+        the worker charges to a configured rate limit before the request,
+        instead of counting the prompt again.
+
+        An extra_metadata "hedge" ({"model", "after_seconds",
+        "token_estimate"}) names a fallback model the worker also asks when
+        the primary is slow to produce output or fails; the attempts are
+        recorded alongside it.
+        """
+
+        self._reap_completion_conns()
+
+        session_id = self._new_session_id(slug)
         session_dir = self.sessions_dir / session_id
-        session_dir.mkdir(exist_ok=True)
+
+        preview = self._write_input(session_dir, prompt, image_content)
+        if attachments:
+            (session_dir / "attachments.json").write_text(json.dumps(attachments))
+
+        if shards:
+            from map_reduce import SHARDS_DIR
+
+            for index, shard in enumerate(shards, start=1):
+                shard_dir = session_dir / SHARDS_DIR / f"{index:02d}"
+                shard_dir.mkdir(parents=True)
+                self._write_input(shard_dir, shard.prompt, shard.images)
+                (shard_dir / "files.json").write_text(json.dumps(shard.files))
+            extra_metadata = {
+                **(extra_metadata or {}),
+                "map_reduce": {"shards": len(shards)},
+            }
+
+        cache_key = None
+        cached = None
+        if use_cache:
+            from response_cache import ResponseCache
+
+            cache = ResponseCache()
+            cache_key = cache.key_for(session_dir, model, base_url, reasoning_effort)
+            cached = cache.get(cache_key)
 
         # Save session metadata
         metadata = {
@@ -47,54 +176,325 @@ class SessionManager:
             "model": model,
             "base_url": base_url,
             "reasoning_effort": reasoning_effort,
-            "prompt_preview": prompt[:200] + "..." if len(prompt) > 200 else prompt,
-            "has_images": multimodal_content is not None,
+            "prompt_preview": preview[:200] + "..." if len(preview) > 200 else preview,
+            "has_images": bool(image_content)
+            or any(shard.images for shard in shards or []),
+            "stream": stream,
+            **({"cache_key": cache_key} if cache_key else {}),
+            **(
+                {"deadline": datetime.fromtimestamp(deadline).isoformat()}
+                if deadline
+                else {}
+            ),
+            **({"token_estimate": token_estimate} if token_estimate else {}),
+            **(extra_metadata or {}),
         }
 
-        metadata_file = session_dir / "metadata.json"
-        metadata_file.write_text(json.dumps(metadata, indent=2))
+        if cached is not None:
+            content = cached.get("content", "")
+            (session_dir / "output.txt").write_text(content, encoding="utf-8")
+            now = datetime.now().isoformat()
+            metadata.update(
+                status="completed",
+                updated_at=now,
+                completed_at=now,
+                output_length=len(content),
+                usage=cached.get("usage"),
+                # No tokens were spent; record what the original call cost
+                cached={
+                    "session": cached.get("session_id"),
+                    "stored_at": datetime.fromtimestamp(
+                        cached.get("stored_at", 0)
+                    ).isoformat(),
+                    "original_cost_usd": (cached.get("cost_info") or {}).get(
+                        "total_cost"
+                    ),
+                },
+            )
+            self._write_metadata(session_dir, metadata)
+            return session_id
+
+        self._write_metadata(session_dir, metadata)
+        self._start_worker(
+            session_id,
+            model,
+            base_url,
+            api_key,
+            reasoning_effort,
+            stream,
+            cache_key,
+            deadline,
+        )
+
+        return session_id
+
+    def retry_session(
+        self, slug: str, api_key: str | None = None, deadline: float | None = None
+    ) -> str:
+        """
+        Rerun a failed session in place and return its id. A session whose
+        background job was left polling by a process that has since exited
+        counts as failed. The original deadline does not carry over; the
+        retry gets its own (or none).
+
+        The worker reuses everything already on disk: map-reduce sessions
+        rerun only the shards that did not complete, and the background job
+        of an orphaned session resumes from response_id.txt. Stages that
+        failed start new requests rather than resuming their dead job. The
+        API key is not stored with the
+        session, so it has to be given again unless it comes from the
+        environment.
+
+        Raises:
+            ValueError: If no session matches or it has not failed
+        """
+
+        session_dir = self._find_session_dir(slug)
+        if session_dir is None:
+            raise ValueError(f"No session found with slug: {slug}")
+
+        metadata = json.loads((session_dir / "metadata.json").read_text())
+        if metadata.get("status") != "error" and not self._orphaned(session_dir):
+            raise ValueError(
+                f"Session {metadata['id']} is {metadata.get('status')}; "
+                "only failed sessions can be retried"
+            )
+
+        self._reap_completion_conns()
+        if metadata.get("status") == "error":
+            # Resuming a failed job would only fail again, and the reduce
+            # prompt is rebuilt from the shards anyway
+            for stage_dir in self._failed_stages(session_dir):
+                for response_id_file in stage_dir.rglob("response_id.txt"):
+                    response_id_file.unlink()
+        (session_dir / "error.txt").unlink(missing_ok=True)
+        for key in ("error", "stage", "deadline"):
+            metadata.pop(key, None)
+        if deadline:
+            metadata["deadline"] = datetime.fromtimestamp(deadline).isoformat()
+        metadata["status"] = "running"
+        metadata["retries"] = metadata.get("retries", 0) + 1
+        metadata["updated_at"] = datetime.now().isoformat()
+        self._write_metadata(session_dir, metadata)
+
+        self._start_worker(
+            metadata["id"],
+            metadata["model"],
+            metadata.get("base_url"),
+            api_key,
+            metadata.get("reasoning_effort", "xhigh"),
+            metadata.get("stream", False),
+            metadata.get("cache_key"),
+            deadline,
+        )
+        session_id: str = metadata["id"]
+        return session_id
+
+    def _failed_stages(self, session_dir: Path) -> list[Path]:
+        """
+        Directories of the stages that did not complete in a failed session:
+        the session itself, or the map-reduce shards and reduce step
+        """
+        from map_reduce import REDUCE_DIR, SHARDS_DIR, read_stage, shard_dirs
+
+        if not (session_dir / SHARDS_DIR).is_dir():
+            return [session_dir]
+        stages = shard_dirs(session_dir)
+        if (session_dir / REDUCE_DIR).is_dir():
+            stages.append(session_dir / REDUCE_DIR)
+        return [d for d in stages if read_stage(d).get("status") != "completed"]
+
+    def conversation(self, session_id: str) -> list[Path]:
+        """
+        Session directories of the conversation ending with session_id,
+        oldest first, following the parents of follow-up turns
+        """
+        chain: list[Path] = []
+        current: str | None = session_id
+        while current:
+            session_dir = self.sessions_dir / current
+            metadata = json.loads((session_dir / "metadata.json").read_text())
+            chain.append(session_dir)
+            current = (metadata.get("followup") or {}).get("parent")
+        return chain[::-1]
+
+    def conversation_attachments(self, session_id: str) -> dict[str, str]:
+        """Attachments (label -> content hash) sent so far in a conversation"""
+        attachments: dict[str, str] = {}
+        for session_dir in self.conversation(session_id):
+            manifest = session_dir / "attachments.json"
+            if manifest.exists():
+                attachments.update(json.loads(manifest.read_text()))
+        return attachments
+
+    def _conversation_input(self, session_id: str, model: str) -> dict[str, Any]:
+        """
+        Extra request arguments continuing the conversation of a follow-up
+        turn: previous_response_id when the model uses the Responses API and
+        the parent stored its response id, else the earlier turns as
+        'history' messages rebuilt from their session directories
+        """
+        earlier = self.conversation(session_id)[:-1]
+        if not earlier:
+            return {}
 
-        # Save full prompt
-        prompt_file = session_dir / "prompt.txt"
-        prompt_file.write_text(prompt)
+        from response_strategy import ResponseStrategyFactory
 
-        # Start background process
+        response_id_file = earlier[-1] / "response_id.txt"
+        if (
+            ResponseStrategyFactory.get_api_type(model) == "responses"
+            and response_id_file.exists()
+        ):
+            return {"previous_response_id": response_id_file.read_text().strip()}
+
+        history: list[dict[str, Any]] = []
+        for turn_dir in earlier:
+            prompt, multimodal_content = self._load_input(turn_dir)
+            history.append({"role": "user", "content": multimodal_content or prompt})
+            history.append(
+                {
+                    "role": "assistant",
+                    "content": (turn_dir / "output.txt").read_text(encoding="utf-8"),
+                }
+            )
+        return {"history": history}
+
+    def _write_input(
+        self,
+        stage_dir: Path,
+        prompt: str | Iterable[str],
+        image_content: list[dict[str, Any]] | None,
+    ) -> str:
+        """
+        Write prompt.txt part by part (and images.json) and return a preview
+        of the first 200 characters.
+
+        Parts from build_prompt_segments put QUESTION_SEPARATOR between the
+        reference files and the question; where it starts is recorded in
+        prompt.json, for _load_input to split the prompt there.
+        """
+        from file_handler import QUESTION_SEPARATOR
+
+        preview = ""
+        written = 0
+        prefix_chars = 0
+        with (stage_dir / "prompt.txt").open("w", encoding="utf-8") as f:
+            for part in [prompt] if isinstance(prompt, str) else prompt:
+                if part == QUESTION_SEPARATOR and not prefix_chars:
+                    prefix_chars = written
+                f.write(part)
+                written += len(part)
+                if len(preview) <= 200:
+                    preview += part[: 201 - len(preview)]
+        (stage_dir / "prompt.json").write_text(
+            json.dumps({"prefix_chars": prefix_chars})
+        )
+
+        if image_content:
+            with (stage_dir / "images.json").open("w", encoding="utf-8") as f:
+                json.dump(image_content, f)
+
+        return preview
+
+    def _start_worker(
+        self,
+        session_id: str,
+        model: str,
+        base_url: str | None,
+        api_key: str | None,
+        reasoning_effort: str,
+        stream: bool,
+        cache_key: str | None = None,
+        deadline: float | None = None,
+    ) -> None:
+        """
+        Run the session in a background process wired to a completion pipe
+        and to this process's job poller
+        """
+
+        # Streamed sessions wait on their own job, as the stream is the output
+        handoff = None
+        if not stream:
+            with self._workers_lock:
+                if self._poller is None:
+                    self._poller = JobPoller(self._finish_polled_job)
+                handoff = self._poller.start()
+
+        recv_conn, send_conn = multiprocessing.Pipe(duplex=False)
         process = multiprocessing.Process(
             target=self._execute_session,
             args=(
                 session_id,
-                prompt,
                 model,
                 base_url,
                 api_key,
                 reasoning_effort,
-                multimodal_content,
+                stream,
+                cache_key,
+                send_conn,
+                handoff,
+                deadline,
             ),
         )
         process.start()
 
+        # Only the worker keeps the write end, so its exit also ends the pipe
+        send_conn.close()
+        with self._workers_lock:
+            if self._poller is not None:
+                self._poller.watch(process)
+            self._completion_conns[session_id] = recv_conn
+
         # Store PID for potential cleanup
-        (session_dir / "pid").write_text(str(process.pid))
+        (self.sessions_dir / session_id / "pid").write_text(str(process.pid))
 
-        return session_id
+    def _new_session_id(self, slug: str) -> str:
+        """
+        Create a session directory and return its id.
+
+        Ids are the slug, the creation time and a random suffix; creating the
+        directory exclusively guarantees uniqueness across processes.
+        """
+        while True:
+            session_id = f"{slug}-{int(time.time())}-{secrets.token_hex(4)}"
+            try:
+                (self.sessions_dir / session_id).mkdir()
+            except FileExistsError:
+                continue
+            return session_id
 
     def _execute_session(
         self,
         session_id: str,
-        prompt: str,
         model: str,
         base_url: str | None,
         api_key: str | None,
         reasoning_effort: str = "xhigh",
-        multimodal_content: list[dict[str, Any]] | None = None,
+        stream: bool = False,
+        cache_key: str | None = None,
+        completion_conn: Connection | None = None,
+        handoff: JobHandoff | None = None,
+        deadline: float | None = None,
     ) -> None:
-        """Background execution of LLM consultation"""
+        """
+        Background execution of LLM consultation.
+
+        Sessions with a shards/ directory run as map-reduce: the shards run
+        concurrently, then a reduce call merges their findings. With a
+        cache_key, the completed response is stored in the response cache.
+        With a handoff, a background job is passed to the shared JobPoller
+        once started, and the worker exits. Sessions with a "hedge" in their
+        metadata race the primary model against the fallback model instead.
+        """
 
         session_dir = self.sessions_dir / session_id
+        output_file = session_dir / "output.txt"
 
         try:
             # Import here to avoid issues with multiprocessing
+            from hedging import run_hedged
             from litellm_client import LiteLLMClient
+            from map_reduce import SHARDS_DIR, run_map_reduce
 
             # Initialize client
             client = LiteLLMClient(base_url=base_url, api_key=api_key)
@@ -102,46 +502,290 @@ class SessionManager:
             # Make LLM call with the full prompt (already includes file contents)
             self._update_status(session_id, "calling_llm")
 
-            # Get full response (pass session_dir for resumability support)
-            result = client.complete(
-                model=model,
-                prompt=prompt,
-                session_dir=session_dir,  # Enables background job resumption if supported
-                reasoning_effort=reasoning_effort,
-                multimodal_content=multimodal_content,
-            )
+            # In streaming mode, append deltas to output.txt as they arrive
+            on_delta = None
+            if stream:
+                output_file.write_text("")
 
-            full_response = result.get("content", "")
-            usage = result.get("usage")
-            response_obj = result.get(
-                "response"
-            )  # Full response object for cost calculation
+                def on_delta(delta: str) -> None:
+                    with output_file.open("a", encoding="utf-8") as f:
+                        f.write(delta)
 
-            # Save response to file
-            output_file = session_dir / "output.txt"
-            output_file.write_text(full_response)
+            # With a hedge, a fallback model is asked too if the primary is
+            # slow to answer or fails (see hedging.run_hedged)
+            metadata = json.loads((session_dir / "metadata.json").read_text())
+            hedge = metadata.get("hedge")
+
+            # Tokens of the prompt as counted when the session was created,
+            # for the rate limit (map-reduce stages are counted by the client)
+            token_estimates = {model: metadata.get("token_estimate")}
+            if hedge:
+                token_estimates[hedge["model"]] = hedge.get("token_estimate")
+
+            # Follow-up turns continue the conversation of their parent
+            conversations = {
+                each: self._conversation_input(session_id, each)
+                for each in token_estimates
+            }
+
+            # How long similar consultations took, to schedule background job
+            # polls and to tell whether a retry fits before the deadline
+            job_durations: dict[str, list[float]] = {
+                each: [] for each in token_estimates
+            }
+            with contextlib.suppress(sqlite3.Error):
+                for each in token_estimates:
+                    job_durations[each] = self.index.job_durations(
+                        each, reasoning_effort, config.POLL_HISTORY_SAMPLES
+                    )
+
+            def ask(
+                ask_model: str,
+                stage_dir: Path,
+                attempt_dir: Path,
+                on_delta: Callable[[str], None] | None,
+                detach: bool = False,
+            ) -> dict[str, Any]:
+                # Load the input written by create_session
+                prompt, multimodal_content = self._load_input(stage_dir)
 
-            # Calculate cost using response object (preferred) or usage dict (fallback)
-            cost_info = None
-            if response_obj or usage:
-                cost_info = client.calculate_cost(
-                    model, response=response_obj, usage=usage
+                # Get full response (pass attempt_dir for resumability support)
+                result: dict[str, Any] = client.complete(
+                    model=ask_model,
+                    prompt=prompt,
+                    session_dir=attempt_dir,  # Enables background job resumption if supported
+                    reasoning_effort=reasoning_effort,
+                    multimodal_content=multimodal_content,
+                    on_delta=on_delta,
+                    job_durations=job_durations[ask_model],
+                    deadline=deadline,
+                    token_estimate=(
+                        token_estimates[ask_model] if stage_dir == session_dir else None
+                    ),
+                    detach=detach,
+                    **conversations[ask_model],
                 )
 
-            # Update metadata with usage and cost
-            self._update_status(
-                session_id,
-                "completed",
-                response=full_response,
-                usage=usage,
-                cost_info=cost_info,
-                reasoning_effort=reasoning_effort,
-            )
+                # Calculate cost using response object (preferred) or usage dict (fallback)
+                usage = result.get("usage")
+                response_obj = result.get("response")
+                if response_obj or usage:
+                    result["cost_info"] = client.calculate_cost(
+                        ask_model, response=response_obj, usage=usage
+                    )
+                return result
+
+            def consult(
+                stage_dir: Path,
+                on_delta: Callable[[str], None] | None,
+                detach: bool = False,
+            ) -> dict[str, Any]:
+                if not hedge:
+                    return ask(model, stage_dir, stage_dir, on_delta, detach)
+
+                # Both attempts run in this worker, so nothing is detached
+                result: dict[str, Any] = run_hedged(
+                    lambda ask_model, attempt_dir, forward: ask(
+                        ask_model, stage_dir, attempt_dir, forward
+                    ),
+                    client.cancel,
+                    model,
+                    hedge["model"],
+                    hedge.get("after_seconds", config.HEDGE_AFTER_SECONDS),
+                    stage_dir,
+                    on_delta,
+                    on_update=lambda attempts: self._record_hedge(
+                        session_id, stage_dir, attempts
+                    ),
+                )
+                return result
+
+            if (session_dir / SHARDS_DIR).is_dir():
+                result = run_map_reduce(
+                    session_dir,
+                    consult,
+                    on_progress=lambda stage: self._update_status(
+                        session_id, "calling_llm", stage=stage
+                    ),
+                    on_delta=on_delta,
+                )
+            else:
+                result = consult(session_dir, on_delta, detach=handoff is not None)
+
+            if handoff is not None and "pending_response_id" in result:
+                # The poller waits on the job from here on, together with the
+                # jobs of the other sessions
+                self._update_status(session_id, "polling")
+                (session_dir / "pid").write_text(str(handoff.pid))
+                handoff.put(
+                    PendingJob(
+                        session_id,
+                        result["pending_response_id"],
+                        model,
+                        base_url,
+                        api_key,
+                        reasoning_effort,
+                        cache_key,
+                        result.get("started_at"),
+                        job_durations[model],
+                        deadline,
+                        result.get("token_estimate", 0),
+                    )
+                )
+                return
+
+            self._complete_session(session_id, result, reasoning_effort, cache_key)
 
         except Exception as e:
-            error_msg = f"Error: {str(e)}\n\nType: {type(e).__name__}"
-            (session_dir / "error.txt").write_text(error_msg)
-            self._update_status(session_id, "error", error=error_msg)
+            self._fail_session(session_id, e)
+
+        finally:
+            # Wake the waiting parent; the final status is already on disk
+            if completion_conn is not None:
+                with contextlib.suppress(OSError):
+                    completion_conn.send(session_id)
+                completion_conn.close()
+
+    def _complete_session(
+        self,
+        session_id: str,
+        result: dict[str, Any],
+        reasoning_effort: str,
+        cache_key: str | None,
+    ) -> None:
+        """Write a finished consultation's response and final metadata"""
+        full_response = result.get("content", "")
+        usage = result.get("usage")
+        cost_info = result.get("cost_info")
+
+        # Save response to file (replaces any streamed partial text)
+        output_file = self.sessions_dir / session_id / "output.txt"
+        output_file.write_text(full_response, encoding="utf-8")
+
+        # Update metadata with usage and cost
+        self._update_status(
+            session_id,
+            "completed",
+            response=full_response,
+            usage=usage,
+            cost_info=cost_info,
+            reasoning_effort=reasoning_effort,
+            job_seconds=result.get("job_seconds"),
+        )
+
+        # An answer from a hedge's fallback model is not the cached model's
+        hedge = result.get("hedge") or {}
+        if cache_key and full_response and hedge.get("winner", "primary") == "primary":
+            from response_cache import ResponseCache
+
+            ResponseCache().put(cache_key, session_id, result)
+
+    def _record_hedge(
+        self, session_id: str, stage_dir: Path, attempts: list[dict[str, Any]]
+    ) -> None:
+        """
+        Record the attempts of a hedged request in metadata: under
+        hedge.attempts, or hedge.stages by stage directory for map-reduce
+        """
+        with self._metadata_lock:
+            session_dir = self.sessions_dir / session_id
+            metadata = json.loads((session_dir / "metadata.json").read_text())
+            hedge = metadata.setdefault("hedge", {})
+            if stage_dir == session_dir:
+                hedge["attempts"] = attempts
+            else:
+                stage = stage_dir.relative_to(session_dir).as_posix()
+                hedge.setdefault("stages", {})[stage] = attempts
+            self._write_metadata(session_dir, metadata)
+
+    def _fail_session(self, session_id: str, e: Exception) -> None:
+        error_msg = f"Error: {str(e)}\n\nType: {type(e).__name__}"
+        (self.sessions_dir / session_id / "error.txt").write_text(error_msg)
+        self._update_status(session_id, "error", error=error_msg)
+
+    def _finish_polled_job(
+        self,
+        job: PendingJob,
+        completion: dict[str, Any] | None,
+        error: Exception | None,
+    ) -> None:
+        """Record the outcome of a background job finished by the poller"""
+        try:
+            if error is not None:
+                raise error
+            if completion is None:
+                raise RuntimeError(f"Background job {job.response_id} has no result")
+
+            from litellm_client import LiteLLMClient
+            from rate_limiter import RateLimiter
+
+            rate_limiter = RateLimiter.for_model(job.model, job.base_url, job.api_key)
+            if rate_limiter is not None:
+                rate_limiter.settle(job.token_estimate, completion.get("usage"))
+
+            client = LiteLLMClient(base_url=job.base_url, api_key=job.api_key)
+            completion["cost_info"] = client.calculate_cost(
+                job.model,
+                response=completion.get("response"),
+                usage=completion.get("usage"),
+            )
+            self._complete_session(
+                job.session_id, completion, job.reasoning_effort, job.cache_key
+            )
+        except Exception as e:
+            self._fail_session(job.session_id, e)
+
+    def _orphaned(self, session_dir: Path) -> bool:
+        """Whether a polling session's poller process has exited"""
+        metadata = json.loads((session_dir / "metadata.json").read_text())
+        if metadata.get("status") != "polling":
+            return False
+        try:
+            os.kill(int((session_dir / "pid").read_text()), 0)
+        except (OSError, ValueError):
+            return True
+        return False
+
+    def _load_input(self, stage_dir: Path) -> tuple[str, list[dict[str, Any]] | None]:
+        """
+        Prompt and multimodal content written by create_session. The prompt
+        is a Prompt carrying the recorded end of its reference files.
+        """
+        layout_file = stage_dir / "prompt.json"
+        prefix_chars = None
+        if layout_file.exists():
+            prefix_chars = json.loads(layout_file.read_text()).get("prefix_chars")
+        prompt = self._read_prompt(stage_dir / "prompt.txt", prefix_chars)
+        multimodal_content = None
+        images_file = stage_dir / "images.json"
+        if images_file.exists():
+            multimodal_content = [
+                {"type": "text", "text": prompt},
+                *json.loads(images_file.read_text(encoding="utf-8")),
+            ]
+        return prompt, multimodal_content
+
+    @staticmethod
+    def _read_prompt(prompt_file: Path, prefix_chars: int | None = None) -> str:
+        """Decode prompt.txt straight from a memory map, without a bytes copy"""
+        from file_handler import Prompt
+
+        prompt: str
+        with prompt_file.open("rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                prompt = Prompt("", prefix_chars=prefix_chars)
+            else:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    prompt = Prompt(mapped, "utf-8", prefix_chars=prefix_chars)
+        return prompt
+
+    def _reap_completion_conns(self) -> None:
+        """Close pipes of finished sessions that nobody waited on"""
+        with self._workers_lock:
+            for session_id, conn in list(self._completion_conns.items()):
+                if conn.poll():
+                    self._completion_conns.pop(session_id, None)
+                    conn.close()
 
     def _update_status(
         self,
@@ -152,55 +796,73 @@ class SessionManager:
         usage: dict[str, Any] | None = None,
         cost_info: dict[str, Any] | None = None,
         reasoning_effort: str | None = None,
+        stage: str | None = None,
+        job_seconds: float | None = None,
     ) -> None:
         """Update session status in metadata"""
 
-        session_dir = self.sessions_dir / session_id
-        metadata_file = session_dir / "metadata.json"
+        with self._metadata_lock:
+            session_dir = self.sessions_dir / session_id
+            metadata_file = session_dir / "metadata.json"
 
-        if not metadata_file.exists():
-            return
+            if not metadata_file.exists():
+                return
 
-        metadata = json.loads(metadata_file.read_text())
-        metadata["status"] = status
-        metadata["updated_at"] = datetime.now().isoformat()
+            metadata = json.loads(metadata_file.read_text())
+            metadata["status"] = status
+            metadata["updated_at"] = datetime.now().isoformat()
 
-        if response:
-            metadata["completed_at"] = datetime.now().isoformat()
-            metadata["output_length"] = len(response)
+            # Progress of a map-reduce session; dropped once it finishes
+            if stage:
+                metadata["stage"] = stage
+            elif status in ["completed", "error"]:
+                metadata.pop("stage", None)
 
-        if error:
-            metadata["error"] = error[:500]  # Truncate long errors
+            if response:
+                metadata["completed_at"] = datetime.now().isoformat()
+                metadata["output_length"] = len(response)
 
-        if usage:
-            metadata["usage"] = usage
+            if error:
+                metadata["error"] = error[:500]  # Truncate long errors
 
-        if cost_info:
-            metadata["cost_info"] = cost_info
+            if usage:
+                metadata["usage"] = usage
 
-        if reasoning_effort:
-            metadata["reasoning_effort"] = reasoning_effort
+            if cost_info:
+                metadata["cost_info"] = cost_info
 
-        metadata_file.write_text(json.dumps(metadata, indent=2))
+            if reasoning_effort:
+                metadata["reasoning_effort"] = reasoning_effort
 
-    def get_session_status(self, slug: str) -> dict[str, Any]:
-        """Get current status of a session by slug"""
+            if job_seconds is not None:
+                metadata["job_seconds"] = round(job_seconds, 3)
+
+            self._write_metadata(session_dir, metadata)
 
-        # Find most recent session with this slug
-        matching_sessions = sorted(
-            [
-                d
-                for d in self.sessions_dir.iterdir()
-                if d.is_dir() and d.name.startswith(slug)
-            ],
-            key=lambda x: x.stat().st_mtime,
-            reverse=True,
+    def _write_metadata(self, session_dir: Path, metadata: dict[str, Any]) -> None:
+        """
+        Write metadata.json atomically so concurrent readers never see a
+        partially written file
+        """
+        fd, tmp_name = tempfile.mkstemp(
+            dir=session_dir, prefix="metadata.json.", suffix=".tmp"
         )
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(json.dumps(metadata, indent=2))
+        os.replace(tmp_name, session_dir / "metadata.json")
+
+        # The index is a derived copy; lookups fall back to scanning if it
+        # could not be updated
+        with contextlib.suppress(sqlite3.Error):
+            self.index.upsert(metadata)
 
-        if not matching_sessions:
+    def get_session_status(self, slug: str) -> dict[str, Any]:
+        """Get current status of a session by slug"""
+
+        session_dir = self._find_session_dir(slug)
+        if session_dir is None:
             return {"error": f"No session found with slug: {slug}"}
 
-        session_dir = matching_sessions[0]
         metadata_file = session_dir / "metadata.json"
 
         if not metadata_file.exists():
@@ -222,12 +884,104 @@ class SessionManager:
 
         return metadata
 
+    def _find_session_dir(self, slug: str) -> Path | None:
+        """Directory of the most recent session with this slug (or id)"""
+
+        # A full session id is accepted as well as a slug
+        if (self.sessions_dir / slug / "metadata.json").exists():
+            return self.sessions_dir / slug
+
+        try:
+            while session_id := self.index.latest_id(slug):
+                session_dir: Path = self.sessions_dir / session_id
+                if session_dir.is_dir():
+                    return session_dir
+                # Deleted by hand; forget it and try the next most recent
+                self.index.remove(session_id)
+            return None
+        except sqlite3.Error:
+            pass
+
+        # Index unavailable: scan directory names for this exact slug
+        pattern = re.compile(rf"{re.escape(slug)}-\d+(-[0-9a-f]+)?")
+        matching_sessions = [
+            d
+            for d in self.sessions_dir.iterdir()
+            if d.is_dir() and pattern.fullmatch(d.name)
+        ]
+        latest: Path | None = max(
+            matching_sessions, key=lambda d: d.stat().st_mtime, default=None
+        )
+        return latest
+
+    def follow_output(self, session_id: str) -> Iterator[str]:
+        """
+        Yield text appended to a session's output.txt until the session ends.
+
+        Works from any process, so a running session can be tailed from
+        another terminal. Callers should still read the final metadata (e.g.
+        via wait_for_completion) once the iterator is exhausted.
+        """
+
+        session_dir = self.sessions_dir / session_id
+        metadata_file = session_dir / "metadata.json"
+        output_file = session_dir / "output.txt"
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        offset = 0
+
+        while True:
+            # Check status before reading so the last read sees the final text
+            finished = False
+            if metadata_file.exists():
+                with contextlib.suppress(ValueError):
+                    status = json.loads(metadata_file.read_text()).get("status")
+                    finished = status in ["completed", "error"]
+
+            if output_file.exists():
+                with output_file.open("rb") as f:
+                    f.seek(offset)
+                    data = f.read()
+                offset += len(data)
+                # Incremental decoding holds back a split multi-byte character
+                text = decoder.decode(data, final=finished)
+                if text:
+                    yield text
+
+            if finished:
+                return
+
+            time.sleep(config.STREAM_FOLLOW_INTERVAL_SECONDS)
+
     def wait_for_completion(
-        self, session_id: str, timeout: int = 3600
+        self, session_id: str, timeout: float | None = None
     ) -> dict[str, Any]:
-        """Block until session completes or timeout"""
+        """
+        Block until session completes or timeout.
+
+        Sessions started by this instance wake up as soon as the worker
+        signals over its pipe. Sessions started elsewhere (reattaching from
+        another process) fall back to polling metadata.json. Without a
+        timeout, a session with a deadline is waited on until shortly after
+        it (the worker records the deadline error), others for
+        SESSION_WAIT_TIMEOUT.
+        """
 
         start_time = time.time()
+        if timeout is None:
+            timeout = self._wait_timeout(session_id)
+
+        with self._workers_lock:
+            conn = self._completion_conns.pop(session_id, None)
+        started_here = conn is not None
+        if conn is not None:
+            try:
+                # Returns on the worker's message, or on EOF if it died
+                if not conn.poll(timeout):
+                    raise TimeoutError(
+                        f"Session {session_id} did not complete within {timeout:.0f}s"
+                    )
+            finally:
+                conn.close()
 
         while time.time() - start_time < timeout:
             session_dir = self.sessions_dir / session_id
@@ -254,21 +1008,85 @@ class SessionManager:
 
                 return metadata
 
+            if metadata["status"] == "polling" and started_here:
+                # Handed to the poller, which finishes it in metadata.json
+                time.sleep(config.STREAM_FOLLOW_INTERVAL_SECONDS)
+                continue
+
             time.sleep(config.POLLING_INTERVAL_SECONDS)
 
-        raise TimeoutError(f"Session {session_id} did not complete within {timeout}s")
+        raise TimeoutError(
+            f"Session {session_id} did not complete within {timeout:.0f}s"
+        )
+
+    def _wait_timeout(self, session_id: str) -> float:
+        """Seconds to wait for a session: until after its deadline, if it has one"""
+        metadata_file = self.sessions_dir / session_id / "metadata.json"
+        with contextlib.suppress(OSError, ValueError):
+            deadline = json.loads(metadata_file.read_text()).get("deadline")
+            if deadline:
+                remaining = datetime.fromisoformat(deadline).timestamp() - time.time()
+                return float(max(remaining, 0) + config.DEADLINE_GRACE_SECONDS)
+        return float(config.SESSION_WAIT_TIMEOUT)
 
-    def list_sessions(self) -> list[dict[str, Any]]:
-        """List all sessions"""
+    def list_sessions(
+        self,
+        status: str | None = None,
+        model: str | None = None,
+        since: str | None = None,
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> list[dict[str, Any]]:
+        """List sessions, newest first (see query_sessions for the filters)"""
+        sessions, _ = self.query_sessions(status, model, since, limit, offset)
+        return sessions
 
-        sessions = []
-        for session_dir in self.sessions_dir.iterdir():
-            if not session_dir.is_dir():
-                continue
+    def query_sessions(
+        self,
+        status: str | None = None,
+        model: str | None = None,
+        since: str | None = None,
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> tuple[list[dict[str, Any]], int]:
+        """
+        Filtered, paginated sessions from the index, newest first.
 
-            metadata_file = session_dir / "metadata.json"
-            if metadata_file.exists():
-                with contextlib.suppress(builtins.BaseException):
-                    sessions.append(json.loads(metadata_file.read_text()))
+        Args:
+            status: Only sessions with this status
+            model: Only sessions using this model
+            since: Only sessions created at or after this ISO date/time
+            limit: Page size (None for all)
+            offset: Number of matching sessions to skip
+
+        Returns:
+            Tuple of (sessions in the page, total matching sessions)
+        """
+
+        try:
+            sessions, total = self.index.query(status, model, since, limit, offset)
+        except sqlite3.Error:
+            # Index unavailable: fall back to reading every metadata.json
+            sessions = [
+                metadata
+                for metadata in self.index.scan_metadata()
+                if (not status or metadata.get("status") == status)
+                and (not model or metadata.get("model") == model)
+                and (not since or metadata.get("created_at", "") >= since)
+            ]
+            sessions.sort(key=lambda x: x.get("created_at", ""), reverse=True)
+            total = len(sessions)
+            end = None if limit is None else offset + limit
+            return sessions[offset:end], total
+
+        # Drop sessions whose directories were deleted by hand
+        live = []
+        for metadata in sessions:
+            if (self.sessions_dir / metadata["id"]).is_dir():
+                live.append(metadata)
+            else:
+                with contextlib.suppress(sqlite3.Error):
+                    self.index.remove(metadata["id"])
+                total -= 1
 
-        return sorted(sessions, key=lambda x: x.get("created_at", ""), reverse=True)
+        return live, total
@@ -0,0 +1,126 @@
+"""
+Persistent cache of token counts.
+Counts are keyed by tokenizer (model and endpoint) and a hash of the text,
+so unchanged attachments are never re-tokenized.
+"""
+
+import contextlib
+import hashlib
+import sqlite3
+import threading
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import config
+
+if TYPE_CHECKING:
+    from file_handler import ProcessedFile
+    from litellm_client import LiteLLMClient
+
+
+class TokenCache:
+    """
+    SQLite-backed token count cache with LRU eviction.
+
+    Lookups refresh an entry's last-used time; once the cache holds more than
+    max_entries, the least recently used entries are dropped. Hit/miss
+    counters cover this instance. All failures degrade to cache misses.
+    """
+
+    def __init__(
+        self,
+        db_path: Path | None = None,
+        max_entries: int = config.TOKEN_CACHE_MAX_ENTRIES,
+    ) -> None:
+        self.db_path = db_path or config.TOKEN_CACHE_PATH
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._counter_lock = threading.Lock()
+
+    @staticmethod
+    def key_for(tokenizer: str, text: str) -> str:
+        """Cache key for text tokenized by the given tokenizer"""
+        digest = hashlib.sha256(f"{tokenizer}\0".encode())
+        digest.update(text.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get_many(self, keys: list[str]) -> dict[str, int]:
+        """Return cached counts for the keys that are present"""
+        found: dict[str, int] = {}
+        with contextlib.suppress(sqlite3.Error, OSError), self._connect() as conn:
+            for key in keys:
+                row = conn.execute(
+                    "SELECT tokens FROM token_counts WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    found[key] = int(row[0])
+
+            conn.executemany(
+                "UPDATE token_counts SET used_at = ? WHERE key = ?",
+                [(time.time(), key) for key in found],
+            )
+
+        with self._counter_lock:
+            self.hits += len(found)
+            self.misses += len(set(keys) - set(found))
+        return found
+
+    def put_many(self, counts: dict[str, int]) -> None:
+        """Store counts, then evict least recently used entries over the cap"""
+        if not counts:
+            return
+
+        now = time.time()
+        with contextlib.suppress(sqlite3.Error, OSError), self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO token_counts (key, tokens, used_at) "
+                "VALUES (?, ?, ?)",
+                [(key, tokens, now) for key, tokens in counts.items()],
+            )
+            conn.execute(
+                "DELETE FROM token_counts WHERE key IN ("
+                "  SELECT key FROM token_counts ORDER BY used_at DESC"
+                "  LIMIT -1 OFFSET ?"
+                ")",
+                (self.max_entries,),
+            )
+
+    def stats(self) -> str:
+        """Human-readable hit/miss summary"""
+        return f"{self.hits} hit(s), {self.misses} miss(es)"
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS token_counts ("
+                "  key TEXT PRIMARY KEY, tokens INTEGER NOT NULL, used_at REAL NOT NULL"
+                ")"
+            )
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+def count_prompt_tokens(
+    segments: "list[tuple[ProcessedFile | None, str]]",
+    model: str,
+    client: "LiteLLMClient",
+    cache: TokenCache | None = None,
+) -> int:
+    """
+    Count prompt tokens as the sum of each file section plus the wrapper text.
+
+    File contents are counted (and cached) separately so unchanged files are
+    never re-tokenized; the prompt and headings are counted together once.
+    """
+
+    wrapper = "".join(text for file, text in segments if file is None)
+    sections = [text for file, text in segments if file is not None]
+    return sum(client.count_tokens_batch([wrapper, *sections], model, cache))
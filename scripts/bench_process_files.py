@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark FileHandler.process_files: sequential vs concurrent.
+
+Generates a set of text, image and office attachments in a temporary
+directory, then times process_files with one worker of each kind (the
+sequential baseline) and with the default thread and process pools. The
+conversion cache is off, so every run converts from scratch.
+
+Run with: python scripts/bench_process_files.py [--text N] [--images N]
+[--office N] [--repeat N]
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = (
+    Path(__file__).resolve().parent.parent
+    / "claude-plugins"
+    / "consultant"
+    / "skills"
+    / "consultant"
+    / "scripts"
+)
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+import file_handler
+from file_handler import FileHandler
+
+
+def make_attachments(directory: Path, text: int, images: int, office: int) -> list[str]:
+    """Write the attachments and return their paths"""
+    paths: list[str] = []
+    for n in range(text):
+        path = directory / f"module_{n}.py"
+        path.write_text(
+            "".join(f"def function_{i}(x):\n    return x * {i}\n\n" for i in range(400))
+        )
+        paths.append(str(path))
+
+    if images:
+        from PIL import Image
+
+        for n in range(images):
+            path = directory / f"screenshot_{n}.png"
+            Image.effect_noise((2400, 1600), 40 + n).convert("RGB").save(path)
+            paths.append(str(path))
+
+    if office:
+        from openpyxl import Workbook
+
+        for n in range(office):
+            path = directory / f"sheet_{n}.xlsx"
+            workbook = Workbook()
+            sheet = workbook.active
+            for row in range(2000):
+                sheet.append([f"item {row}", row, row * 1.5, f"note {n}-{row}"])
+            workbook.save(path)
+            paths.append(str(path))
+
+    return paths
+
+
+def time_runs(paths: list[str], repeat: int) -> tuple[float, int, int]:
+    """Median seconds over repeat runs, with the processed and error counts"""
+    timings: list[float] = []
+    processed: list[file_handler.ProcessedFile] = []
+    errors: list[file_handler.FileError] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        processed, errors = FileHandler().process_files(paths)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), len(processed), len(errors)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--text", type=int, default=40, help="Text files")
+    parser.add_argument("--images", type=int, default=8, help="PNG screenshots")
+    parser.add_argument("--office", type=int, default=4, help="Excel workbooks")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per mode")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-process-files-") as tmp:
+        paths = make_attachments(Path(tmp), args.text, args.images, args.office)
+        print(
+            f"{len(paths)} attachments ({args.text} text, {args.images} image, "
+            f"{args.office} office), median of {args.repeat} run(s)"
+        )
+
+        io_workers = file_handler.MAX_IO_WORKERS
+        conversion_workers = file_handler.MAX_CONVERSION_WORKERS
+        modes = [
+            ("sequential", 1, 1),
+            (
+                f"concurrent ({io_workers} threads, {conversion_workers} processes)",
+                io_workers,
+                conversion_workers,
+            ),
+        ]
+        baseline = None
+        for label, threads, processes in modes:
+            file_handler.MAX_IO_WORKERS = threads
+            file_handler.MAX_CONVERSION_WORKERS = processes
+            seconds, processed, errors = time_runs(paths, args.repeat)
+            baseline = baseline or seconds
+            print(
+                f"{label:>40}: {seconds:7.3f}s  ({baseline / seconds:.2f}x)  "
+                f"{processed} processed, {errors} error(s)"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
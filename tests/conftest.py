@@ -0,0 +1,23 @@
+"""
+Shared setup for the unit tests: the consultant scripts are importable as
+top-level modules, as they are when the CLI runs.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+SCRIPTS_DIR = (
+    Path(__file__).resolve().parent.parent
+    / "claude-plugins"
+    / "consultant"
+    / "skills"
+    / "consultant"
+    / "scripts"
+)
+
+# litellm fetches its model cost map over the network at import otherwise
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
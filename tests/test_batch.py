@@ -0,0 +1,247 @@
+"""Tests for batch input parsing and attachment sharing between jobs"""
+
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+from PIL import Image
+
+import batch
+import config
+from batch import BatchJob, BatchRunner, load_jobs, run_batch
+from file_handler import FileError, FileHandler, ProcessedFile
+from token_cache import TokenCache
+
+
+class FakeClient:
+    """Counts a token per four characters; every model has a large window"""
+
+    def count_tokens_batch(
+        self, texts: list[str], model: str, cache: TokenCache | None = None
+    ) -> list[int]:
+        return [len(text) // 4 for text in texts]
+
+    def get_max_tokens(self, model: str) -> int:
+        return 10**6
+
+
+class RecordingSessions:
+    """Stands in for SessionManager: records the sessions jobs would start"""
+
+    def __init__(self) -> None:
+        self.created: dict[str, dict[str, Any]] = {}
+
+    def create_session(self, slug: str, **kwargs: Any) -> str:
+        self.created[slug] = kwargs
+        return f"{slug}-1"
+
+    def wait_for_completion(self, session_id: str) -> dict[str, Any]:
+        if session_id.startswith("fails"):
+            return {"status": "failed", "error": "model error"}
+        return {"status": "completed", "output": f"answer for {session_id}"}
+
+
+@pytest.fixture
+def runner(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> BatchRunner:
+    monkeypatch.setattr(config, "CONVERSION_CACHE_DIR", tmp_path / "conversions")
+    batch_runner = BatchRunner(
+        base_url="http://localhost:1",
+        session_mgr=RecordingSessions(),  # type: ignore[arg-type]
+    )
+    batch_runner.client = FakeClient()  # type: ignore[assignment]
+    batch_runner.token_cache = TokenCache(tmp_path / "tokens.db")
+    return batch_runner
+
+
+def job(line: int, slug: str, files: list[Path], model: str = "gpt-4o") -> BatchJob:
+    return BatchJob(
+        line=line,
+        slug=slug,
+        prompt=f"Describe {slug}",
+        model=model,
+        reasoning_effort="low",
+        files=[str(f) for f in files],
+    )
+
+
+def test_identical_images_in_different_jobs_are_each_sent(
+    tmp_path: Path, runner: BatchRunner
+) -> None:
+    a_png, b_png = tmp_path / "a.png", tmp_path / "b.png"
+    Image.new("RGB", (64, 48), "red").save(a_png)
+    b_png.write_bytes(a_png.read_bytes())
+    jobs = [
+        job(1, "job-a", [a_png]),
+        job(2, "job-b", [b_png]),
+        job(3, "both", [a_png, b_png]),
+    ]
+
+    runner._process_attachments(jobs)
+    for batch_job in jobs:
+        runner._start_session(batch_job)
+    created = runner.session_mgr.created  # type: ignore[attr-defined]
+
+    for slug in ["job-a", "job-b"]:
+        images = created[slug]["image_content"]
+        assert len(images) == 1 and images[0]["image_url"]["url"].startswith("data:")
+        assert created[slug]["token_estimate"] > 0
+        assert "same image as" not in "".join(created[slug]["prompt"])
+
+    # Within one job the duplicate is still sent once and named as such
+    assert len(created["both"]["image_content"]) == 1
+    assert f"- {b_png} (same image as {a_png})" in "".join(created["both"]["prompt"])
+
+
+def write_lines(path: Path, *lines: object) -> Path:
+    path.write_text(
+        "".join(
+            (line if isinstance(line, str) else json.dumps(line)) + "\n"
+            for line in lines
+        )
+    )
+    return path
+
+
+def test_load_jobs_parses_valid_lines(tmp_path: Path) -> None:
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "app.py").write_text("print()\n")
+    (tmp_path / "notes.md").write_text("# Notes\n")
+    batch_file = write_lines(
+        tmp_path / "batch.jsonl",
+        {"slug": "a", "prompt": "Review", "files": str(tmp_path / "notes.md")},
+        "",
+        {
+            "slug": "b",
+            "prompt": "Review",
+            "model": "claude-sonnet-4-5",
+            "effort": "low",
+            "files": [str(tmp_path / "src")],
+        },
+        {"slug": "c", "prompt": "Review", "reasoning_effort": "medium"},
+    )
+
+    jobs, errors = load_jobs(batch_file, "gpt-5.2")
+
+    assert errors == []
+    assert [(j.line, j.slug, j.model, j.reasoning_effort) for j in jobs] == [
+        (1, "a", "gpt-5.2", "xhigh"),
+        (3, "b", "claude-sonnet-4-5", "low"),
+        (4, "c", "gpt-5.2", "medium"),
+    ]
+    assert jobs[0].files == [str(tmp_path / "notes.md")]
+    assert jobs[1].files == [str(tmp_path / "src" / "app.py")]
+    assert jobs[2].files == []
+
+
+def test_load_jobs_reports_every_invalid_line(tmp_path: Path) -> None:
+    batch_file = write_lines(
+        tmp_path / "batch.jsonl",
+        "{not json",
+        ["a", "list"],
+        {"slug": "a"},
+        {"prompt": "Review", "slug": ""},
+        {"slug": "ok", "prompt": "Review"},
+        {"slug": "ok", "prompt": "Again"},
+        {"slug": "gone", "prompt": "Review", "files": [str(tmp_path / "*.rs")]},
+    )
+
+    jobs, errors = load_jobs(batch_file, "gpt-5.2")
+
+    assert [job.slug for job in jobs] == ["ok"]
+    assert [error.split(":")[0] for error in errors] == [
+        "line 1",
+        "line 2",
+        "line 3",
+        "line 4",
+        "line 6",
+        "line 7",
+    ]
+    assert "invalid JSON" in errors[0]
+    assert errors[1] == "line 2: expected a JSON object"
+    assert errors[2] == "line 3: missing prompt"
+    assert errors[3] == "line 4: missing slug"
+    assert errors[4] == "line 6: duplicate slug 'ok'"
+    assert errors[5] == f"line 7: No files match '{tmp_path / '*.rs'}'"
+
+
+def test_each_attachment_is_processed_once(
+    tmp_path: Path, runner: BatchRunner, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    shared, own = tmp_path / "shared.py", tmp_path / "own.py"
+    shared.write_text("SHARED = 1\n")
+    own.write_text("OWN = 2\n")
+    processed_paths: list[list[str]] = []
+    process_files = FileHandler.process_files
+
+    def recording_process_files(
+        self: FileHandler, paths: list[str]
+    ) -> tuple[list[ProcessedFile], list[FileError]]:
+        processed_paths.append(paths)
+        return process_files(self, paths)
+
+    monkeypatch.setattr(FileHandler, "process_files", recording_process_files)
+    jobs = [
+        job(1, "first", [shared]),
+        job(2, "second", [shared, own]),
+        job(3, "missing", [shared, tmp_path / "missing.py"]),
+    ]
+
+    runner._process_attachments(jobs)
+
+    assert processed_paths == [[str(shared), str(own), str(tmp_path / "missing.py")]]
+    for batch_job in jobs[:2]:
+        runner._start_session(batch_job)
+    created = runner.session_mgr.created  # type: ignore[attr-defined]
+    assert "SHARED = 1" in "".join(created["first"]["prompt"])
+    assert "SHARED = 1" in "".join(created["second"]["prompt"])
+    with pytest.raises(ValueError, match="missing.py: File not found"):
+        runner._start_session(jobs[2])
+
+
+@pytest.fixture
+def batch_runner(runner: BatchRunner, monkeypatch: pytest.MonkeyPatch) -> BatchRunner:
+    """run_batch builds its runner from the options; this one is prepared"""
+    monkeypatch.setattr(batch, "BatchRunner", lambda **options: runner)
+    return runner
+
+
+@pytest.mark.parametrize(
+    ("slugs", "code", "statuses"),
+    [
+        (["a", "b"], 0, {"completed"}),
+        (["a", "fails-b"], 1, {"completed", "failed"}),
+    ],
+)
+def test_run_batch_exit_code_and_results(
+    tmp_path: Path,
+    batch_runner: BatchRunner,
+    slugs: list[str],
+    code: int,
+    statuses: set[str],
+) -> None:
+    batch_file = write_lines(
+        tmp_path / "batch.jsonl", *[{"slug": s, "prompt": "Review"} for s in slugs]
+    )
+    results = tmp_path / "results.jsonl"
+
+    assert run_batch(batch_file, results, "gpt-4o") == code
+
+    records = [json.loads(line) for line in results.read_text().splitlines()]
+    assert sorted(r["slug"] for r in records) == slugs
+    assert {r["status"] for r in records} == statuses
+
+
+def test_run_batch_rejects_invalid_input_before_running(
+    tmp_path: Path, batch_runner: BatchRunner
+) -> None:
+    batch_file = write_lines(
+        tmp_path / "batch.jsonl", {"slug": "a", "prompt": "Review"}, "{oops"
+    )
+    results = tmp_path / "results.jsonl"
+
+    assert run_batch(batch_file, results, "gpt-4o") == 1
+    assert not results.exists()
+    assert batch_runner.session_mgr.created == {}  # type: ignore[attr-defined]
+
+    assert run_batch(write_lines(tmp_path / "empty.jsonl", ""), results, "gpt-4o") == 0
@@ -0,0 +1,125 @@
+"""Tests for size-capped eviction in the conversion and response caches"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from conversion_cache import SIZE_FILE, CacheSize, ConversionCache
+from response_cache import ResponseCache
+
+
+def recorded_size(cache_dir: Path) -> int:
+    return int((cache_dir / SIZE_FILE).read_text())
+
+
+def age(cache: ConversionCache, key: str, seconds: float) -> None:
+    then = time.time() - seconds
+    os.utime(cache._entry_path(key), (then, then))
+
+
+def test_writes_under_the_cap_do_not_scan(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cache = ConversionCache(tmp_path, max_bytes=1000)
+    scans: list[int] = []
+    evict = CacheSize._evict
+
+    def counting_evict(self: CacheSize) -> int:
+        scans.append(1)
+        return evict(self)
+
+    monkeypatch.setattr(CacheSize, "_evict", counting_evict)
+
+    for n in range(5):
+        cache.put(f"{n:02d}key", "x" * 100)
+    cache.put("00key", "y" * 50)  # replacing an entry counts the difference
+
+    assert len(scans) == 1  # only to learn the size of the new cache
+    assert recorded_size(tmp_path) == 450
+
+
+def test_least_recently_used_entries_are_evicted_past_the_cap(
+    tmp_path: Path,
+) -> None:
+    cache = ConversionCache(tmp_path, max_bytes=350)
+    for n, key in enumerate(["aa1", "bb2", "cc3"]):
+        cache.put(key, "x" * 100)
+        age(cache, key, 100 - n)
+    assert cache.get("aa1") is not None  # now the most recently used
+
+    cache.put("dd4", "x" * 100)
+
+    assert cache.get("bb2") is None
+    assert all(cache.get(key) for key in ["aa1", "cc3", "dd4"])
+    assert recorded_size(tmp_path) == 300
+
+
+def test_size_written_by_other_processes_is_picked_up_by_a_scan(
+    tmp_path: Path,
+) -> None:
+    first = ConversionCache(tmp_path, max_bytes=250)
+    second = ConversionCache(tmp_path, max_bytes=250)
+    first.put("aa1", "x" * 100)
+    age(first, "aa1", 100)
+    (tmp_path / SIZE_FILE).unlink()  # e.g. lost to a concurrent update
+
+    second.put("bb2", "x" * 100)
+    second.put("cc3", "x" * 100)
+
+    assert recorded_size(tmp_path) == 200
+    assert first.get("aa1") is None
+
+
+def test_expired_responses_are_subtracted(tmp_path: Path) -> None:
+    cache = ResponseCache(tmp_path, max_bytes=10**6, ttl=60)
+    cache.put("a" * 64, "review-1", {"content": "answer"})
+    size = recorded_size(tmp_path)
+    assert size > 0 and cache.get("a" * 64) is not None
+
+    cache.ttl = -1
+    assert cache.get("a" * 64) is None
+    assert recorded_size(tmp_path) == 0
+
+
+def add_many(cache_dir: Path, times: int) -> None:
+    size = CacheSize(cache_dir, "*/*", max_bytes=10**6)
+    for _ in range(times):
+        size.add(1)
+
+
+def test_concurrent_updates_are_not_lost(tmp_path: Path) -> None:
+    (tmp_path / SIZE_FILE).write_text("0")
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=add_many, args=(tmp_path, 50)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        list(pool.map(lambda _: add_many(tmp_path, 50), range(3)))
+    for worker in workers:
+        worker.join()
+
+    assert recorded_size(tmp_path) == 300
+
+
+def test_concurrent_writes_of_one_key_leave_no_temporary_files(
+    tmp_path: Path,
+) -> None:
+    conversions = ConversionCache(tmp_path / "conversions", max_bytes=10**6)
+    responses = ResponseCache(tmp_path / "responses", max_bytes=10**6, ttl=60)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda n: conversions.put("aa1", f"{n:03d}" * 100), range(40)))
+        list(
+            pool.map(
+                lambda n: responses.put("b" * 64, "review-1", {"content": str(n)}),
+                range(40),
+            )
+        )
+
+    assert conversions.get("aa1") is not None and responses.get("b" * 64)
+    assert not list(tmp_path.rglob("*.tmp"))
+    assert recorded_size(tmp_path / "conversions") == 300
@@ -0,0 +1,228 @@
+"""Tests for council mode and for follow-up turns of a conversation"""
+
+import argparse
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import config
+import consultant_cli
+from daemon import CONSULTATION_DEFAULTS
+from file_handler import FileError, FileHandler, ProcessedFile
+from session_manager import SessionManager
+
+
+@pytest.fixture
+def manager(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> SessionManager:
+    """Sessions under tmp_path whose workers never run"""
+    monkeypatch.setattr(config, "DEFAULT_SESSIONS_DIR", tmp_path / "sessions")
+    monkeypatch.setattr(config, "CONVERSION_CACHE_DIR", tmp_path / "conversions")
+    monkeypatch.setattr(SessionManager, "_start_worker", lambda *args: None)
+    return SessionManager()
+
+
+def finish(manager: SessionManager, session_id: str, output: str) -> None:
+    session_dir = manager.sessions_dir / session_id
+    (session_dir / "output.txt").write_text(output)
+    manager._update_status(session_id, "completed")
+
+
+def start_turn(
+    manager: SessionManager,
+    prompt: str,
+    model: str,
+    parent: str | None = None,
+    attachments: dict[str, str] | None = None,
+) -> str:
+    session_id: str = manager.create_session(
+        slug="review",
+        prompt=prompt,
+        model=model,
+        base_url="http://localhost:1",
+        extra_metadata={"followup": {"parent": parent}} if parent else None,
+        attachments=attachments,
+    )
+    return session_id
+
+
+def test_council_prepares_once_and_starts_a_session_per_model(
+    tmp_path: Path, manager: SessionManager, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    processed: list[list[str]] = []
+    process_files = FileHandler.process_files
+
+    def recording_process_files(
+        self: FileHandler, paths: list[str]
+    ) -> tuple[list[ProcessedFile], list[FileError]]:
+        processed.append(paths)
+        return process_files(self, paths)
+
+    checked: list[str] = []
+
+    def validate_context_size(segments: Any, model: str, *args: Any, **kw: Any) -> int:
+        checked.append(model)
+        return 100
+
+    monkeypatch.setattr(FileHandler, "process_files", recording_process_files)
+    monkeypatch.setattr(consultant_cli, "validate_context_size", validate_context_size)
+    (tmp_path / "a.py").write_text("print('a')\n")
+    args = argparse.Namespace(
+        **{
+            **CONSULTATION_DEFAULTS,
+            "prompt": "Review",
+            "slug": "council",
+            "files": [str(tmp_path / "a.py")],
+            "models": ["gpt-5.2-pro", "claude-opus-4-5", "gpt-5.2-pro"],
+            "base_url": "http://localhost:1",
+        }
+    )
+
+    exit_code, sessions = consultant_cli.start_sessions(args, manager)
+
+    assert exit_code == 0 and len(processed) == 1
+    assert checked == ["gpt-5.2-pro", "claude-opus-4-5"]
+    assert [model for model, _ in sessions] == ["gpt-5.2-pro", "claude-opus-4-5"]
+    metadata = [
+        json.loads((manager.sessions_dir / sid / "metadata.json").read_text())
+        for _, sid in sessions
+    ]
+    assert [m["slug"] for m in metadata] == [
+        "council-gpt-5-2-pro",
+        "council-claude-opus-4-5",
+    ]
+    assert [m["token_estimate"] for m in metadata] == [100, 100]
+    prompts = {
+        (manager.sessions_dir / sid / "prompt.txt").read_text() for _, sid in sessions
+    }
+    assert len(prompts) == 1 and "print('a')" in prompts.pop()
+
+
+def test_council_results_print_together(capsys: pytest.CaptureFixture[str]) -> None:
+    results = {
+        "s-1": {"status": "completed", "output": "Answer one"},
+        "s-2": {"status": "error", "error": "Rate limited"},
+        "s-3": {"status": "completed", "output": "Answer three"},
+    }
+    sessions = [("gpt-5.2-pro", "s-1"), ("claude-opus-4-5", "s-2"), ("gemini", "s-3")]
+    args = argparse.Namespace(stream=False, reasoning_effort="high")
+
+    exit_code = consultant_cli.await_sessions(
+        None,  # type: ignore[arg-type]
+        sessions,
+        args,
+        wait=results.__getitem__,
+    )
+
+    out = capsys.readouterr().out
+    assert exit_code == 1  # one model failed
+    positions = [
+        out.index(text)
+        for text in [
+            "MODEL: gpt-5.2-pro",
+            "Answer one",
+            "MODEL: claude-opus-4-5",
+            "Error: Rate limited",
+            "MODEL: gemini",
+            "Answer three",
+        ]
+    ]
+    assert positions == sorted(positions)
+
+
+@pytest.mark.parametrize("model", ["gpt-5.2-pro", "claude-sonnet-4-5"])
+def test_turns_without_a_stored_response_carry_the_history(
+    manager: SessionManager, model: str
+) -> None:
+    first = start_turn(manager, "What does a.py do?", model)
+    finish(manager, first, "It prints a.")
+    second = start_turn(manager, "And b.py?", model, parent=first)
+    finish(manager, second, "It prints b.")
+    third = start_turn(manager, "Compare them", model, parent=second)
+
+    assert manager._conversation_input(first, model) == {}
+    assert manager._conversation_input(third, model) == {
+        "history": [
+            {"role": "user", "content": "What does a.py do?"},
+            {"role": "assistant", "content": "It prints a."},
+            {"role": "user", "content": "And b.py?"},
+            {"role": "assistant", "content": "It prints b."},
+        ]
+    }
+
+
+def test_responses_models_chain_to_the_stored_response(
+    manager: SessionManager,
+) -> None:
+    first = start_turn(manager, "What does a.py do?", "gpt-5.2-pro")
+    finish(manager, first, "It prints a.")
+    (manager.sessions_dir / first / "response_id.txt").write_text("resp_1\n")
+    second = start_turn(manager, "And b.py?", "gpt-5.2-pro", parent=first)
+
+    assert manager._conversation_input(second, "gpt-5.2-pro") == {
+        "previous_response_id": "resp_1"
+    }
+    # Completions providers cannot chain, so they always get the history
+    assert "history" in manager._conversation_input(second, "claude-sonnet-4-5")
+
+
+def followup(slug: str, prompt: str, files: list[Path]) -> argparse.Namespace:
+    return argparse.Namespace(
+        slug=slug,
+        prompt=prompt,
+        files=[str(f) for f in files],
+        reasoning_effort=None,
+        stream=False,
+        deadline=None,
+        api_key=None,
+        include=None,
+        exclude=None,
+        max_file_size=config.EXPAND_MAX_FILE_BYTES,
+    )
+
+
+def test_followups_resend_only_new_and_changed_files(
+    tmp_path: Path, manager: SessionManager, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(consultant_cli, "validate_context_size", lambda *a, **k: 0)
+    monkeypatch.setattr(consultant_cli, "await_sessions", lambda *args: 0)
+    a_py, b_py, c_py = (tmp_path / name for name in ["a.py", "b.py", "c.py"])
+    a_py.write_text("print('a')\n")
+    b_py.write_text("print('b')\n")
+    c_py.write_text("print('c')\n")
+
+    def files_sent(session_id: str) -> dict[str, Any]:
+        session_dir = manager.sessions_dir / session_id
+        return {
+            "prompt": (session_dir / "prompt.txt").read_text(),
+            "attachments": json.loads((session_dir / "attachments.json").read_text()),
+        }
+
+    first = start_turn(manager, "Review", "gpt-5.2-pro")
+    # Only finished sessions can be followed up
+    assert consultant_cli.handle_followup(followup(first, "Q1", [a_py, b_py])) == 1
+    finish(manager, first, "Looks fine.")
+
+    assert consultant_cli.handle_followup(followup(first, "Q2", [a_py, b_py])) == 0
+    second = manager.index.latest_id("review")
+    assert second is not None
+    sent = files_sent(second)
+    assert sorted(sent["attachments"]) == [str(a_py), str(b_py)]
+    finish(manager, second, "Both print.")
+
+    b_py.write_text("print('B')\n")
+    assert (
+        consultant_cli.handle_followup(followup("review", "Q3", [a_py, b_py, c_py]))
+        == 0
+    )
+    third = manager.index.latest_id("review")
+    assert third is not None and third != second
+    sent = files_sent(third)
+
+    assert sorted(sent["attachments"]) == [str(b_py), str(c_py)]
+    assert f"{b_py} (updated)" in sent["prompt"] and "print('B')" in sent["prompt"]
+    assert str(c_py) in sent["prompt"]
+    assert str(a_py) not in sent["prompt"]
+    metadata = json.loads((manager.sessions_dir / third / "metadata.json").read_text())
+    assert metadata["followup"] == {"parent": second}
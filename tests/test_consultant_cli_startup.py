@@ -0,0 +1,87 @@
+"""
+Startup regression tests for the consultant CLI.
+
+Read-only subcommands must not import litellm or markitdown, which take
+seconds to load and are only needed to call a model or convert documents.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from tests.conftest import SCRIPTS_DIR
+
+HEAVY_MODULES = ("litellm", "markitdown")
+
+# Runs the CLI in-process, then reports which heavy modules were imported
+RUNNER = """
+import json, sys
+sys.path.insert(0, {scripts_dir!r})
+sys.argv = ["consultant_cli.py"] + {argv!r}
+import consultant_cli
+code = consultant_cli.main()
+loaded = [m for m in {heavy!r} if m in sys.modules]
+print("__LOADED__" + json.dumps({{"code": code, "loaded": loaded}}))
+"""
+
+
+def run_cli(argv: list[str], home: Path) -> dict[str, object]:
+    source = RUNNER.format(scripts_dir=str(SCRIPTS_DIR), argv=argv, heavy=HEAVY_MODULES)
+    env = {**os.environ, "HOME": str(home)}
+    proc = subprocess.run(
+        [sys.executable, "-c", source],
+        capture_output=True,
+        text=True,
+        env=env,
+        timeout=60,
+    )
+    assert proc.returncode == 0, proc.stderr
+    marker = proc.stdout.rsplit("__LOADED__", 1)[-1]
+    result: dict[str, object] = json.loads(marker)
+    return result
+
+
+def write_session(home: Path, slug: str) -> None:
+    session_dir = home / ".consultant" / "sessions" / f"{slug}-1700000000"
+    session_dir.mkdir(parents=True)
+    metadata = {
+        "id": session_dir.name,
+        "slug": slug,
+        "created_at": "2026-01-01T00:00:00",
+        "status": "completed",
+        "model": "gpt-5.2-pro",
+    }
+    (session_dir / "metadata.json").write_text(json.dumps(metadata))
+    (session_dir / "output.txt").write_text("done")
+
+
+@pytest.mark.parametrize("argv", [["list"], ["session", "review"]])
+def test_read_only_commands_skip_heavy_imports(argv: list[str], tmp_path: Path) -> None:
+    write_session(tmp_path, "review")
+
+    result = run_cli(argv, tmp_path)
+
+    assert result["code"] == 0
+    assert result["loaded"] == []
+
+
+def test_importing_cli_skips_heavy_imports(tmp_path: Path) -> None:
+    source = (
+        f"import sys; sys.path.insert(0, {str(SCRIPTS_DIR)!r}); "
+        "import consultant_cli; "
+        f"print([m for m in {HEAVY_MODULES!r} if m in sys.modules])"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", source],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "HOME": str(tmp_path)},
+        timeout=60,
+    )
+
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.strip() == "[]"
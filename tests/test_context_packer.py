@@ -0,0 +1,235 @@
+"""Tests for budget-aware packing of reference files"""
+
+import pytest
+
+from context_packer import (
+    FULL,
+    OMITTED,
+    OUTLINE,
+    PackedFile,
+    file_priority,
+    outline,
+    pack_files,
+    parse_priorities,
+)
+from file_handler import FileCategory, ProcessedFile
+
+PYTHON = '''\
+import os
+
+
+@dataclass
+class Config:
+    """Settings for the tool.
+
+    More detail that outlines leave out.
+    """
+
+    name: str = "x"
+
+    def load(self, path: str) -> None:
+        data = open(path).read()
+        self.name = data.strip()
+
+
+async def fetch(url):
+    return await get(url)
+'''
+
+
+OUTLINE_LABEL = " (outline: signatures only)"
+
+
+def count_chars(texts: list[str]) -> list[int]:
+    """Token counter for the tests: one token per character"""
+    return [len(text) for text in texts]
+
+
+def text_file(path: str, content: str) -> ProcessedFile:
+    return ProcessedFile(path=path, category=FileCategory.TEXT, content=content)
+
+
+def python_file(path: str, body_lines: int) -> ProcessedFile:
+    """A Python file whose outline is far smaller than the file"""
+    body = "".join(f"    x{n} = {n}\n" for n in range(body_lines))
+    return text_file(path, f"def {path.removesuffix('.py')}():\n{body}")
+
+
+def wrapper_tokens(prompt: str, files: list[ProcessedFile]) -> int:
+    """Tokens of everything but the file contents, with all files in full"""
+    segments, _ = pack_files(prompt, files, 10**9, [], count_chars)
+    return sum(len(text) for file, text in segments if file is None)
+
+
+def prompt_tokens(segments: list[tuple[ProcessedFile | None, str]]) -> int:
+    return sum(len(text) for _, text in segments)
+
+
+def tiers(decisions: list[PackedFile]) -> dict[str, str]:
+    return {d.path: d.tier for d in decisions}
+
+
+def test_everything_fits_in_full() -> None:
+    files = [python_file("a.py", 10), text_file("notes.md", "# Notes\nbody\n")]
+
+    segments, decisions = pack_files("Review", files, 10**6, [], count_chars)
+
+    assert tiers(decisions) == {"a.py": FULL, "notes.md": FULL}
+    assert [text for file, text in segments if file is not None] == [
+        files[0].content,
+        files[1].content,
+    ]
+    assert segments[-1] == (None, "Review")
+
+
+@pytest.mark.parametrize("slack", [0, 200, 600, 1500, 10**5])
+def test_budget_is_respected(slack: int) -> None:
+    files = [
+        python_file("big.py", 80),
+        python_file("mid.py", 40),
+        text_file("plain.txt", "no declarations here\n" * 30),
+        python_file("small.py", 5),
+    ]
+    wrapper = wrapper_tokens("Review", files)
+
+    segments, decisions = pack_files("Review", files, wrapper + slack, [], count_chars)
+
+    assert prompt_tokens(segments) <= wrapper + slack
+    # Each attached file is counted at the tier it was packed at
+    packed = {file.path: len(text) for file, text in segments if file is not None}
+    assert sum(packed.values()) == sum(d.tokens for d in decisions)
+
+
+def test_lowest_priority_and_largest_files_are_demoted_first() -> None:
+    files = [
+        python_file("core.py", 60),
+        python_file("big.py", 80),
+        python_file("small.py", 20),
+    ]
+    full = sum(len(f.content) for f in files)
+    budget = wrapper_tokens("Review", files) + full - 100
+
+    _, by_size = pack_files("Review", files, budget, [], count_chars)
+    _, by_priority = pack_files(
+        "Review", files, budget, parse_priorities(["big.py=1"]), count_chars
+    )
+
+    assert tiers(by_size) == {"core.py": FULL, "big.py": OUTLINE, "small.py": FULL}
+    assert tiers(by_priority) == {
+        "core.py": OUTLINE,
+        "big.py": FULL,
+        "small.py": FULL,
+    }
+
+
+def test_files_are_outlined_before_any_is_omitted() -> None:
+    files = [python_file("a.py", 60), python_file("helpers.py", 50)]
+    outlines = sum(len(outline(f)) + len(OUTLINE_LABEL) for f in files)
+    budget = wrapper_tokens("Review", files) + outlines
+
+    segments, decisions = pack_files("Review", files, budget, [], count_chars)
+
+    assert tiers(decisions) == {"a.py": OUTLINE, "helpers.py": OUTLINE}
+    labels = [file.path for file, _ in segments if file is not None]
+    assert labels == [
+        "a.py (outline: signatures only)",
+        "helpers.py (outline: signatures only)",
+    ]
+
+    _, decisions = pack_files("Review", files, budget - 1, [], count_chars)
+    # Omitting either outline adds a note longer than the outline it saves
+    assert tiers(decisions) == {"a.py": OMITTED, "helpers.py": OMITTED}
+
+
+def test_ties_demote_the_file_attached_last() -> None:
+    files = [python_file("first.py", 30), python_file("second.py", 30)]
+    budget = wrapper_tokens("Review", files) + len(files[0].content) * 2 - 1
+
+    _, decisions = pack_files("Review", files, budget, [], count_chars)
+
+    assert tiers(decisions) == {"first.py": FULL, "second.py": OUTLINE}
+
+
+def test_files_without_a_useful_outline_are_omitted_with_a_note() -> None:
+    files = [text_file("plain.txt", "just prose\n" * 50), python_file("a.py", 5)]
+    files.append(ProcessedFile(path="shot.png", category=FileCategory.IMAGE))
+    note = (
+        "\n\n*Note: 1 reference file(s) omitted to fit the context window:*\n"
+        "- plain.txt\n"
+    )
+    budget = wrapper_tokens("Review", files) + len(files[1].content) + len(note)
+
+    segments, decisions = pack_files("Review", files, budget, [], count_chars)
+
+    assert tiers(decisions) == {"plain.txt": OMITTED, "a.py": FULL}
+    prompt = "".join(text for _, text in segments)
+    assert note in prompt
+    assert "shot.png" in prompt  # images are never demoted
+    assert decisions[0].describe() == "plain.txt: omitted (550 tokens)"
+
+
+def test_the_note_on_omitted_files_counts_against_the_budget() -> None:
+    files = [
+        text_file(f"docs/very/long/path/to/chapter_{n:02d}.txt", "prose\n" * 10)
+        for n in range(12)
+    ]
+    full = wrapper_tokens("Review", files) + sum(len(f.content) for f in files)
+
+    for over in range(1, 400, 7):
+        segments, decisions = pack_files("Review", files, full - over, [], count_chars)
+
+        assert prompt_tokens(segments) <= full - over
+        omitted = [d for d in decisions if d.tier == OMITTED]
+        # Each omission costs a note line longer than the file it drops
+        assert len(omitted) > over // 60
+
+
+def test_only_the_prompt_left_stops_demoting() -> None:
+    files = [python_file("a.py", 10)]
+
+    _, decisions = pack_files("Review", files, 1, [], count_chars)
+
+    assert tiers(decisions) == {"a.py": OMITTED}
+
+
+def test_python_outline_keeps_signatures_and_first_docstring_line() -> None:
+    result = outline(text_file("config.py", PYTHON))
+
+    assert result == (
+        "@dataclass\n"
+        "class Config:\n"
+        '    """Settings for the tool."""\n'
+        "    ...\n"
+        "    def load(self, path: str) -> None:\n"
+        "        ...\n"
+        "async def fetch(url):\n"
+        "    ..."
+    )
+
+
+def test_outline_of_other_files_keeps_declarations_and_headings() -> None:
+    source = (
+        "# Title\ntext\n## Section\n"
+        "export default function main() {\n  return 1;\n}\n"
+        "pub(crate) struct Point { x: i32 }\n"
+    )
+    assert outline(text_file("notes.ts", source)) == (
+        "# Title\n## Section\n"
+        "export default function main() {\n"
+        "pub(crate) struct Point { x: i32 }"
+    )
+    # Python that does not parse falls back to the same line filter
+    broken = "def ok():\n    pass\nclass Broken(:\n"
+    assert outline(text_file("broken.py", broken)) == "def ok():\nclass Broken(:"
+
+
+def test_priorities() -> None:
+    priorities = parse_priorities(["src/*=2", "src/legacy/*=-1", "*.md=1"])
+
+    assert file_priority("src/app.py", priorities) == 2
+    assert file_priority("src/legacy/old.py", priorities) == -1
+    assert file_priority("README.md", priorities) == 1
+    assert file_priority("setup.py", priorities) == 0
+    for invalid in ["src/*", "=3", "src/*=high"]:
+        with pytest.raises(ValueError, match="expected GLOB=N"):
+            parse_priorities([invalid])
@@ -0,0 +1,165 @@
+"""Tests for the daemon's HTTP routes and the client that calls them"""
+
+import argparse
+import json
+import socketserver
+import threading
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+
+import consultant_cli
+from daemon import create_app
+from daemon_client import DaemonClient
+
+
+class FakeSessions:
+    """Stands in for SessionManager: one finished and one running session"""
+
+    def __init__(self, sessions_dir: Path) -> None:
+        self.sessions_dir = sessions_dir
+        for session_id in ["done-1", "running-1"]:
+            (sessions_dir / session_id).mkdir()
+        self.waits: list[tuple[str, float | None]] = []
+
+    def wait_for_completion(
+        self, session_id: str, timeout: float | None = None
+    ) -> dict[str, Any]:
+        self.waits.append((session_id, timeout))
+        if session_id == "running-1":
+            raise TimeoutError(f"Session {session_id} did not complete within 5s")
+        return {"id": session_id, "status": "completed", "output": "answer"}
+
+    def follow_output(self, session_id: str) -> Iterator[str]:
+        yield from ["Hel", "lo"]
+
+
+@pytest.fixture
+def sessions(tmp_path: Path) -> FakeSessions:
+    return FakeSessions(tmp_path)
+
+
+@pytest.fixture
+def client(sessions: FakeSessions) -> TestClient:
+    return TestClient(create_app(sessions))  # type: ignore[arg-type]
+
+
+def test_submit_returns_the_sessions_and_the_preparation_log(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    received: list[argparse.Namespace] = []
+
+    def start_sessions(
+        args: argparse.Namespace, session_mgr: Any
+    ) -> tuple[int, list[tuple[str, str]]]:
+        received.append(args)
+        print("Processing 1 file(s)...")
+        return 0, [("gpt-5.2", "review-1")]
+
+    monkeypatch.setattr(consultant_cli, "start_sessions", start_sessions)
+
+    response = client.post(
+        "/consultations", json={"prompt": "Review", "slug": "review", "stream": True}
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "exit_code": 0,
+        "log": "Processing 1 file(s)...\n",
+        "sessions": [["gpt-5.2", "review-1"]],
+    }
+    # Options the request leaves out take the CLI's defaults
+    assert received[0].stream is True
+    assert received[0].reasoning_effort == "xhigh"
+
+
+def test_submit_reports_preparation_failures(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def start_sessions(args: argparse.Namespace, session_mgr: Any) -> Any:
+        raise SystemExit(2)
+
+    monkeypatch.setattr(consultant_cli, "start_sessions", start_sessions)
+
+    assert client.post("/consultations", json={"prompt": "Review"}).status_code == 422
+    response = client.post("/consultations", json={"prompt": "Review", "slug": "r"})
+    assert response.json() == {"exit_code": 2, "log": "", "sessions": []}
+
+
+def test_wait_returns_the_result_or_times_out(
+    client: TestClient, sessions: FakeSessions
+) -> None:
+    done = client.get("/sessions/done-1/wait")
+    running = client.get("/sessions/running-1/wait", params={"timeout": 5})
+
+    assert done.json()["output"] == "answer"
+    assert running.status_code == 504
+    assert running.json()["detail"] == "Session running-1 did not complete within 5s"
+    assert sessions.waits == [("done-1", None), ("running-1", 5.0)]
+    assert client.get("/sessions/missing-1/wait").status_code == 404
+
+
+def test_stream_sends_the_output_as_it_is_written(client: TestClient) -> None:
+    response = client.get("/sessions/done-1/stream")
+
+    assert response.text == "Hello"
+    assert client.get("/sessions/missing-1/stream").status_code == 404
+
+
+class ReplyHandler(BaseHTTPRequestHandler):
+    """Answers every request with the status and body the server holds"""
+
+    def do_GET(self) -> None:
+        status, body = self.server.reply  # type: ignore[attr-defined]
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode())
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def daemon_socket(tmp_path: Path) -> Iterator[tuple[Path, Any]]:
+    socket_path = tmp_path / "d.sock"
+    server = socketserver.UnixStreamServer(str(socket_path), ReplyHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield socket_path, server
+    server.shutdown()
+    server.server_close()
+
+
+def test_client_maps_a_timed_out_wait_to_timeout_error(
+    daemon_socket: tuple[Path, Any],
+) -> None:
+    socket_path, server = daemon_socket
+    client = DaemonClient(socket_path)
+
+    server.reply = (200, {"status": "completed"})
+    assert client.wait_for_completion("review-1", timeout=5) == {"status": "completed"}
+
+    server.reply = (504, {"detail": "Session review-1 did not complete within 5s"})
+    with pytest.raises(TimeoutError, match="did not complete within 5s"):
+        client.wait_for_completion("review-1", timeout=5)
+
+    server.reply = (500, {"detail": "boom"})
+    with pytest.raises(RuntimeError, match="Daemon returned 500"):
+        client.wait_for_completion("review-1")
+
+
+def test_client_sees_a_missing_or_unhealthy_daemon(
+    tmp_path: Path, daemon_socket: tuple[Path, Any]
+) -> None:
+    socket_path, server = daemon_socket
+
+    server.reply = (200, {"status": "ok"})
+    assert DaemonClient(socket_path).is_running()
+    server.reply = (500, {"detail": "boom"})
+    assert not DaemonClient(socket_path).is_running()
+    assert not DaemonClient(tmp_path / "none.sock").is_running()
@@ -0,0 +1,112 @@
+"""Tests for concurrent attachment processing in FileHandler.process_files"""
+
+from pathlib import Path
+
+import pytest
+
+import file_handler
+from file_handler import FileCategory, FileError, FileHandler, ProcessedFile
+
+
+def fake_convert(self: FileHandler, path: Path) -> ProcessedFile | FileError:
+    """Stands in for markitdown: office files here hold plain text"""
+    text = path.read_text()
+    if text == "crash":
+        raise RuntimeError("converter crashed")
+    if not text:
+        return FileError(path=str(path), reason="markitdown returned empty content")
+    return ProcessedFile(path=str(path), category=FileCategory.OFFICE, content=text)
+
+
+@pytest.fixture
+def attachments(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    monkeypatch.setattr(FileHandler, "_convert_office", fake_convert)
+    files = {
+        "a.py": "print('a')\n",
+        "report.docx": "quarterly report",
+        "b.md": "# B\n",
+        "empty.xlsx": "",
+        "c.txt": "plain text\n",
+        "broken.pptx": "crash",
+        "slides.pptx": "slide text",
+    }
+    for name, content in files.items():
+        (tmp_path / name).write_text(content)
+    (tmp_path / "blob.bin").write_bytes(b"\x00\xff" * 100)
+    (tmp_path / "folder").mkdir()
+    return [
+        str(tmp_path / name)
+        for name in [
+            "a.py",
+            "report.docx",
+            "missing.txt",
+            "b.md",
+            "empty.xlsx",
+            "folder",
+            "c.txt",
+            "blob.bin",
+            "broken.pptx",
+            "slides.pptx",
+        ]
+    ]
+
+
+def run(
+    paths: list[str], monkeypatch: pytest.MonkeyPatch, io_workers: int, workers: int
+) -> tuple[list[ProcessedFile], list[FileError]]:
+    monkeypatch.setattr(file_handler, "MAX_IO_WORKERS", io_workers)
+    monkeypatch.setattr(file_handler, "MAX_CONVERSION_WORKERS", workers)
+    return FileHandler().process_files(paths)
+
+
+def test_results_keep_input_order_under_both_pools(
+    attachments: list[str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    processed, errors = run(attachments, monkeypatch, io_workers=4, workers=4)
+
+    names = [Path(f.path).name for f in processed]
+    assert names == ["a.py", "report.docx", "b.md", "c.txt", "slides.pptx"]
+    assert [f.category for f in processed] == [
+        FileCategory.TEXT,
+        FileCategory.OFFICE,
+        FileCategory.TEXT,
+        FileCategory.TEXT,
+        FileCategory.OFFICE,
+    ]
+    assert processed[1].content == "quarterly report"
+    assert processed[0].content == "print('a')\n"
+
+    failed = {Path(e.path).name: e.reason for e in errors}
+    assert list(failed) == [
+        "missing.txt",
+        "empty.xlsx",
+        "folder",
+        "blob.bin",
+        "broken.pptx",
+    ]
+    assert failed["missing.txt"] == "File not found"
+    assert failed["folder"] == "Not a file"
+    assert failed["empty.xlsx"] == "markitdown returned empty content"
+    assert failed["broken.pptx"] == "markitdown conversion failed: converter crashed"
+    assert all(isinstance(e, FileError) for e in errors)
+
+
+def test_pools_give_the_same_results_as_sequential_processing(
+    attachments: list[str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # A converter crash only becomes a FileError in a worker process; inline,
+    # markitdown's own errors are caught inside _convert_office
+    sequential = [p for p in attachments if not p.endswith("broken.pptx")]
+    expected = run(sequential, monkeypatch, io_workers=1, workers=1)
+
+    for io_workers, workers in [(4, 1), (1, 4), (4, 4)]:
+        assert run(sequential, monkeypatch, io_workers, workers) == expected
+
+
+def test_a_single_path_is_processed_inline(
+    attachments: list[str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    processed, errors = run(attachments[:1], monkeypatch, io_workers=4, workers=4)
+
+    assert [f.path for f in processed] == attachments[:1]
+    assert errors == []
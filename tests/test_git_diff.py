@@ -0,0 +1,170 @@
+"""Tests for --diff attachments built from a temporary git repository"""
+
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from file_handler import ProcessedFile
+from git_diff import _RANGE, diff_attachments
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git not found")
+
+LINES = [f"line {n}\n" for n in range(1, 21)]
+
+
+def git(repo: Path, *args: str) -> None:
+    subprocess.run(
+        ["git", "-c", "user.name=Test", "-c", "user.email=test@example.com"]
+        + ["-C", str(repo), *args],
+        check=True,
+        capture_output=True,
+    )
+
+
+def commit(repo: Path, files: dict[str, str | bytes | None], message: str) -> None:
+    for name, content in files.items():
+        path = repo / name
+        if content is None:
+            git(repo, "rm", "-q", name)
+            continue
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(content, bytes):
+            path.write_bytes(content)
+        else:
+            path.write_text(content, encoding="utf-8")
+        git(repo, "add", name)
+    git(repo, "commit", "-q", "-m", message)
+
+
+@pytest.fixture
+def repo(tmp_path: Path) -> Path:
+    git(tmp_path, "init", "-q")
+    commit(
+        tmp_path,
+        {
+            "app.py": "".join(LINES),
+            "old_name.py": "".join(LINES[:10]),
+            "gone.py": "print('bye')\n",
+            "big.py": "x = 1\n" * 500,
+            "data.bin": b"\x00\x01" * 50,
+            "docs/résumé.md": "# CV\n",
+        },
+        "initial",
+    )
+    changed = LINES.copy()
+    changed[1] = "line 2 changed\n"
+    changed[17] = "line 18 changed\n"
+    renamed = LINES[:10] + ["line 11 added\n"]
+    commit(
+        tmp_path,
+        {
+            "app.py": "".join(changed),
+            "old_name.py": None,
+            "new_name.py": "".join(renamed),
+            "gone.py": None,
+            "big.py": "x = 2\n" * 500,
+            "data.bin": b"\x00\x02" * 50,
+            "docs/résumé.md": "# CV\nupdated\n",
+        },
+        "change",
+    )
+    return tmp_path
+
+
+def by_label(files: list[ProcessedFile]) -> dict[str, str]:
+    return {f.path: f.content for f in files}
+
+
+def test_range_attaches_hunks_per_file(repo: Path) -> None:
+    result = diff_attachments("HEAD~1..HEAD", context_lines=1, cwd=str(repo))
+    files = by_label(result.files)
+
+    assert sorted(files) == [
+        "app.py (diff HEAD~1..HEAD)",
+        "big.py (diff HEAD~1..HEAD)",
+        "data.bin (diff HEAD~1..HEAD)",
+        "docs/résumé.md (diff HEAD~1..HEAD)",
+        "gone.py (diff HEAD~1..HEAD)",
+        "new_name.py (diff HEAD~1..HEAD)",
+    ]
+    assert result.changed == 6
+    # Two changes far apart stay two hunks with one line of context each
+    app = files["app.py (diff HEAD~1..HEAD)"]
+    assert app.count("\n@@ ") == 2
+    assert "+line 18 changed" in app and "line 10" not in app
+    # The rename is detected rather than shown as a delete and an add
+    renamed = files["new_name.py (diff HEAD~1..HEAD)"]
+    assert "rename from old_name.py" in renamed and "+line 11 added" in renamed
+    assert "-print('bye')" in files["gone.py (diff HEAD~1..HEAD)"]
+    assert result.added_lines == 2 + 1 + 500 + 1
+    assert result.removed_lines == 2 + 500 + 1
+    assert result.full_files == 0
+
+
+def test_full_files_at_head_skip_deleted_binary_and_large(repo: Path) -> None:
+    result = diff_attachments(
+        "HEAD~1..", context_lines=3, full_file_max_bytes=1000, cwd=str(repo)
+    )
+    files = by_label(result.files)
+
+    full = sorted(label for label in files if label.endswith("(at HEAD)"))
+    assert full == [
+        "app.py (at HEAD)",
+        "docs/résumé.md (at HEAD)",
+        "new_name.py (at HEAD)",
+    ]
+    assert result.full_files == 3
+    assert files["new_name.py (at HEAD)"] == "".join(LINES[:10]) + "line 11 added\n"
+    assert files["docs/résumé.md (at HEAD)"] == "# CV\nupdated\n"
+
+
+def test_single_revision_compares_with_the_working_tree(repo: Path) -> None:
+    (repo / "app.py").write_text("".join(LINES[:5]))
+
+    result = diff_attachments(
+        "HEAD", context_lines=0, full_file_max_bytes=1000, cwd=str(repo / "docs")
+    )
+    files = by_label(result.files)
+
+    assert sorted(files) == ["app.py (diff HEAD)", "app.py (working tree)"]
+    assert files["app.py (working tree)"] == "".join(LINES[:5])
+    # Line 2 changed in HEAD, lines 6-20 are gone
+    assert (result.added_lines, result.removed_lines) == (1, 16)
+
+
+def test_three_dots_compare_from_the_merge_base(repo: Path) -> None:
+    git(repo, "branch", "base")
+    git(repo, "checkout", "-q", "-b", "feature", "HEAD~1")
+    commit(repo, {"feature.py": "pass\n"}, "feature")
+
+    since_base = diff_attachments("base...feature", context_lines=3, cwd=str(repo))
+    between = diff_attachments("base..", context_lines=3, cwd=str(repo))
+
+    assert [f.path for f in since_base.files] == ["feature.py (diff base...feature)"]
+    assert len(between.files) == 7  # base's own changes show up reversed
+
+
+def test_errors(repo: Path, tmp_path_factory: pytest.TempPathFactory) -> None:
+    with pytest.raises(ValueError, match="git diff failed"):
+        diff_attachments("nosuchref..HEAD", context_lines=3, cwd=str(repo))
+    outside = tmp_path_factory.mktemp("outside")
+    with pytest.raises(ValueError, match="git rev-parse failed"):
+        diff_attachments("HEAD", context_lines=3, cwd=str(outside))
+
+
+@pytest.mark.parametrize(
+    ("spec", "base", "dots", "head"),
+    [
+        ("main..feature", "main", "..", "feature"),
+        ("main...feature", "main", "...", "feature"),
+        ("HEAD~3..", "HEAD~3", "..", ""),
+        ("..topic", "", "..", "topic"),
+    ],
+)
+def test_range_syntax(spec: str, base: str, dots: str, head: str) -> None:
+    match = _RANGE.match(spec)
+    assert match is not None
+    assert (match["base"], match["dots"], match["head"]) == (base, dots, head)
+    assert _RANGE.match("HEAD~1") is None
@@ -0,0 +1,68 @@
+"""Tests for the shared keep-alive HTTP clients"""
+
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import litellm
+import pytest
+
+import http_pool
+from http_pool import get_http_client, get_litellm_handler, use_pool_for_litellm
+
+
+@pytest.fixture(autouse=True)
+def fresh_pools(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(http_pool, "_clients", {})
+    monkeypatch.setattr(http_pool, "_handlers", {})
+    monkeypatch.setattr(litellm, "client_session", None)
+
+
+def test_one_client_per_base_url() -> None:
+    proxy = get_http_client("http://proxy:4000/")
+
+    assert get_http_client("http://proxy:4000") is proxy
+    assert get_http_client("http://other:4000") is not proxy
+    assert get_http_client() is get_http_client(None) is not proxy
+    assert get_litellm_handler("http://proxy:4000").client is proxy
+    assert get_litellm_handler("http://proxy:4000/") is get_litellm_handler(
+        "http://proxy:4000"
+    )
+
+
+def test_litellm_session_is_set_once() -> None:
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: use_pool_for_litellm(), range(32)))
+    session = litellm.client_session
+
+    assert session is not None
+    assert session is not get_http_client()
+    use_pool_for_litellm()
+    assert litellm.client_session is session
+
+
+def test_a_session_set_elsewhere_is_kept() -> None:
+    own = get_http_client("http://mine")
+    litellm.client_session = own
+
+    use_pool_for_litellm()
+
+    assert litellm.client_session is own
+
+
+def report_pools(queue: Any) -> None:
+    queue.put((len(http_pool._clients), litellm.client_session is None))
+
+
+def test_forked_children_start_without_pools() -> None:
+    get_http_client("http://proxy:4000")
+    use_pool_for_litellm()
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+
+    child = context.Process(target=report_pools, args=(queue,))
+    child.start()
+    child.join()
+
+    assert queue.get(timeout=5) == (0, True)
+    assert len(http_pool._clients) == 2  # the parent keeps its own
@@ -0,0 +1,131 @@
+"""Tests for downscaling and re-encoding image attachments"""
+
+import base64
+import dataclasses
+import io
+from pathlib import Path
+
+import pytest
+from PIL import Image, features
+
+import image_pipeline
+from conversion_cache import ConversionCache
+from file_handler import FileHandler, ProcessedFile
+from image_pipeline import (
+    ImageLimits,
+    estimate_image_tokens,
+    limits_for_models,
+    prepare_image,
+)
+
+# Shaped like OpenAI's limits, small enough to keep the tests fast
+LIMITS = ImageLimits(400, 150, 400 * 150)
+
+
+def encode(image: Image.Image, format: str, **options: object) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format, **options)
+    return buffer.getvalue()
+
+
+def noise(width: int, height: int) -> Image.Image:
+    """Detailed content that lossless formats store poorly"""
+    return Image.effect_noise((width, height), 60).convert("RGB")
+
+
+def test_large_images_are_scaled_to_the_provider_limits() -> None:
+    data = encode(noise(800, 200), "PNG")
+
+    prepared = prepare_image(data, "image/png", LIMITS)
+
+    # The long edge limit binds first: 400 / 800
+    assert (prepared.width, prepared.height) == (400, 100)
+    assert prepared.resized and prepared.mime_type == "image/webp"
+    assert Image.open(io.BytesIO(prepared.data)).size == (400, 100)
+
+    # A square image is bound by its short edge
+    square = prepare_image(encode(noise(300, 300), "PNG"), "image/png", LIMITS)
+    assert (square.width, square.height) == (150, 150)
+
+
+def test_exif_orientation_is_applied() -> None:
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotate 90 degrees clockwise to display
+    data = encode(noise(150, 100), "JPEG", quality=100, exif=exif)
+
+    prepared = prepare_image(data, "image/jpeg", LIMITS)
+
+    assert (prepared.width, prepared.height) == (100, 150)
+    assert not prepared.resized and len(prepared.data) < len(data)
+
+
+def test_transparency_survives_re_encoding() -> None:
+    image = noise(100, 100).convert("RGBA")
+    image.putpixel((0, 0), (0, 0, 0, 0))
+
+    prepared = prepare_image(encode(image, "PNG"), "image/png", LIMITS)
+
+    decoded = Image.open(io.BytesIO(prepared.data))
+    assert decoded.mode == "RGBA" and decoded.getpixel((0, 0))[3] == 0
+
+
+def test_without_webp_support_jpeg_and_png_are_used(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(features, "check", lambda feature: False)
+    opaque = encode(noise(600, 600), "PNG")
+    transparent = encode(noise(600, 600).convert("RGBA"), "PNG")
+
+    assert prepare_image(opaque, "image/png", LIMITS).mime_type == "image/jpeg"
+    assert prepare_image(transparent, "image/png", LIMITS).mime_type == "image/png"
+
+
+def test_animated_images_are_sent_unchanged() -> None:
+    frames = [Image.new("RGB", (600, 600), color) for color in ["red", "blue"]]
+    data = encode(frames[0], "GIF", save_all=True, append_images=frames[1:])
+
+    prepared = prepare_image(data, "image/gif", LIMITS)
+
+    assert (prepared.data, prepared.mime_type) == (data, "image/gif")
+    assert (prepared.width, prepared.height) == (600, 600)
+    assert not prepared.resized
+
+
+def test_unreadable_images_and_missing_pillow_keep_the_original(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    broken = prepare_image(b"not an image", "image/png", LIMITS)
+    assert (broken.data, broken.width, broken.height) == (b"not an image", 0, 0)
+
+    data = encode(noise(800, 200), "PNG")
+    monkeypatch.setattr(image_pipeline, "pillow_available", lambda: False)
+    assert prepare_image(data, "image/png", LIMITS).data == data
+
+
+def test_limits_serve_every_model() -> None:
+    limits = limits_for_models(["gpt-5.2", "claude-sonnet-4-5"])
+
+    assert limits.max_edge == 2048 and limits.max_short_edge == 1568
+    assert limits_for_models([]) == limits_for_models(["gemini-3-pro"])
+    # Unknown sizes are costed as the largest image the provider uses
+    assert estimate_image_tokens(0, 0, "gpt-5.2") == 85 + 170 * 2 * 2  # 768x768
+
+
+def test_processed_images_only_keep_the_data_url(tmp_path: Path) -> None:
+    path = tmp_path / "shot.png"
+    noise(800, 200).save(path)
+    handler = FileHandler(cache=ConversionCache(tmp_path / "cache"))
+
+    first = handler._process_image(path)
+    cached = handler._process_image(path)
+
+    assert "base64_data" not in {f.name for f in dataclasses.fields(ProcessedFile)}
+    assert isinstance(first, ProcessedFile) and first == cached
+    header, encoded = first.data_url.split(",", 1)
+    assert header == f"data:{first.mime_type};base64"
+    assert Image.open(io.BytesIO(base64.b64decode(encoded))).size == (
+        first.width,
+        first.height,
+    )
+    assert first.source_bytes == path.stat().st_size
+    assert handler.cache is not None and handler.cache.hits == 1
@@ -0,0 +1,28 @@
+"""Tests for the lifetime of the shared background job poller"""
+
+import subprocess
+import sys
+
+from tests.conftest import SCRIPTS_DIR
+
+# Starts a poller, then dies without closing it, as a killed CLI would
+ORPHANING_PARENT = """
+import os, sys
+sys.path.insert(0, {scripts_dir!r})
+from job_poller import JobPoller
+JobPoller(lambda job, result, error: None).start()
+os._exit(0)
+"""
+
+
+def test_poller_exits_when_its_parent_dies() -> None:
+    # The poller inherits stdout, so the run only ends once the poller has
+    # exited too (a poller waiting forever times the run out)
+    proc = subprocess.run(
+        [sys.executable, "-c", ORPHANING_PARENT.format(scripts_dir=str(SCRIPTS_DIR))],
+        capture_output=True,
+        text=True,
+        timeout=30,
+    )
+
+    assert proc.returncode == 0, proc.stderr
@@ -0,0 +1,177 @@
+"""Tests for directory/glob expansion and its .gitignore handling"""
+
+import os
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from path_expander import (
+    BINARY,
+    EMPTY,
+    EXCLUDED,
+    IGNORED,
+    _git_ignored,
+    _GitIgnore,
+    expand_paths,
+)
+
+needs_git = pytest.mark.skipif(shutil.which("git") is None, reason="git not found")
+
+
+def write(path: Path, text: str = "content\n") -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path
+
+
+def git(repo: Path, *args: str) -> None:
+    subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True)
+
+
+def make_repo(root: Path) -> Path:
+    git(root, "init", "-q")
+    write(root / ".gitignore", "*.log\nbuild/\n/top.txt\n")
+    write(root / "src" / "app.py")
+    write(root / "src" / "debug.log")
+    write(root / "src" / "top.txt")
+    write(root / "build" / "out.py")
+    write(root / "top.txt")
+    write(root / "data.bin").write_bytes(b"\x00\x01\x02" * 100)
+    write(root / "empty.py", "")
+    return root
+
+
+def relative(paths: list[str], root: Path) -> list[str]:
+    return [Path(os.path.relpath(p, root)).as_posix() for p in paths]
+
+
+def test_matcher_wildcards_anchoring_and_negation(tmp_path: Path) -> None:
+    write(
+        tmp_path / ".gitignore",
+        "# comment\n*.log\n!keep.log\n/root.txt\ndocs/**/*.tmp\ncache/\n"
+        "data[0-9].csv\nfile?.md\n\\#hash\n",
+    )
+    write(tmp_path / "sub" / ".gitignore", "local.txt\n!data1.csv\n")
+    ignore = _GitIgnore(str(tmp_path))
+
+    def ignored(rel: str, is_dir: bool = False) -> bool:
+        return ignore.ignored(str(tmp_path / rel), is_dir, check_parents=True)
+
+    assert ignored("a.log") and ignored("deep/er/b.log")
+    assert not ignored("keep.log")
+    assert ignored("root.txt") and not ignored("sub/root.txt")
+    assert ignored("docs/x.tmp") and ignored("docs/a/b/x.tmp")
+    assert not ignored("other/docs/x.tmp")
+    assert ignored("cache", is_dir=True) and not ignored("cache")
+    assert ignored("cache/inside.py")  # below an ignored directory
+    assert ignored("data3.csv") and not ignored("dataX.csv")
+    assert ignored("file1.md") and not ignored("file10.md")
+    assert ignored("#hash")
+    assert ignored("sub/local.txt") and not ignored("local.txt")
+    assert ignored("data1.csv") and not ignored("sub/data1.csv")
+    outside = str(tmp_path.parent / "outside.log")
+    assert not ignore.ignored(outside, is_dir=False, check_parents=True)
+
+
+def test_expand_outside_git_uses_gitignore_files(tmp_path: Path) -> None:
+    write(tmp_path / ".gitignore", "*.log\nbuild/\n")
+    write(tmp_path / "a.py")
+    write(tmp_path / "b.log")
+    write(tmp_path / "build" / "c.py")
+    write(tmp_path / "sub" / "d.py")
+
+    expansion = expand_paths([str(tmp_path)])
+
+    assert relative(expansion.paths, tmp_path) == [".gitignore", "a.py", "sub/d.py"]
+    assert expansion.skipped[IGNORED] == 2
+    assert expansion.expanded_args == 1
+
+
+@needs_git
+def test_expand_in_git_repo_skips_ignored_files(tmp_path: Path) -> None:
+    repo = make_repo(tmp_path)
+
+    expansion = expand_paths([str(repo)])
+
+    assert relative(expansion.paths, repo) == [
+        ".gitignore",
+        "src/app.py",
+        "src/top.txt",
+    ]
+    assert expansion.skipped[IGNORED] == 3  # debug.log, build/, top.txt
+    assert expansion.skipped[BINARY] == 1
+    assert expansion.skipped[EMPTY] == 1
+
+
+@needs_git
+def test_tracked_files_are_kept_even_when_a_pattern_matches(tmp_path: Path) -> None:
+    repo = make_repo(tmp_path)
+    write(repo / "tracked.log")
+    git(repo, "add", "-f", "tracked.log")
+
+    expansion = expand_paths([str(repo)])
+
+    assert "tracked.log" in relative(expansion.paths, repo)
+    assert "src/debug.log" not in relative(expansion.paths, repo)
+
+
+@needs_git
+def test_git_rules_outside_gitignore_files_apply(tmp_path: Path) -> None:
+    repo = make_repo(tmp_path)
+    write(repo / ".git" / "info" / "exclude", "*.py\n")
+
+    expansion = expand_paths([str(repo / "src")])
+
+    assert relative(expansion.paths, repo) == ["src/top.txt"]
+
+
+@needs_git
+def test_glob_skips_files_below_ignored_directories(tmp_path: Path) -> None:
+    repo = make_repo(tmp_path)
+
+    expansion = expand_paths([str(repo / "**" / "*.py")])
+
+    assert relative(expansion.paths, repo) == ["src/app.py"]
+    assert expansion.skipped[IGNORED] == 1
+    assert expansion.skipped[EMPTY] == 1
+
+
+@needs_git
+def test_include_and_exclude_patterns(tmp_path: Path) -> None:
+    repo = make_repo(tmp_path)
+    write(repo / "src" / "test_app.py")
+
+    included = expand_paths([str(repo)], include=["*.py"])
+    excluded = expand_paths([str(repo)], include=["src/*"], exclude=["test_*"])
+
+    assert relative(included.paths, repo) == ["src/app.py", "src/test_app.py"]
+    assert relative(excluded.paths, repo) == ["src/app.py", "src/top.txt"]
+    assert excluded.skipped[EXCLUDED] == 4
+
+
+@needs_git
+def test_explicitly_named_ignored_directory_is_walked(tmp_path: Path) -> None:
+    repo = make_repo(tmp_path)
+
+    assert _git_ignored(str(repo / "build")) is None
+    expansion = expand_paths([str(repo / "build")])
+
+    assert relative(expansion.paths, repo) == ["build/out.py"]
+
+
+def test_files_and_missing_paths_are_kept_as_given(tmp_path: Path) -> None:
+    log = write(tmp_path / "x.log")
+    write(tmp_path / ".gitignore", "*.log\n")
+    missing = str(tmp_path / "missing.py")
+
+    expansion = expand_paths([str(log), missing, str(log)])
+
+    assert expansion.paths == [str(log), missing]
+    assert expansion.expanded_args == 0
+
+
+def test_glob_matching_nothing_raises(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="No files match"):
+        expand_paths([str(tmp_path / "*.nothing")])
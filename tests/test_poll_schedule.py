@@ -0,0 +1,46 @@
+"""Tests for spacing background job polls by past completion times"""
+
+import pytest
+
+import config
+from poll_schedule import PollSchedule
+
+
+@pytest.fixture(autouse=True)
+def poll_config(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config, "POLL_MIN_INTERVAL", 1)
+    monkeypatch.setattr(config, "POLL_MAX_INTERVAL", 60)
+    monkeypatch.setattr(config, "POLL_INTERVAL", 20)
+    monkeypatch.setattr(config, "POLL_BACKOFF", 2)
+    monkeypatch.setattr(config, "POLL_FINISH_PROBABILITY", 0.05)
+    monkeypatch.setattr(config, "POLL_HISTORY_MIN_SAMPLES", 5)
+
+
+def test_next_poll_comes_before_the_early_finishers() -> None:
+    schedule = PollSchedule(range(10, 210, 10))  # 20 jobs, 10s to 200s
+
+    # One in twenty may finish between polls: wait for the second-fastest
+    assert schedule.next_delay(0) == 20
+    # Of the ten still running at 100s, none may: wait for the fastest
+    assert schedule.next_delay(100) == 10
+    assert schedule.next_delay(105) == 5
+
+
+def test_delays_are_clamped() -> None:
+    assert PollSchedule([600] * 10).next_delay(0) == 60
+    assert PollSchedule([30.2] * 10).next_delay(30) == 1
+
+
+def test_without_enough_history_the_delay_backs_off() -> None:
+    schedule = PollSchedule([0, -5, 40, 50, 60])  # non-positive times are dropped
+
+    assert [schedule.next_delay(0) for _ in range(7)] == [1, 2, 4, 8, 16, 20, 20]
+
+
+def test_outlasting_the_history_falls_back_to_backing_off() -> None:
+    schedule = PollSchedule(range(10, 110, 10))
+
+    assert schedule.next_delay(0) == 10
+    assert [schedule.next_delay(95) for _ in range(3)] == [1, 2, 4]
+    assert schedule.next_delay(0) == 10  # history applies again; back-off resets
+    assert schedule.next_delay(95) == 1
@@ -0,0 +1,150 @@
+"""Tests for the shared token-bucket rate limiter"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+import config
+import rate_limiter
+from rate_limiter import RateLimit, RateLimiter, load_rate_limits, rate_limit_for
+from retry_policy import DeadlineExceededError
+
+
+class Clock:
+    """Stands in for time.time and time.sleep; sleeping advances the clock"""
+
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+        self.slept: list[float] = []
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    fake = Clock()
+    monkeypatch.setattr(rate_limiter.time, "time", fake.time)
+    monkeypatch.setattr(rate_limiter.time, "sleep", fake.sleep)
+    monkeypatch.setattr(config, "RATE_LIMIT_HEADROOM", 1.0)
+    return fake
+
+
+def limiter(
+    tmp_path: Path, rpm: float | None = None, tpm: float | None = None, key: str = "k"
+) -> RateLimiter:
+    return RateLimiter(
+        "gpt-5.2-pro",
+        RateLimit(rpm=rpm, tpm=tpm),
+        api_key=key,
+        db_path=tmp_path / "rate_limits.db",
+    )
+
+
+def test_requests_wait_for_the_bucket_to_refill(tmp_path: Path, clock: Clock) -> None:
+    bucket = limiter(tmp_path, rpm=2)
+
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    # Empty: one request comes back every 60 / rpm seconds
+    assert bucket.acquire() == pytest.approx(30)
+    clock.now += 15
+    assert bucket.acquire() == pytest.approx(15)
+
+
+def test_tokens_wait_for_their_shortfall(tmp_path: Path, clock: Clock) -> None:
+    bucket = limiter(tmp_path, tpm=600)
+
+    assert bucket.acquire(400) == 0
+    assert bucket.acquire(400) == pytest.approx(20)  # 200 tokens at 10/s
+    # Larger than the whole budget: waits for a full bucket, not forever
+    assert bucket.acquire(10_000) == pytest.approx(60)
+
+
+def test_refill_is_capped_at_capacity(tmp_path: Path, clock: Clock) -> None:
+    bucket = limiter(tmp_path, rpm=60, tpm=600)
+    bucket.acquire(600)
+    clock.now += 3600
+
+    assert bucket.acquire(600) == 0
+    assert bucket.acquire(60) == pytest.approx(6)
+
+
+def test_settle_refunds_and_charges_actual_usage(tmp_path: Path, clock: Clock) -> None:
+    bucket = limiter(tmp_path, tpm=600)
+
+    bucket.acquire(400)
+    bucket.settle(400, {"total_tokens": 100})  # 300 refunded, 500 left
+    assert bucket.acquire(500) == 0
+
+    clock.now += 60
+    bucket.acquire(100)
+    bucket.settle(100, {"input_tokens": 250, "output_tokens": 150})
+    # 600 - 400 used leaves 200; 300 more take 30s
+    assert bucket.acquire(500) == pytest.approx(30)
+
+
+def test_settle_without_usage_or_token_budget_is_a_no_op(
+    tmp_path: Path, clock: Clock
+) -> None:
+    bucket = limiter(tmp_path, tpm=600)
+    bucket.acquire(600)
+    bucket.settle(600, None)
+    bucket.settle(600, {})
+    assert bucket.acquire(60) == pytest.approx(6)
+
+    requests_only = limiter(tmp_path, rpm=1, key="other")
+    requests_only.settle(0, {"total_tokens": 10**6})
+    assert requests_only.acquire(10**6) == 0
+
+
+def test_pause_blocks_other_callers(tmp_path: Path, clock: Clock) -> None:
+    first = limiter(tmp_path, rpm=100)
+    second = limiter(tmp_path, rpm=100)  # another process, same model and key
+    other_key = limiter(tmp_path, rpm=100, key="someone-else")
+
+    first.pause(15)
+
+    assert second.acquire() == pytest.approx(15)
+    assert other_key.acquire() == 0
+    # A shorter pause never cuts an existing one short
+    first.pause(20)
+    first.pause(5)
+    assert second.acquire() == pytest.approx(20)
+
+
+def test_acquire_refuses_waits_past_the_deadline(tmp_path: Path, clock: Clock) -> None:
+    bucket = limiter(tmp_path, rpm=1)
+    bucket.acquire()
+
+    with pytest.raises(DeadlineExceededError):
+        bucket.acquire(deadline=clock.now + 30)
+    assert clock.slept == []
+    assert bucket.acquire(deadline=clock.now + 61) == pytest.approx(60)
+
+
+def test_rate_limits_file(tmp_path: Path) -> None:
+    path = tmp_path / "rate_limits.json"
+    path.write_text(
+        json.dumps({"openai/*": {"rpm": 50}, "openai/gpt-5*": {"tpm": 40000}})
+    )
+
+    limits = load_rate_limits(path)
+
+    assert limits == {
+        "openai/*": RateLimit(rpm=50),
+        "openai/gpt-5*": RateLimit(tpm=40000),
+    }
+    assert rate_limit_for("openai/gpt-5.2-pro", limits) == RateLimit(tpm=40000)
+    assert rate_limit_for("openai/o3", limits) == RateLimit(rpm=50)
+    assert rate_limit_for("anthropic/claude", limits) is None
+    assert load_rate_limits(tmp_path / "missing.json") == {}
+
+    path.write_text("[1, 2]")
+    with pytest.raises(ValueError, match="Invalid rate limits"):
+        load_rate_limits(path)
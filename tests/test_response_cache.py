@@ -0,0 +1,95 @@
+"""Tests for the exact-match cache of complete responses"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+import response_cache
+from response_cache import ResponseCache
+
+
+def write_request(input_dir: Path, prompt: str = "Review") -> Path:
+    """A session's input: the prompt, its images and map-reduce shards"""
+    (input_dir / "shards" / "01").mkdir(parents=True)
+    (input_dir / "prompt.txt").write_text(prompt)
+    (input_dir / "images.json").write_text(json.dumps([{"url": "data:a"}]))
+    (input_dir / "shards" / "01" / "prompt.txt").write_text("shard 1")
+    (input_dir / "shards" / "01" / "files.json").write_text('["a.py"]')
+    (input_dir / "output.txt").write_text("not part of the request")
+    return input_dir
+
+
+def key(
+    input_dir: Path,
+    model: str = "gpt-5.2-pro",
+    base_url: str | None = None,
+    reasoning_effort: str = "xhigh",
+) -> str:
+    return ResponseCache.key_for(input_dir, model, base_url, reasoning_effort)
+
+
+def test_key_covers_every_input_file(tmp_path: Path) -> None:
+    input_dir = write_request(tmp_path / "session")
+    original = key(input_dir)
+
+    (input_dir / "output.txt").write_text("a different answer")
+    assert key(input_dir) == original
+
+    for path, content in [
+        ("prompt.txt", "Review again"),
+        ("images.json", json.dumps([{"url": "data:b"}])),
+        ("shards/01/prompt.txt", "shard 1, edited"),
+        ("shards/01/files.json", '["b.py"]'),
+    ]:
+        before = (input_dir / path).read_text()
+        (input_dir / path).write_text(content)
+        assert key(input_dir) != original, path
+        (input_dir / path).write_text(before)
+
+    assert key(input_dir) == original
+    # The same content in another session directory is the same request
+    assert key(write_request(tmp_path / "other")) == original
+
+
+@pytest.mark.parametrize(
+    "override",
+    [
+        {"model": "gpt-5.2"},
+        {"base_url": "http://proxy:4000"},
+        {"reasoning_effort": "low"},
+    ],
+)
+def test_key_covers_model_endpoint_and_effort(
+    tmp_path: Path, override: dict[str, str]
+) -> None:
+    input_dir = write_request(tmp_path / "session")
+
+    assert key(input_dir, **override) != key(input_dir)
+
+
+def test_entries_expire_when_read(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    now = [1_000_000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    cache = ResponseCache(tmp_path, ttl=60)
+    cache.put("a" * 64, "review-1", {"content": "answer", "usage": {"total": 3}})
+
+    now[0] += 60
+    cached = cache.get("a" * 64)
+    assert cached is not None
+    assert cached["content"] == "answer" and cached["session_id"] == "review-1"
+
+    now[0] += 1
+    assert cache.get("a" * 64) is None
+    assert not (tmp_path / "aa" / f"{'a' * 64}.json").exists()
+
+
+def test_unreadable_entries_are_misses(tmp_path: Path) -> None:
+    cache = ResponseCache(tmp_path)
+    (tmp_path / "bb").mkdir()
+    (tmp_path / "bb" / f"{'b' * 64}.json").write_text("{truncated")
+
+    assert cache.get("b" * 64) is None
+    assert cache.get("c" * 64) is None
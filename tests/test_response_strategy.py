@@ -0,0 +1,199 @@
+"""Tests for how background jobs are started, retried and polled"""
+
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+import response_strategy
+from response_strategy import BackgroundJobStrategy, SyncRetryStrategy
+from retry_policy import RetryPolicy
+
+
+class ProviderError(Exception):
+    def __init__(self, message: str, status_code: int, retry_after: str = "") -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.headers = {"retry-after": retry_after} if retry_after else {}
+
+
+class Limiter:
+    """Records the rate limiter calls a policy makes"""
+
+    def __init__(self) -> None:
+        self.acquired = 0
+        self.paused: list[float] = []
+
+    def acquire(self, tokens: int = 0, deadline: float | None = None) -> float:
+        self.acquired += 1
+        return 0.0
+
+    def pause(self, seconds: float) -> None:
+        self.paused.append(seconds)
+
+
+class Provider:
+    """Stands in for litellm.responses, failing with the queued errors"""
+
+    def __init__(self, *errors: Exception) -> None:
+        self.errors = list(errors)
+        self.calls: list[dict[str, Any]] = []
+
+    def __call__(self, **kwargs: Any) -> Any:
+        self.calls.append(kwargs)
+        if self.errors:
+            raise self.errors.pop(0)
+        return SimpleNamespace(id="resp_123")
+
+
+@pytest.fixture
+def sleeps(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    slept: list[float] = []
+    monkeypatch.setattr(response_strategy.time, "sleep", slept.append)
+    return slept
+
+
+def execute(
+    monkeypatch: pytest.MonkeyPatch, provider: Provider, policy: RetryPolicy
+) -> dict[str, Any]:
+    strategy = BackgroundJobStrategy()
+    monkeypatch.setattr(response_strategy, "responses", provider)
+    monkeypatch.setattr(
+        strategy,
+        "_poll_for_completion",
+        lambda response_id, *args, **kwargs: {"content": f"polled {response_id}"},
+    )
+    return strategy.execute("openai/gpt-5.2-pro", "Review", retry_policy=policy)
+
+
+def test_errors_that_are_not_retried_are_sent_once(
+    monkeypatch: pytest.MonkeyPatch, sleeps: list[float]
+) -> None:
+    provider = Provider(ProviderError("Invalid API key", 401))
+
+    with pytest.raises(RuntimeError, match="Invalid API key"):
+        execute(monkeypatch, provider, RetryPolicy())
+
+    assert len(provider.calls) == 1
+    assert sleeps == []
+
+
+def test_rate_limited_starts_back_off_and_pause_the_limiter(
+    monkeypatch: pytest.MonkeyPatch, sleeps: list[float]
+) -> None:
+    limiter = Limiter()
+    provider = Provider(
+        ProviderError("Rate limit reached", 429, retry_after="7"),
+        ProviderError("Invalid request", 400),
+    )
+    policy = RetryPolicy(rate_limiter=limiter)  # type: ignore[arg-type]
+
+    with pytest.raises(RuntimeError, match="Invalid request"):
+        execute(monkeypatch, provider, policy)
+
+    assert len(provider.calls) == 2
+    assert all(call["stream"] for call in provider.calls)
+    assert sleeps == [7.0]
+    assert limiter.paused == [7.0]
+    assert limiter.acquired == 2
+
+
+def test_retries_stop_after_max_retries(
+    monkeypatch: pytest.MonkeyPatch, sleeps: list[float]
+) -> None:
+    provider = Provider(*[ProviderError("Overloaded", 503)] * 5)
+
+    with pytest.raises(RuntimeError, match="Overloaded"):
+        execute(monkeypatch, provider, RetryPolicy(max_retries=2))
+
+    assert len(provider.calls) == 3
+    assert len(sleeps) == 2
+
+
+def test_unsupported_stream_falls_back_to_polling(
+    monkeypatch: pytest.MonkeyPatch, sleeps: list[float]
+) -> None:
+    provider = Provider(
+        ProviderError("stream is not supported with background mode", 400)
+    )
+
+    result = execute(monkeypatch, provider, RetryPolicy())
+
+    assert result == {"content": "polled resp_123"}
+    assert [call.get("stream", False) for call in provider.calls] == [True, False]
+    assert sleeps == []
+
+
+def event(kind: str, **fields: Any) -> SimpleNamespace:
+    return SimpleNamespace(type=kind, **fields)
+
+
+def test_streamed_deltas_are_forwarded_as_they_arrive(
+    monkeypatch: pytest.MonkeyPatch, sleeps: list[float]
+) -> None:
+    final = SimpleNamespace(id="resp_1", output=[], usage=None)
+    events = [
+        event("response.created", response=final),
+        event("response.output_text.delta", delta="Hel"),
+        event("response.output_text.delta", delta=""),
+        event("response.output_text.delta", delta="lo"),
+        event("response.completed", response=final),
+    ]
+    calls: list[dict[str, Any]] = []
+
+    def stream(**kwargs: Any) -> Any:
+        calls.append(kwargs)
+        return iter(events)
+
+    monkeypatch.setattr(response_strategy, "responses", stream)
+    deltas: list[str] = []
+
+    result = SyncRetryStrategy().execute("gpt-4o", "Review", on_delta=deltas.append)
+
+    assert deltas == ["Hel", "lo"]
+    assert result["content"] == "Hello"
+    assert calls[0]["stream"] is True
+
+
+def test_a_stream_that_fails_after_output_is_not_retried(
+    monkeypatch: pytest.MonkeyPatch, sleeps: list[float]
+) -> None:
+    calls: list[dict[str, Any]] = []
+
+    def stream(**kwargs: Any) -> Any:
+        calls.append(kwargs)
+        yield event("response.output_text.delta", delta="partial")
+        raise ProviderError("Connection reset", 503)
+
+    monkeypatch.setattr(response_strategy, "responses", stream)
+    deltas: list[str] = []
+
+    with pytest.raises(ProviderError, match="Connection reset"):
+        SyncRetryStrategy().execute("gpt-4o", "Review", on_delta=deltas.append)
+
+    assert deltas == ["partial"]  # never sent twice
+    assert len(calls) == 1 and sleeps == []
+
+
+def test_a_stream_that_fails_before_output_is_retried(
+    monkeypatch: pytest.MonkeyPatch, sleeps: list[float]
+) -> None:
+    provider = Provider(ProviderError("Overloaded", 503, retry_after="2"))
+    final = SimpleNamespace(id="resp_1", output=[], usage=None)
+
+    def stream(**kwargs: Any) -> Any:
+        provider(**kwargs)
+        return iter(
+            [
+                event("response.output_text.delta", delta="answer"),
+                event("response.completed", response=final),
+            ]
+        )
+
+    monkeypatch.setattr(response_strategy, "responses", stream)
+    deltas: list[str] = []
+
+    result = SyncRetryStrategy().execute("gpt-4o", "Review", on_delta=deltas.append)
+
+    assert result["content"] == "answer" and deltas == ["answer"]
+    assert len(provider.calls) == 2 and sleeps == [2.0]
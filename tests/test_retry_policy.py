@@ -0,0 +1,130 @@
+"""Tests for retry classification, Retry-After parsing and deadline refusal"""
+
+import time
+from email.utils import formatdate
+from typing import Any
+
+import pytest
+
+import config
+from retry_policy import (
+    DeadlineExceededError,
+    RetryPolicy,
+    is_retryable,
+    retry_after,
+)
+
+
+class Response:
+    def __init__(self, headers: dict[str, str]) -> None:
+        self.headers = headers
+
+
+class StatusError(Exception):
+    def __init__(
+        self, status_code: int | None = None, headers: dict[str, str] | None = None
+    ) -> None:
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.response: Response | None = None
+
+
+@pytest.mark.parametrize(
+    ("status_code", "expected"),
+    [(408, True), (409, True), (429, True), (500, True), (503, True)]
+    + [(400, False), (401, False), (404, False), (422, False)],
+)
+def test_status_codes(status_code: int, expected: bool) -> None:
+    assert is_retryable(StatusError(status_code)) is expected
+
+
+def test_errors_without_status_are_classified_by_message() -> None:
+    assert is_retryable(ConnectionError("connection reset by peer"))
+    assert is_retryable(Exception("Rate limit reached, try again"))
+    assert not is_retryable(Exception("Invalid API key"))
+    assert not is_retryable(Exception("context window exceeded: timeout"))
+    assert not is_retryable(Exception("something odd"))
+
+
+def test_retry_after_milliseconds() -> None:
+    error = StatusError(429, {"Retry-After-Ms": "1500", "Retry-After": "9"})
+    assert retry_after(error) == 1.5
+
+
+def test_retry_after_seconds() -> None:
+    assert retry_after(StatusError(429, {"retry-after": "7"})) == 7.0
+    assert retry_after(StatusError(429, {"retry-after": "-3"})) == 0.0
+
+
+def test_retry_after_http_date() -> None:
+    when = formatdate(time.time() + 30, usegmt=True)
+    hint = retry_after(StatusError(503, {"Retry-After": when}))
+    assert hint is not None and 27 <= hint <= 30
+
+    past = formatdate(time.time() - 30, usegmt=True)
+    assert retry_after(StatusError(503, {"Retry-After": past})) == 0.0
+
+
+def test_retry_after_from_response_headers() -> None:
+    error = StatusError(429)
+    error.response = Response({"retry-after": "4"})
+    assert retry_after(error) == 4.0
+
+
+def test_retry_after_without_usable_hint() -> None:
+    assert retry_after(StatusError(429)) is None
+    assert retry_after(StatusError(429, {"Retry-After": "soon"})) is None
+    assert retry_after(Exception("no headers")) is None
+
+
+def test_next_delay_backs_off_exponentially() -> None:
+    policy = RetryPolicy(max_retries=5)
+    error = StatusError(500)
+    for attempt in range(3):
+        delay = policy.next_delay(error, attempt)
+        base = config.INITIAL_RETRY_DELAY * 2**attempt
+        assert delay is not None and base <= delay <= base * 1.1
+
+
+def test_next_delay_follows_retry_after() -> None:
+    policy = RetryPolicy()
+    assert policy.next_delay(StatusError(429, {"retry-after": "12"}), 0) == 12.0
+
+    too_long = str(config.MAX_RETRY_AFTER + 1)
+    assert policy.next_delay(StatusError(429, {"retry-after": too_long}), 0) is None
+
+
+def test_next_delay_stops_after_max_retries_and_on_fatal_errors() -> None:
+    policy = RetryPolicy(max_retries=2)
+    assert policy.next_delay(StatusError(500), 2) is None
+    assert policy.next_delay(StatusError(401), 0) is None
+
+
+def test_next_delay_refuses_retries_past_the_deadline() -> None:
+    policy = RetryPolicy(deadline=time.time() + 10, expected_seconds=5)
+    assert policy.next_delay(StatusError(429, {"retry-after": "1"}), 0) == 1.0
+    with pytest.raises(DeadlineExceededError, match="No time left"):
+        policy.next_delay(StatusError(429, {"retry-after": "6"}), 0)
+    # Errors that are never retried do not count against the deadline
+    assert policy.next_delay(StatusError(400), 0) is None
+
+
+def test_run_retries_then_gives_up_at_the_deadline(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(time, "sleep", lambda seconds: None)
+    calls: list[dict[str, Any]] = []
+
+    def attempt(options: dict[str, Any]) -> str:
+        calls.append(options)
+        if len(calls) < 3:
+            raise StatusError(503, {"retry-after": "0"})
+        return "ok"
+
+    assert RetryPolicy(deadline=time.time() + 60).run(attempt) == "ok"
+    assert len(calls) == 3
+    assert all(c["num_retries"] == 0 and 0 < c["timeout"] <= 60 for c in calls)
+
+    with pytest.raises(DeadlineExceededError):
+        RetryPolicy(deadline=time.time() - 1).run(attempt)
@@ -0,0 +1,155 @@
+"""Tests for the SQLite index of session metadata"""
+
+import json
+import os
+import shutil
+import sqlite3
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from session_index import SessionIndex
+from session_manager import SessionManager
+
+
+def write_session(sessions_dir: Path, session_id: str, **fields: Any) -> Path:
+    session_dir = sessions_dir / session_id
+    session_dir.mkdir()
+    metadata = {
+        "id": session_id,
+        "slug": session_id.rsplit("-", 1)[0],
+        "created_at": "2026-01-01T00:00:00",
+        "status": "completed",
+        "model": "gpt-5.2-pro",
+        **fields,
+    }
+    (session_dir / "metadata.json").write_text(json.dumps(metadata))
+    return session_dir
+
+
+def ids(sessions: list[dict[str, Any]]) -> list[str]:
+    return [s["id"] for s in sessions]
+
+
+def test_a_new_index_is_built_from_the_session_directories(tmp_path: Path) -> None:
+    write_session(tmp_path, "review-1")
+    write_session(tmp_path, "audit-1", created_at="2026-02-01T00:00:00")
+    (tmp_path / "broken-1").mkdir()
+    (tmp_path / "broken-1" / "metadata.json").write_text("{not json")
+    (tmp_path / "empty-1").mkdir()
+    (tmp_path / "notes.txt").write_text("not a session")
+
+    index = SessionIndex(tmp_path)
+
+    assert ids(index.query()[0]) == ["audit-1", "review-1"]
+    assert index.latest_id("review") == "review-1"
+    assert index.latest_id("rev") is None
+
+
+def test_query_filters_and_pages_newest_first(tmp_path: Path) -> None:
+    index = SessionIndex(tmp_path)
+    for day, status, model in [
+        (1, "completed", "gpt-5.2-pro"),
+        (2, "error", "gpt-5.2-pro"),
+        (3, "completed", "claude-opus-4-5"),
+        (4, "completed", "gpt-5.2-pro"),
+        (5, "running", "gpt-5.2-pro"),
+    ]:
+        metadata = {
+            "id": f"review-{day}",
+            "slug": "review",
+            "created_at": f"2026-01-0{day}T00:00:00",
+            "status": status,
+            "model": model,
+        }
+        index.upsert(metadata)
+
+    assert ids(index.query()[0]) == [f"review-{d}" for d in [5, 4, 3, 2, 1]]
+    assert ids(index.query(status="completed")[0]) == [
+        "review-4",
+        "review-3",
+        "review-1",
+    ]
+    sessions, total = index.query(model="gpt-5.2-pro", limit=2, offset=1)
+    assert (ids(sessions), total) == (["review-4", "review-2"], 4)
+    sessions, total = index.query(status="completed", since="2026-01-03")
+    assert (ids(sessions), total) == (["review-4", "review-3"], 2)
+
+
+def test_job_durations_of_similar_completed_sessions(tmp_path: Path) -> None:
+    index = SessionIndex(tmp_path)
+    for n, fields in enumerate(
+        [
+            {"job_seconds": 100},
+            {"job_seconds": 200},
+            {"job_seconds": 300, "status": "error"},
+            {"job_seconds": 400, "reasoning_effort": "low"},
+            {"job_seconds": 500, "model": "claude-opus-4-5"},
+            {},  # no background job
+            {"job_seconds": 700},
+        ]
+    ):
+        index.upsert(
+            {
+                "id": f"review-{n}",
+                "slug": "review",
+                "created_at": f"2026-01-0{n + 1}T00:00:00",
+                "status": "completed",
+                "model": "gpt-5.2-pro",
+                "reasoning_effort": "xhigh",
+                **fields,
+            }
+        )
+
+    assert index.job_durations("gpt-5.2-pro", "xhigh", 10) == [700.0, 200.0, 100.0]
+    assert index.job_durations("gpt-5.2-pro", "xhigh", 2) == [700.0, 200.0]
+    assert index.job_durations("gpt-5.2-pro", "low", 10) == [400.0]
+
+
+def test_rebuild_matches_the_directories_again(tmp_path: Path) -> None:
+    write_session(tmp_path, "review-1")
+    index = SessionIndex(tmp_path)
+    shutil.rmtree(tmp_path / "review-1")
+    write_session(tmp_path, "review-2", status="error")
+
+    index.rebuild()
+
+    assert ids(index.query()[0]) == ["review-2"]
+    assert index.query(status="error")[1] == 1
+
+
+def test_sessions_deleted_by_hand_are_forgotten(tmp_path: Path) -> None:
+    write_session(tmp_path, "review-1")
+    write_session(tmp_path, "review-2", created_at="2026-01-02T00:00:00")
+    manager = SessionManager(tmp_path)
+    shutil.rmtree(tmp_path / "review-2")
+
+    assert manager._find_session_dir("review") == tmp_path / "review-1"
+    assert manager._find_session_dir("review-1") == tmp_path / "review-1"
+    assert manager.index.latest_id("review") == "review-1"
+
+
+def test_without_the_index_sessions_are_found_by_name(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    for session_id, age in [
+        ("review-1700000000", 30),
+        ("review-1700000100-1a2b", 20),
+        ("review-extra-1700000200", 10),
+        ("reviewer-1700000300", 0),
+    ]:
+        session_dir = write_session(tmp_path, session_id)
+        os.utime(session_dir, (1_000_000 - age, 1_000_000 - age))
+    manager = SessionManager(tmp_path)
+
+    def unavailable(slug: str) -> str | None:
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(manager.index, "latest_id", unavailable)
+
+    assert manager._find_session_dir("review") == tmp_path / "review-1700000100-1a2b"
+    assert manager._find_session_dir("review-extra") == (
+        tmp_path / "review-extra-1700000200"
+    )
+    assert manager._find_session_dir("audit") is None
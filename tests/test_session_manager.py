@@ -0,0 +1,261 @@
+"""Tests for session metadata updates and retries"""
+
+import json
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+import config
+import session_manager
+from session_manager import SessionManager
+
+
+def make_session(sessions_dir: Path, session_id: str, status: str = "running") -> Path:
+    session_dir = sessions_dir / session_id
+    session_dir.mkdir()
+    metadata = {
+        "id": session_id,
+        "slug": "review",
+        "created_at": "2026-01-01T00:00:00",
+        "status": status,
+        "model": "gpt-5.2-pro",
+    }
+    (session_dir / "metadata.json").write_text(json.dumps(metadata))
+    return session_dir
+
+
+def set_status(session_dir: Path, status: str) -> None:
+    metadata_file = session_dir / "metadata.json"
+    metadata = json.loads(metadata_file.read_text())
+    metadata_file.write_text(json.dumps({**metadata, "status": status}))
+
+
+def test_concurrent_hedge_records_are_all_kept(tmp_path: Path) -> None:
+    manager = SessionManager(tmp_path)
+    session_dir = make_session(tmp_path, "review-1")
+    stage_dirs = [session_dir / "shards" / f"{i:02d}" for i in range(1, 9)]
+
+    def record(stage_dir: Path) -> None:
+        for n in range(20):
+            attempts = [{"model": "gpt-5.2-pro", "outcome": "running", "n": n}]
+            manager._record_hedge("review-1", stage_dir, attempts)
+            manager._update_status("review-1", "calling_llm", stage=stage_dir.name)
+
+    with ThreadPoolExecutor(len(stage_dirs)) as pool:
+        list(pool.map(record, stage_dirs))
+
+    metadata = json.loads((session_dir / "metadata.json").read_text())
+    stages = metadata["hedge"]["stages"]
+    assert sorted(stages) == [f"shards/{i:02d}" for i in range(1, 9)]
+    assert all(attempts[0]["n"] == 19 for attempts in stages.values())
+    assert list(session_dir.glob("*.tmp")) == []
+
+
+def test_hedge_attempts_of_the_session_itself(tmp_path: Path) -> None:
+    manager = SessionManager(tmp_path)
+    session_dir = make_session(tmp_path, "review-1")
+
+    manager._record_hedge("review-1", session_dir, [{"outcome": "won"}])
+
+    metadata = json.loads((session_dir / "metadata.json").read_text())
+    assert metadata["hedge"] == {"attempts": [{"outcome": "won"}]}
+
+
+def write_stage(stage_dir: Path, status: str) -> None:
+    stage_dir.mkdir(parents=True)
+    (stage_dir / "status.json").write_text(json.dumps({"status": status}))
+    (stage_dir / "response_id.txt").write_text(f"resp_{stage_dir.name}")
+
+
+def test_retry_drops_the_jobs_of_failed_stages(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    manager = SessionManager(tmp_path)
+    monkeypatch.setattr(manager, "_start_worker", lambda *args: None)
+    session_dir = make_session(tmp_path, "review-1", status="error")
+    write_stage(session_dir / "shards" / "01", "completed")
+    write_stage(session_dir / "shards" / "02", "error")
+    write_stage(session_dir / "reduce", "error")
+    hedged = session_dir / "shards" / "02" / "hedge" / "fallback"
+    hedged.mkdir(parents=True)
+    (hedged / "response_id.txt").write_text("resp_fallback")
+
+    manager.retry_session("review-1")
+
+    assert (session_dir / "shards" / "01" / "response_id.txt").exists()
+    assert sorted(p.name for p in session_dir.rglob("response_id.txt")) == [
+        "response_id.txt"
+    ]
+
+
+def test_retry_resumes_the_job_of_an_orphaned_session(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    manager = SessionManager(tmp_path)
+    monkeypatch.setattr(manager, "_start_worker", lambda *args: None)
+    session_dir = make_session(tmp_path, "review-1", status="polling")
+    (session_dir / "response_id.txt").write_text("resp_1")
+    # No process has this pid, so the poller that owned the job is gone
+    (session_dir / "pid").write_text(str(2**22 + 1))
+
+    manager.retry_session("review-1")
+
+    assert (session_dir / "response_id.txt").read_text() == "resp_1"
+
+
+def test_retry_of_a_failed_session_starts_a_new_job(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    manager = SessionManager(tmp_path)
+    monkeypatch.setattr(manager, "_start_worker", lambda *args: None)
+    session_dir = make_session(tmp_path, "review-1", status="error")
+    (session_dir / "response_id.txt").write_text("resp_1")
+
+    manager.retry_session("review-1")
+
+    assert not (session_dir / "response_id.txt").exists()
+
+
+def test_prompt_splits_where_the_reference_files_end(tmp_path: Path) -> None:
+    from file_handler import (
+        QUESTION_SEPARATOR,
+        FileCategory,
+        ProcessedFile,
+        build_prompt_segments,
+        split_prompt,
+    )
+
+    manager = SessionManager(tmp_path)
+    stage_dir = tmp_path / "stage"
+    stage_dir.mkdir()
+    # Pasted text in the question repeats the separator
+    question = f"Compare these:{QUESTION_SEPARATOR}pasted report"
+    files = [ProcessedFile("a.py", FileCategory.TEXT, "print('a')\n")]
+    segments = build_prompt_segments(question, files)
+    manager._write_input(stage_dir, [text for _, text in segments], None)
+
+    prompt, _ = manager._load_input(stage_dir)
+    prefix, rest = split_prompt(prompt)
+
+    assert prefix + rest == "".join(text for _, text in segments)
+    assert prefix.startswith("## Reference Files") and prefix.endswith("```\n")
+    assert rest == QUESTION_SEPARATOR + question
+
+
+def test_prompt_without_attachments_has_no_prefix(tmp_path: Path) -> None:
+    from file_handler import split_prompt
+
+    manager = SessionManager(tmp_path)
+    stage_dir = tmp_path / "stage"
+    stage_dir.mkdir()
+    manager._write_input(stage_dir, "Just a question", None)
+
+    prompt, _ = manager._load_input(stage_dir)
+
+    assert split_prompt(prompt) == ("", "Just a question")
+
+
+def test_follow_yields_output_as_it_is_appended(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    manager = SessionManager(tmp_path)
+    session_dir = make_session(tmp_path, "review-1")
+    output = "Résumé: done ✓".encode()
+    # The second write ends inside "é"; the third inside "✓"
+    chunks = [output[:2], output[2:13], output[13:-1], output[-1:]]
+    waits: list[float] = []
+
+    def write_next_chunk(seconds: float) -> None:
+        waits.append(seconds)
+        with (session_dir / "output.txt").open("ab") as f:
+            f.write(chunks[len(waits)])
+        if len(waits) == len(chunks) - 1:
+            set_status(session_dir, "completed")
+
+    monkeypatch.setattr(session_manager.time, "sleep", write_next_chunk)
+    (session_dir / "output.txt").write_bytes(chunks[0])
+
+    pieces = list(manager.follow_output("review-1"))
+
+    assert "".join(pieces) == output.decode()
+    assert "\ufffd" not in "".join(pieces)
+    assert len(waits) == len(chunks) - 1
+
+
+@pytest.fixture
+def sleeps(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    slept: list[float] = []
+    monkeypatch.setattr(session_manager.time, "sleep", slept.append)
+    return slept
+
+
+def test_wait_returns_when_the_worker_signals(
+    tmp_path: Path, sleeps: list[float]
+) -> None:
+    manager = SessionManager(tmp_path)
+    session_dir = make_session(tmp_path, "review-1", status="completed")
+    (session_dir / "output.txt").write_text("answer")
+    recv_conn, send_conn = multiprocessing.Pipe(duplex=False)
+    manager._completion_conns["review-1"] = recv_conn
+    send_conn.send("done")
+
+    result = manager.wait_for_completion("review-1", timeout=5)
+
+    assert result["status"] == "completed" and result["output"] == "answer"
+    assert sleeps == []
+    assert "review-1" not in manager._completion_conns
+    assert recv_conn.closed
+
+
+def test_wait_on_a_silent_worker_times_out(tmp_path: Path) -> None:
+    manager = SessionManager(tmp_path)
+    make_session(tmp_path, "review-1")
+    recv_conn, _send_conn = multiprocessing.Pipe(duplex=False)
+    manager._completion_conns["review-1"] = recv_conn
+
+    with pytest.raises(TimeoutError, match="did not complete"):
+        manager.wait_for_completion("review-1", timeout=0.01)
+    assert recv_conn.closed
+
+
+def test_sessions_started_elsewhere_are_polled(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    manager = SessionManager(tmp_path)
+    session_dir = make_session(tmp_path, "review-1")
+    slept: list[float] = []
+
+    def finish_on_third_poll(seconds: float) -> None:
+        slept.append(seconds)
+        if len(slept) == 3:
+            set_status(session_dir, "error")
+            (session_dir / "error.txt").write_text("model error")
+
+    monkeypatch.setattr(session_manager.time, "sleep", finish_on_third_poll)
+
+    result = manager.wait_for_completion("review-1", timeout=60)
+
+    assert result["status"] == "error" and result["error_details"] == "model error"
+    assert slept == [config.POLLING_INTERVAL_SECONDS] * 3
+
+
+def test_a_job_handed_to_the_poller_is_checked_often(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    manager = SessionManager(tmp_path)
+    session_dir = make_session(tmp_path, "review-1", status="polling")
+    recv_conn, send_conn = multiprocessing.Pipe(duplex=False)
+    manager._completion_conns["review-1"] = recv_conn
+    send_conn.close()  # the worker exits once it hands the job over
+    slept: list[float] = []
+
+    def complete(seconds: float) -> None:
+        slept.append(seconds)
+        set_status(session_dir, "completed")
+
+    monkeypatch.setattr(session_manager.time, "sleep", complete)
+
+    assert manager.wait_for_completion("review-1", timeout=60)["status"] == "completed"
+    assert slept == [config.STREAM_FOLLOW_INTERVAL_SECONDS]
@@ -0,0 +1,78 @@
+"""Tests for the persistent token count cache"""
+
+import itertools
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+import token_cache
+from token_cache import TokenCache
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Every call sees a later time, so last-used order is never a tie"""
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(token_cache.time, "time", lambda: float(next(ticks)))
+
+
+def test_hits_and_misses_are_counted(tmp_path: Path) -> None:
+    cache = TokenCache(tmp_path / "tokens.db")
+    cache.put_many({"a": 1, "b": 2})
+
+    assert cache.get_many(["a", "b", "c", "c"]) == {"a": 1, "b": 2}
+    assert cache.get_many(["d"]) == {}
+
+    assert (cache.hits, cache.misses) == (2, 2)
+    assert cache.stats() == "2 hit(s), 2 miss(es)"
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path: Path) -> None:
+    cache = TokenCache(tmp_path / "tokens.db", max_entries=3)
+    cache.put_many({"a": 1})
+    cache.put_many({"b": 2})
+    cache.put_many({"c": 3})
+    cache.get_many(["a"])  # a is now more recent than b and c
+
+    cache.put_many({"d": 4})
+
+    assert cache.get_many(["a", "b", "c", "d"]) == {"a": 1, "c": 3, "d": 4}
+
+
+def test_counts_are_shared_through_the_database(tmp_path: Path) -> None:
+    TokenCache(tmp_path / "tokens.db").put_many({"a": 1})
+
+    assert TokenCache(tmp_path / "tokens.db").get_many(["a"]) == {"a": 1}
+
+
+def test_connections_are_closed(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    opened: list[sqlite3.Connection] = []
+    connect = sqlite3.connect
+
+    def recording_connect(*args: object, **kwargs: object) -> sqlite3.Connection:
+        conn = connect(*args, **kwargs)  # type: ignore[arg-type]
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(token_cache.sqlite3, "connect", recording_connect)
+    cache = TokenCache(tmp_path / "tokens.db")
+    cache.put_many({"a": 1})
+    cache.get_many(["a"])
+
+    assert len(opened) == 2
+    for conn in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+
+
+def test_an_unusable_database_is_a_miss(tmp_path: Path) -> None:
+    (tmp_path / "tokens.db").mkdir()
+    cache = TokenCache(tmp_path / "tokens.db")
+
+    cache.put_many({"a": 1})
+
+    assert cache.get_many(["a"]) == {}
+    assert cache.misses == 1